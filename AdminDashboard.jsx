@@ -1,30 +1,79 @@
 // AdminDashboard.jsx
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { socket } from "./socket"; // ✅ Must be './socket' if socket.js is in the same folder
 
 const API_BASE = "http://localhost:5000";
 
+const PAGE_SIZE = 100;
+
+// Same order as the server's moderation queue (pagination.QUEUE_SORT):
+// spam first, then spam score, suspicion, newest; missing scores sort last
+const QUEUE_KEYS = ["spam", "spam_score", "suspicion_score", "timestamp", "_id"];
+const rank = (value) => (value === undefined || value === null ? -Infinity : value);
+const queueOrder = (a, b) => {
+  for (const key of QUEUE_KEYS) {
+    const x = rank(a[key]);
+    const y = rank(b[key]);
+    if (x !== y) return x > y ? -1 : 1;
+  }
+  return 0;
+};
+
 export default function AdminDashboard() {
   const [incidents, setIncidents] = useState([]);
+  const [next, setNext] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showFlaggedOnly, setShowFlaggedOnly] = useState(false);
+  const [counts, setCounts] = useState({});
+  const [selected, setSelected] = useState(new Set());
+  const countsTimer = useRef(null);
 
-  const fetchIncidents = async () => {
+  // Precomputed counters; cheap enough to refresh after every action
+  const fetchCounts = async () => {
     try {
-      setLoading(true);
-      const url = showFlaggedOnly
-        ? `${API_BASE}/admin/incidents/flagged`
-        : `${API_BASE}/admin/incidents`;
+      const res = await fetch(`${API_BASE}/stats?status=all&group=status`);
+      const json = await res.json();
+      if (json.status === "success") {
+        setCounts(Object.fromEntries(json.data.map((row) => [row.status, row.count])));
+      }
+    } catch (err) {
+      console.error("Failed to fetch stats:", err);
+    }
+  };
+
+  // Queue updates can arrive in bursts (bulk imports); refresh counts once
+  const refreshCountsSoon = () => {
+    clearTimeout(countsTimer.current);
+    countsTimer.current = setTimeout(fetchCounts, 1000);
+  };
 
-      const res = await fetch(url);
+  // First page on load, view change or reconnect; later pages on demand.
+  // Everything in between comes from "queue_update" events.
+  const fetchIncidents = async (after = null) => {
+    if (!after) fetchCounts();
+    try {
+      setLoading(!after);
+      const path = showFlaggedOnly ? "/admin/incidents/flagged" : "/admin/queue";
+      const query = `limit=${PAGE_SIZE}` + (after ? `&after=${after}` : "");
+      const res = await fetch(`${API_BASE}${path}?${query}`);
       if (!res.ok) throw new Error("Server error while fetching incidents");
 
       const json = await res.json();
 
       if (json.status === "success") {
-        setIncidents(json.data);
+        if (after) {
+          // An incident pushed in since the last page may be on this one too
+          setIncidents((prev) => {
+            const seen = new Set(prev.map((inc) => inc._id));
+            return [...prev, ...json.data.filter((inc) => !seen.has(inc._id))];
+          });
+        } else {
+          setIncidents(json.data);
+          setSelected(new Set());
+        }
+        setNext(json.next);
         setError(null);
       } else {
         setError(json.message || "Failed to fetch incidents");
@@ -36,63 +85,114 @@ export default function AdminDashboard() {
     }
   };
 
+  const removeFromList = (ids) => {
+    const gone = new Set(ids);
+    setIncidents((prev) => prev.filter((inc) => !gone.has(inc._id)));
+    setSelected((prev) => new Set([...prev].filter((id) => !gone.has(id))));
+  };
+
+  const mergeIntoList = (changes) => {
+    const byId = Object.fromEntries(changes.map((change) => [change._id, change]));
+    setIncidents((prev) =>
+      prev
+        .map((inc) => (byId[inc._id] ? { ...inc, ...byId[inc._id] } : inc))
+        .filter((inc) => !showFlaggedOnly || inc.flagged)
+    );
+  };
+
+  const addToList = (added) => {
+    setIncidents((prev) => {
+      const seen = new Set(prev.map((inc) => inc._id));
+      const fresh = added.filter((inc) => !seen.has(inc._id) && (!showFlaggedOnly || inc.flagged));
+      if (showFlaggedOnly) return [...fresh, ...prev];
+      // Past the last loaded row it belongs to a page not loaded yet
+      const last = prev[prev.length - 1];
+      const visible = next && last ? fresh.filter((inc) => queueOrder(inc, last) < 0) : fresh;
+      return [...prev, ...visible].sort(queueOrder);
+    });
+  };
+
+  const applyQueueUpdate = (update) => {
+    if (update.op === "remove") removeFromList(update.ids);
+    else if (update.op === "update") mergeIntoList(update.data);
+    else if (update.op === "add") addToList(update.data);
+    refreshCountsSoon();
+  };
+
   useEffect(() => {
     fetchIncidents();
   }, [showFlaggedOnly]);
 
-  // ✅ UPDATED: Approve incident & emit via Socket.IO
-  const handleApprove = async (id) => {
+  useEffect(() => {
+    const join = () => {
+      socket.emit("subscribe_moderation");
+    };
+    // Events sent while disconnected are lost: start over from the first page
+    const rejoin = () => {
+      join();
+      fetchIncidents();
+    };
+    join();
+    socket.on("connect", rejoin);
+    socket.on("queue_update", applyQueueUpdate);
+    return () => {
+      socket.off("connect", rejoin);
+      socket.off("queue_update", applyQueueUpdate);
+      socket.emit("unsubscribe_moderation");
+      clearTimeout(countsTimer.current);
+    };
+  }, [showFlaggedOnly, next]);
+
+  // One request for any number of incidents; the list is patched from the
+  // reply (and again, harmlessly, from the queue_update event)
+  const moderate = async (action, ids) => {
+    if (ids.length === 0) return;
     try {
-      const res = await fetch(`${API_BASE}/admin/incidents/${id}/approve`, {
+      const res = await fetch(`${API_BASE}/admin/incidents/bulk`, {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ action, ids }),
       });
       const json = await res.json();
-
       if (json.status === "success") {
-        // ✅ Real-time broadcast
-        socket.emit("incident_approved", json.data);
-        fetchIncidents();
+        if (action === "flag" || action === "unflag") {
+          mergeIntoList(json.ids.map((_id) => ({ _id, flagged: action === "flag" })));
+        } else {
+          removeFromList(json.ids);
+        }
+        refreshCountsSoon();
       } else {
-        alert(json.message || "Failed to approve incident");
+        alert(json.message || `Failed to ${action} incidents`);
       }
     } catch (err) {
       console.error(err);
-      alert("Network error while approving");
+      alert(`Network error while trying to ${action}`);
     }
   };
 
-  const toggleFlagIncident = async (id, currentFlagged) => {
-    try {
-      const res = await fetch(`${API_BASE}/admin/flag`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ id, flagged: !currentFlagged }),
-      });
-      const json = await res.json();
-      if (json.status === "success") {
-        fetchIncidents();
-      } else {
-        alert(json.message || "Failed to update flag status");
-      }
-    } catch (err) {
-      alert(err.message);
+  const moderateSelected = (action) => {
+    const ids = [...selected];
+    if (
+      (action === "reject" || action === "remove") &&
+      !window.confirm(`Are you sure you want to ${action} ${ids.length} incident(s)?`)
+    ) {
+      return;
     }
+    moderate(action, ids);
   };
 
-  const removeIncident = async (id) => {
-    try {
-      const res = await fetch(`${API_BASE}/admin/incidents/${id}/remove`, {
-        method: "DELETE",
-      });
-      const json = await res.json();
-      if (json.status === "success") {
-        fetchIncidents();
-      } else {
-        alert(json.message || "Failed to remove incident");
-      }
-    } catch (err) {
-      alert("Network error while removing incident");
-    }
+  const toggleSelected = (id) => {
+    setSelected((prev) => {
+      const copy = new Set(prev);
+      if (copy.has(id)) copy.delete(id);
+      else copy.add(id);
+      return copy;
+    });
+  };
+
+  const allSelected = incidents.length > 0 && selected.size === incidents.length;
+  const toggleAll = () => {
+    setSelected(allSelected ? new Set() : new Set(incidents.map((inc) => inc._id)));
   };
 
   const testSubmission = async () => {
@@ -122,6 +222,11 @@ export default function AdminDashboard() {
     <div style={{ padding: "1rem" }}>
       <h2>Admin Dashboard - Incident Moderation</h2>
 
+      <p>
+        Pending: {counts.pending || 0} | Approved: {counts.approved || 0} |
+        Flagged: {counts.flagged || 0} | Spam: {counts.spam || 0}
+      </p>
+
       <button
         onClick={() => setShowFlaggedOnly(!showFlaggedOnly)}
         style={{
@@ -134,7 +239,7 @@ export default function AdminDashboard() {
           cursor: "pointer",
         }}
       >
-        {showFlaggedOnly ? "Show All Reports" : "Show Flagged Reports Only"}
+        {showFlaggedOnly ? "Show Moderation Queue" : "Show Flagged Reports Only"}
       </button>
 
       <button
@@ -153,6 +258,31 @@ export default function AdminDashboard() {
         Test Incident Submission
       </button>
 
+      <div style={{ marginBottom: "1rem" }}>
+        <span style={{ marginRight: "10px" }}>{selected.size} selected</span>
+        {!showFlaggedOnly && (
+          <button onClick={() => moderateSelected("approve")} disabled={!selected.size} style={{ marginRight: "5px" }}>
+            Approve
+          </button>
+        )}
+        <button onClick={() => moderateSelected("flag")} disabled={!selected.size} style={{ marginRight: "5px" }}>
+          Flag
+        </button>
+        <button onClick={() => moderateSelected("unflag")} disabled={!selected.size} style={{ marginRight: "5px" }}>
+          Unflag
+        </button>
+        <button onClick={() => moderateSelected("reject")} disabled={!selected.size} style={{ marginRight: "5px" }}>
+          Reject
+        </button>
+        <button
+          onClick={() => moderateSelected("remove")}
+          disabled={!selected.size}
+          style={{ backgroundColor: "red", color: "white" }}
+        >
+          Remove
+        </button>
+      </div>
+
       {incidents.length === 0 && <p>No incidents found.</p>}
 
       <table
@@ -163,10 +293,15 @@ export default function AdminDashboard() {
       >
         <thead>
           <tr>
+            <th>
+              <input type="checkbox" checked={allSelected} onChange={toggleAll} />
+            </th>
             <th>Type</th>
             <th>Location</th>
             <th>Severity</th>
             <th>Description</th>
+            <th>Spam score</th>
+            <th>Suspicion</th>
             <th>Timestamp</th>
             <th>Approved</th>
             <th>Flagged</th>
@@ -178,20 +313,26 @@ export default function AdminDashboard() {
             <tr
               key={inc._id}
               style={{
-                backgroundColor:
-                  inc.spamLabel === "spam"
-                    ? "#ffe5e5"
-                    : inc.flagged
-                    ? "#fdd"
-                    : "transparent",
+                backgroundColor: inc.spam
+                  ? "#ffe5e5"
+                  : inc.flagged
+                  ? "#fdd"
+                  : "transparent",
               }}
             >
+              <td>
+                <input
+                  type="checkbox"
+                  checked={selected.has(inc._id)}
+                  onChange={() => toggleSelected(inc._id)}
+                />
+              </td>
               <td>{inc.type}</td>
               <td>{inc.location}</td>
               <td>{inc.severity}</td>
               <td>
                 {inc.description}
-                {inc.spamLabel === "spam" && (
+                {inc.spam && (
                   <span
                     style={{
                       color: "red",
@@ -203,20 +344,22 @@ export default function AdminDashboard() {
                   </span>
                 )}
               </td>
+              <td>{inc.spam_score ?? "-"}</td>
+              <td>{inc.suspicion_score ?? "-"}</td>
               <td>{new Date(inc.timestamp).toLocaleString()}</td>
               <td>{inc.approved ? "Yes" : "No"}</td>
               <td>{inc.flagged ? "Yes" : "No"}</td>
               <td>
                 {!inc.approved && (
                   <button
-                    onClick={() => handleApprove(inc._id)}
+                    onClick={() => moderate("approve", [inc._id])}
                     style={{ marginRight: "5px", cursor: "pointer" }}
                   >
                     Approve
                   </button>
                 )}
                 <button
-                  onClick={() => toggleFlagIncident(inc._id, inc.flagged)}
+                  onClick={() => moderate(inc.flagged ? "unflag" : "flag", [inc._id])}
                   style={{ marginRight: "5px", cursor: "pointer" }}
                 >
                   {inc.flagged ? "Unflag" : "Flag"}
@@ -228,7 +371,7 @@ export default function AdminDashboard() {
                         "Are you sure you want to remove this incident?"
                       )
                     ) {
-                      removeIncident(inc._id);
+                      moderate("remove", [inc._id]);
                     }
                   }}
                   style={{
@@ -244,6 +387,12 @@ export default function AdminDashboard() {
           ))}
         </tbody>
       </table>
+
+      {next && (
+        <button onClick={() => fetchIncidents(next)} style={{ marginTop: "1rem", cursor: "pointer" }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -72,6 +72,12 @@ const checkSpam = async (description) => {
   }
 };
 
+// Newest first; an incident that is already listed is replaced, not repeated
+const mergeIncidents = (prev, incoming) => {
+  const ids = new Set(incoming.map((incident) => incident._id));
+  return [...incoming, ...prev.filter((incident) => !ids.has(incident._id))];
+};
+
 // ✅ Incident Type Predictor
 const predictType = async (description) => {
   try {
@@ -100,6 +106,7 @@ function HomeApp() {
   });
 
   const [incidents, setIncidents] = useState([]);
+  const [next, setNext] = useState(null);
   const [filter, setFilter] = useState({ severity: "", location: "" });
   const [alertIncident, setAlertIncident] = useState(null);
 
@@ -128,23 +135,38 @@ function HomeApp() {
     fetchIncidents();
     const socket = io(API_BASE);
 
+    // The list is patched from the events; only older pages are fetched
     socket.on("new_incident", (incident) => {
-      setIncidents((prev) => [incident, ...prev]);
+      setIncidents((prev) => mergeIncidents(prev, [incident]));
       if (incident.severity === "high" || incident.severity === "critical") {
         setAlertIncident(incident);
         setTimeout(() => setAlertIncident(null), 10000);
       }
     });
 
+    // Bulk imports arrive as one batch per insert
+    socket.on("new_incidents", (batch) => {
+      setIncidents((prev) => mergeIncidents(prev, batch.data));
+    });
+
+    // Archived, rejected or flagged incidents leave the list
+    socket.on("incidents_removed", (batch) => {
+      const gone = new Set(batch.ids);
+      setIncidents((prev) => prev.filter((incident) => !gone.has(incident._id)));
+    });
+
     return () => socket.disconnect();
   }, []);
 
-  const fetchIncidents = async () => {
+  // First page on load, older pages on "Load more"
+  const fetchIncidents = async (after = null) => {
     try {
-      const res = await fetch(`${API_BASE}/incidents`);
+      const query = after ? `?${new URLSearchParams({ after })}` : "";
+      const res = await fetch(`${API_BASE}/incidents${query}`);
       const data = await res.json();
       if (data.status === "success") {
-        setIncidents(data.data);
+        setIncidents((prev) => (after ? mergeIncidents(data.data, prev) : data.data));
+        setNext(data.next);
       }
     } catch (err) {
       console.error("Failed to fetch incidents", err);
@@ -195,8 +217,6 @@ function HomeApp() {
           });
         }, 500);
       }
-
-      fetchIncidents();
     } catch (err) {
       console.error("❌ Submit Error:", err.response?.data || err.message);
       toast.error("❌ Failed to submit incident. Please try again");
@@ -205,7 +225,7 @@ function HomeApp() {
 
   const filteredIncidents = incidents.filter((i) => {
     const severityMatch = !filter.severity || i.severity === filter.severity;
-    const locationMatch = !filter.location || i.location.toLowerCase().includes(filter.location.toLowerCase());
+    const locationMatch = !filter.location || (i.location || "").toLowerCase().includes(filter.location.toLowerCase());
     return severityMatch && locationMatch;
   });
 
@@ -337,6 +357,12 @@ function HomeApp() {
           </div>
         ))}
 
+        {next && (
+          <button onClick={() => fetchIncidents(next)} className="border p-2">
+            Load more
+          </button>
+        )}
+
         <MapView incidents={filteredIncidents} />
       </div>
     </div>
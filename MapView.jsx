@@ -1,9 +1,10 @@
 import React, { useEffect, useRef, useState } from "react";
-import { MapContainer, TileLayer, Marker, Popup, useMap, Circle } from "react-leaflet";
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents, Circle } from "react-leaflet";
 import "leaflet/dist/leaflet.css";
 import L from "leaflet";
 import iconUrl from "leaflet/dist/images/marker-icon.png";
 import iconShadow from "leaflet/dist/images/marker-shadow.png";
+import { socket } from "./socket";
 
 // 🛠 Fix for default Leaflet marker
 const DefaultIcon = L.icon({
@@ -22,6 +23,9 @@ const userIcon = new L.Icon({
   shadowSize: [41, 41],
 });
 
+const API_BASE = "http://localhost:5000";
+const CLUSTER_MAX_ZOOM = 15; // individual markers from this zoom on
+
 // 📍 Map fly-to component for latest incident
 function FlyToLatest({ incidents }) {
   const map = useMap();
@@ -46,6 +50,121 @@ function FlyToLatest({ incidents }) {
   return null;
 }
 
+// 🛰️ Load the incidents inside the visible viewport, then subscribe to live ones there
+function ViewportSubscriber({ onIncidents }) {
+  const subscribe = (map) => {
+    const b = map.getBounds();
+    const bounds = {
+      south: Math.max(b.getSouth(), -90),
+      west: b.getWest(),
+      north: Math.min(b.getNorth(), 90),
+      east: b.getEast(),
+    };
+    socket.emit("subscribe_viewport", bounds);
+    if (bounds.east - bounds.west >= 360) {
+      bounds.west = -180;
+      bounds.east = 180;
+    } else {
+      // Leaflet keeps scrolling past ±180; the API expects wrapped longitudes
+      bounds.west = ((((bounds.west + 180) % 360) + 360) % 360) - 180;
+      bounds.east = ((((bounds.east + 180) % 360) + 360) % 360) - 180;
+    }
+    if (map.getZoom() < CLUSTER_MAX_ZOOM) return; // tiles cover the zoomed-out map
+    fetch(`${API_BASE}/incidents/bbox?${new URLSearchParams({ ...bounds, limit: 500 })}`)
+      .then((res) => res.json())
+      .then((json) => json.status === "success" && onIncidents(json.data))
+      .catch((err) => console.error("Viewport fetch failed:", err));
+  };
+  const map = useMapEvents({ moveend: () => subscribe(map) });
+
+  useEffect(() => {
+    subscribe(map);
+    return () => socket.emit("unsubscribe_viewport");
+  }, [map]);
+
+  return null;
+}
+
+// 🧩 Server-side clusters: one /tiles/z/x/y request per visible tile
+function tileRange(map) {
+  const z = Math.max(0, Math.min(20, Math.floor(map.getZoom())));
+  const n = 2 ** z;
+  const b = map.getBounds();
+  const clampLat = (lat) => Math.max(-85.0511, Math.min(85.0511, lat));
+  const toX = (lng) => Math.floor(((lng + 180) / 360) * n);
+  const toY = (lat) => {
+    const r = (clampLat(lat) * Math.PI) / 180;
+    return Math.min(n - 1, Math.max(0, Math.floor(((1 - Math.log(Math.tan(r) + 1 / Math.cos(r)) / Math.PI) / 2) * n)));
+  };
+  const tiles = [];
+  const x0 = toX(b.getWest());
+  const x1 = Math.min(toX(b.getEast()), x0 + n - 1);
+  for (let x = x0; x <= x1; x++) {
+    for (let y = toY(b.getNorth()); y <= toY(b.getSouth()); y++) {
+      tiles.push(`${z}/${((x % n) + n) % n}/${y}`);
+    }
+  }
+  return { z, tiles };
+}
+
+function TileClusters({ onClusters }) {
+  const map = useMap();
+
+  useEffect(() => {
+    let timer = null;
+    const load = () => {
+      const { z, tiles } = tileRange(map);
+      if (z >= CLUSTER_MAX_ZOOM) {
+        onClusters(null);
+        return;
+      }
+      // no-cache + ETag: unchanged tiles come back as 304s
+      Promise.all(
+        tiles.map((t) =>
+          fetch(`${API_BASE}/tiles/${t}`, { cache: "no-cache" })
+            .then((res) => res.json())
+            .then((json) => (json.status === "success" ? json.data : []))
+            .catch(() => [])
+        )
+      ).then((parts) => onClusters(parts.flat()));
+    };
+    const reload = () => {
+      clearTimeout(timer);
+      timer = setTimeout(load, 500);
+    };
+    load();
+    map.on("moveend", load);
+    socket.on("incident_delta", reload);
+    socket.on("incident_deltas", reload);
+    return () => {
+      clearTimeout(timer);
+      map.off("moveend", load);
+      socket.off("incident_delta", reload);
+      socket.off("incident_deltas", reload);
+    };
+  }, [map]);
+
+  return null;
+}
+
+function clusterIcon(count) {
+  const size = Math.min(60, 24 + Math.log10(count) * 12);
+  return L.divIcon({
+    className: "cluster-icon",
+    iconSize: [size, size],
+    html: `<div style="
+      width:${size}px;
+      height:${size}px;
+      line-height:${size}px;
+      border-radius:50%;
+      background:rgba(220,38,38,0.7);
+      color:white;
+      font-weight:bold;
+      text-align:center;
+    ">${count}</div>`,
+  });
+}
+
 // 🎨 Icon per severity level
 function getColorIcon(severity) {
   const colorMap = {
@@ -74,6 +193,9 @@ export default function MapView({ incidents = [] }) {
   const [userLocation, setUserLocation] = useState(null);
   const [locationError, setLocationError] = useState(null);
   const [hotspots, setHotspots] = useState([]);
+  const [live, setLive] = useState({ added: {}, removed: {} });
+  const [viewportIncidents, setViewportIncidents] = useState([]);
+  const [clusters, setClusters] = useState(null); // null when zoomed in past clustering
 
   // 🛰️ Get user GPS
   useEffect(() => {
@@ -94,14 +216,48 @@ export default function MapView({ incidents = [] }) {
     }
   }, []);
 
-  // 🔴 Load red zone hotspots only once
+  // 🔴 Load red zone hotspots once, then follow server-pushed updates
   useEffect(() => {
     fetch("http://localhost:5000/hotspots")
       .then((res) => res.json())
       .then((data) => setHotspots(data))
       .catch((err) => console.error("Hotspot fetch failed:", err));
+
+    socket.on("hotspots_updated", setHotspots);
+    return () => socket.off("hotspots_updated", setHotspots);
+  }, []);
+
+  // ⚡ Compact incident deltas for the subscribed viewport
+  useEffect(() => {
+    const onDelta = (delta) => {
+      setLive((prev) => {
+        const added = { ...prev.added };
+        const removed = { ...prev.removed };
+        if (delta.op === "remove") {
+          delete added[delta._id];
+          removed[delta._id] = true;
+        } else {
+          added[delta._id] = delta;
+          delete removed[delta._id];
+        }
+        return { added, removed };
+      });
+    };
+    const onDeltas = (deltas) => deltas.forEach(onDelta);
+    socket.on("incident_delta", onDelta);
+    socket.on("incident_deltas", onDeltas);
+    return () => {
+      socket.off("incident_delta", onDelta);
+      socket.off("incident_deltas", onDeltas);
+    };
   }, []);
 
+  const byId = {};
+  [...viewportIncidents, ...Object.values(live.added), ...incidents].forEach((i) => {
+    byId[i._id] = { ...byId[i._id], ...i };
+  });
+  const visibleIncidents = Object.values(byId).filter((i) => !live.removed[i._id]);
+
   return (
     <>
       {locationError && (
@@ -122,6 +278,30 @@ export default function MapView({ incidents = [] }) {
         />
 
         <FlyToLatest incidents={incidents} />
+        <ViewportSubscriber onIncidents={setViewportIncidents} />
+        <TileClusters onClusters={setClusters} />
+
+        {/* 🧩 Clusters below CLUSTER_MAX_ZOOM */}
+        {(clusters || []).map((c) =>
+          c.count > 1 ? (
+            <Marker key={`${c.lat},${c.lng}`} position={[c.lat, c.lng]} icon={clusterIcon(c.count)}>
+              <Popup>
+                <strong>{c.count} incidents</strong>
+                <br />
+                {Object.entries(c.severity || {})
+                  .map(([s, n]) => `${s}: ${n}`)
+                  .join(", ")}
+              </Popup>
+            </Marker>
+          ) : (
+            <Marker key={c._id} position={[c.lat, c.lng]} icon={getColorIcon(c.severity)}>
+              <Popup>
+                <strong>Type:</strong> {c.type || "N/A"}<br />
+                <strong>Severity:</strong> {c.severity || "N/A"}
+              </Popup>
+            </Marker>
+          )
+        )}
 
         {/* 🧍‍♂️ User Location */}
         {userLocation && (
@@ -140,9 +320,9 @@ export default function MapView({ incidents = [] }) {
           />
         ))}
 
-        {/* 📌 Incident Markers */}
-        {Array.isArray(incidents) &&
-          incidents.map((incident, idx) => {
+        {/* 📌 Incident Markers (zoomed in; clusters cover the rest) */}
+        {Array.isArray(incidents) && clusters === null &&
+          visibleIncidents.map((incident, idx) => {
             const {
               latitude,
               longitude,
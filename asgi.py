@@ -0,0 +1,367 @@
+import asyncio
+import inspect
+import os
+import time
+from datetime import datetime
+
+import socketio
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as server
+from database import MONGO_DB, MONGO_URI, Store, serialize
+from database.mongo import POOL_OPTIONS, CommandTimer, MongoStore
+from dedupe import text_fingerprint
+from ingest import validate_report, build_incident, merge_update
+from metrics import REQUEST_SECONDS, set_route, stage
+from offload import PooledRegistry, make_pool, pooled_cluster
+from pagination import MAX_EXPORT_SIZE
+from streaming import CHUNK_SIZE, ENCODERS, dumps, encode_body, json_page, negotiate_encoding, wants_ndjson
+
+# Async serving mode, next to the threaded `python app.py` server:
+#   uvicorn asgi:application --workers 4 [--loop uvloop --http httptools]
+# Needs uvicorn, starlette, a2wsgi and motor (Mongo backend only).
+#
+# The hot routes (/check_spam, /predict-type, /classify/batch, /report,
+# /incidents and the geo queries) are served natively: database calls go
+# through Motor without a thread per request, and model inference and
+# hotspot clustering run in a process pool (offload.py), so the event loop
+# only waits. Socket.IO runs on python-socketio's AsyncServer, with the same
+# rooms and events as app.py. Every other route is the Flask app behind a
+# WSGI adapter, so both modes answer the same API.
+
+SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+
+if SOCKETIO_MESSAGE_QUEUE and SOCKETIO_MESSAGE_QUEUE.startswith("redis"):
+    client_manager = socketio.AsyncRedisManager(SOCKETIO_MESSAGE_QUEUE)
+else:
+    client_manager = None
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*", client_manager=client_manager)
+
+
+class AsyncEmitter:
+    # Stands in for flask_socketio.SocketIO behind GeoBroadcaster, ModerationFeed
+    # and the hotspot callback. Room changes are plain bookkeeping on the manager;
+    # emits are scheduled on the event loop, from it or from any thread.
+    def __init__(self, sio):
+        self.sio = sio
+        self.server = self
+        self.loop = None
+
+    def enter_room(self, sid, room, namespace="/"):
+        self.sio.manager.basic_enter_room(sid, namespace, room)
+
+    def leave_room(self, sid, room, namespace="/"):
+        self.sio.manager.basic_leave_room(sid, namespace, room)
+
+    def emit(self, event, data=None, to=None, namespace="/", **kwargs):
+        coro = self.sio.emit(event, data, to=to, namespace=namespace)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+emitter = AsyncEmitter(sio)
+server.socketio = emitter
+server.broadcaster.socketio = emitter
+server.moderation_feed.socketio = emitter
+
+store = server.store  # replaced by a Motor-backed Store at startup (Mongo backend)
+pool = None
+
+
+async def resolve(value):
+    # Motor returns coroutines where pymongo (and the memory store) return values
+    return await value if inspect.isawaitable(value) else value
+
+
+async def to_list(cursor, length=None):
+    if hasattr(cursor, "to_list"):
+        return await cursor.to_list(length)
+    return list(cursor)
+
+
+async def documents(cursor):
+    if hasattr(cursor, "__aiter__"):
+        async for doc in cursor:
+            yield doc
+    else:
+        for doc in cursor:
+            yield doc
+
+
+# === ROUTES ===
+# Handlers return (payload, status) like the Flask routes; ValueError is a
+# 400, anything else a 500, and each request is timed under its route.
+
+routes = []
+
+
+def encoding_headers(encoding):
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status_code=status, media_type="application/json")
+
+
+def route(path, methods=("GET",)):
+    def decorator(handler):
+        async def endpoint(request):
+            set_route(path)
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+                if isinstance(response, tuple):
+                    response = json_response(*response)
+            except ValueError as e:
+                response = json_response({"status": "error", "message": str(e)}, 400)
+            except Exception as e:
+                response = json_response({"status": "error", "message": str(e)}, 500)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, path, request.method, str(response.status_code))
+            return response
+
+        routes.append(Route(path, endpoint, methods=list(methods)))
+        return handler
+    return decorator
+
+
+async def json_body(request):
+    # Like request.get_json(silent=True)
+    try:
+        body = await request.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+@route("/check_spam", ["POST"])
+async def check_spam(request):
+    description = (await json_body(request)).get("description", "")
+    if not server.model_registry.current.has_spam:
+        return {"error": "Models not loaded"}, 500
+    prediction = await run_in_threadpool(server.classification.classify_one, description)
+    return {"is_spam": prediction["is_spam"]}, 200
+
+
+@route("/predict-type", ["POST"])
+async def predict_type(request):
+    description = (await json_body(request)).get("description", "")
+    if not server.model_registry.current.has_type:
+        return {"error": "Classifier not loaded"}, 500
+    prediction = await run_in_threadpool(server.classification.classify_one, description)
+    return {"predicted_type": prediction["predicted_type"]}, 200
+
+
+@route("/classify/batch", ["POST"])
+async def classify_batch(request):
+    descriptions = (await json_body(request)).get("descriptions")
+    if not isinstance(descriptions, list) or not all(isinstance(d, str) for d in descriptions):
+        raise ValueError("descriptions must be a list of strings")
+    if len(descriptions) > server.MAX_CLASSIFY_BATCH:
+        raise ValueError(f"At most {server.MAX_CLASSIFY_BATCH} descriptions per batch")
+    current = server.model_registry.current
+    if not (current.has_spam or current.has_type):
+        return {"status": "error", "message": "Models not loaded"}, 500
+    data = await run_in_threadpool(server.classification.classify, descriptions)
+    return {"status": "success", "data": data}, 200
+
+
+@route("/report", ["POST"])
+async def report_incident(request):
+    report = validate_report(await json_body(request))
+    desc = report["description"]
+    with stage("classify"):
+        prediction = await run_in_threadpool(server.classification.classify_one, desc)
+    now = datetime.utcnow()
+
+    has_location = "latitude" in report
+    with stage("dedupe"):
+        fingerprint = text_fingerprint(desc)
+        duplicate_id = None
+        if has_location:
+            duplicate_id = server.duplicate_index.find(fingerprint, report["latitude"], report["longitude"], now)
+    if duplicate_id:
+        merged = await resolve(store.update_incident(duplicate_id, merge_update(report, now),
+                                                     projection=server.MERGE_PROJECTION))
+        if merged:
+            before = await resolve(store.escalate_incident(duplicate_id, report["severity"],
+                                                           projection=server.STATS_PROJECTION))
+            if before:
+                merged["severity"] = server.incident_escalated(before, report["severity"])
+            if not merged.get("approved"):
+                server.moderation_feed.updated([serialize(merged)])
+            return {"status": "success", "merged": True, "data": merged}, 200
+        server.duplicate_index.remove(duplicate_id)
+
+    incident = build_incident(report, prediction, now)
+    with stage("insert"):
+        result = await resolve(store.incidents.insert_one(incident))
+    incident["_id"] = result.inserted_id
+    server.stats_engine.add(incident)
+    incident = serialize(incident)
+    if has_location:
+        server.duplicate_index.add(incident["_id"], fingerprint, incident["latitude"], incident["longitude"], now)
+    if not incident["spam"]:
+        server.broadcaster.publish(incident)
+    server.moderation_feed.added([incident])
+    return {"status": "success", "data": incident}, 201
+
+
+async def export_chunks(cursor, limit, encoding):
+    # streaming.ndjson + chunked + compressed, over an async cursor
+    encoder = ENCODERS[encoding]() if encoding else None
+    buffer, size, n = [], 0, 0
+    try:
+        async for doc in documents(cursor):
+            if n == limit:
+                break
+            line = dumps(doc) + b"\n"
+            buffer.append(line)
+            size += len(line)
+            n += 1
+            if size >= CHUNK_SIZE:
+                chunk = b"".join(buffer)
+                buffer, size = [], 0
+                yield encoder.compress(chunk) if encoder else chunk
+        chunk = b"".join(buffer)
+        if encoder:
+            yield encoder.compress(chunk) + encoder.finish()
+        elif chunk:
+            yield chunk
+    except Exception as e:
+        print("Streaming error:", e)
+
+
+@route("/incidents")
+async def get_incidents(request):
+    args = request.query_params
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if wants_ndjson(args, request.headers.get("accept", "")):
+        cursor, limit = store.page_cursor(server.PUBLIC_QUERY, args, max_limit=MAX_EXPORT_SIZE,
+                                          default_limit=MAX_EXPORT_SIZE)
+        return StreamingResponse(export_chunks(cursor, limit, encoding), media_type="application/x-ndjson",
+                                 headers=encoding_headers(encoding))
+    # A page is at most MAX_PAGE_SIZE documents: read it, then encode it in one go
+    cursor, limit = store.page_cursor(server.PUBLIC_QUERY, args)
+    docs = await to_list(cursor, limit + 1)
+    return Response(encode_body(json_page(docs, limit), encoding), media_type="application/json",
+                    headers=encoding_headers(encoding))
+
+
+async def geo_listing(request, cursor, limit):
+    # The same body as app.py's geo routes, in distance order: NDJSON is
+    # streamed, the JSON envelope is at most MAX_PAGE_SIZE documents
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if wants_ndjson(request.query_params, request.headers.get("accept", "")):
+        return StreamingResponse(export_chunks(cursor, limit, encoding), media_type="application/x-ndjson",
+                                 headers=encoding_headers(encoding))
+    docs = await to_list(cursor, limit)
+    return Response(encode_body(json_page(docs, limit), encoding), media_type="application/json",
+                    headers=encoding_headers(encoding))
+
+
+@route("/incidents/near")
+async def get_incidents_near(request):
+    args = request.query_params
+    lat, lng = server.geo_arg("lat", 90, args=args), server.geo_arg("lng", 180, args=args)
+    radius_km = server.geo_arg("radius_km", args=args)
+    if radius_km <= 0:
+        raise ValueError("'radius_km' must be positive")
+    limit = server.geo_limit(args=args)
+    return await geo_listing(request, store.near(lat, lng, radius_km, limit), limit)
+
+
+@route("/incidents/bbox")
+async def get_incidents_bbox(request):
+    args = request.query_params
+    south, north = server.geo_arg("south", 90, args=args), server.geo_arg("north", 90, args=args)
+    west, east = server.geo_arg("west", 180, args=args), server.geo_arg("east", 180, args=args)
+    if south > north:
+        raise ValueError("'south' must not be above 'north'")
+    limit = server.geo_limit(args=args)
+    return await geo_listing(request, store.bbox(south, west, north, east, limit), limit)
+
+
+@route("/incidents/knn")
+async def get_incidents_knn(request):
+    args = request.query_params
+    lat, lng = server.geo_arg("lat", 90, args=args), server.geo_arg("lng", 180, args=args)
+    max_km = server.geo_arg("max_km", required=False, args=args)
+    k = server.geo_limit("k", 10, args=args)
+    return await geo_listing(request, store.knn(lat, lng, k, max_km), k)
+
+
+# === SOCKET.IO ===
+
+@sio.on("connect")
+async def on_connect(sid, environ, auth=None):
+    server.broadcaster.connect(sid)
+
+
+@sio.on("disconnect")
+async def on_disconnect(sid, *args):
+    server.broadcaster.disconnect(sid)
+
+
+@sio.on("subscribe_viewport")
+async def on_subscribe_viewport(sid, data=None):
+    try:
+        rooms = server.broadcaster.subscribe(sid, data or {})
+        return {"status": "success", "rooms": len(rooms)}
+    except (KeyError, TypeError, ValueError):
+        return {"status": "error", "message": "Expected south/west/north/east or geohashes"}
+
+
+@sio.on("unsubscribe_viewport")
+async def on_unsubscribe_viewport(sid, *args):
+    server.broadcaster.unsubscribe(sid)
+    return {"status": "success"}
+
+
+@sio.on("subscribe_moderation")
+async def on_subscribe_moderation(sid, *args):
+    server.moderation_feed.join(sid)
+    return {"status": "success"}
+
+
+@sio.on("unsubscribe_moderation")
+async def on_unsubscribe_moderation(sid, *args):
+    server.moderation_feed.leave(sid)
+    return {"status": "success"}
+
+
+# === APPLICATION ===
+
+async def startup():
+    global store, pool
+    emitter.loop = asyncio.get_running_loop()
+    if isinstance(server.store, MongoStore):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(MONGO_URI, event_listeners=[CommandTimer()], **POOL_OPTIONS)
+        store = Store(client[MONGO_DB])
+    pool = make_pool()
+    server.classification.registry = PooledRegistry(server.model_registry, pool)
+    server.hotspot_engine.cluster = pooled_cluster(pool)
+    await run_in_threadpool(server.warm_up)
+
+
+async def shutdown():
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+api = Starlette(routes=routes + [Mount("/", WSGIMiddleware(server.app))])
+application = socketio.ASGIApp(sio, other_asgi_app=api, on_startup=startup, on_shutdown=shutdown)
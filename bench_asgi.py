@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+import numpy as np
+import socketio
+
+
+# Threaded Flask server vs. the ASGI app under the same concurrent load.
+# Both are started as subprocesses on the in-memory store; each route is hit
+# by `concurrency` clients in a closed loop while Socket.IO clients stay
+# connected to a viewport, so /report also pays for the fan-out. Reports
+# p50/p99 latency, throughput and errors per mode, route and concurrency.
+#   python bench_asgi.py [--modes sync asgi] [--concurrency 16 64]
+#                        [--duration 10] [--sockets 200] [--out FILE]
+# The asgi mode needs uvicorn, starlette and a2wsgi; the clients need aiohttp.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+MODES = {
+    "sync": [sys.executable, "-c",
+             "import sys, app; app.warm_up(); "
+             "app.socketio.run(app.app, port=int(sys.argv[1]), allow_unsafe_werkzeug=True)"],
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi:application", "--log-level", "warning", "--port"],
+}
+SEED_INCIDENTS = 2_000
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 0.5
+TEXTS = [
+    "Robbery reported at local bank", "Fire broke out in apartment building",
+    "Congratulations! You have won a brand new car!", "Masjid ke bahar jhagda hua",
+    "Multiple gunshots heard in downtown area", "Claim your free hotel stay now!",
+]
+SEVERITIES = ["low", "medium", "high"]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def point():
+    return (CENTER[0] + random.uniform(-SPREAD_DEG, SPREAD_DEG),
+            CENTER[1] + random.uniform(-SPREAD_DEG, SPREAD_DEG))
+
+
+def report_body(i):
+    lat, lng = point()
+    return {"location": f"Block {i}", "severity": SEVERITIES[i % len(SEVERITIES)],
+            "description": f"{TEXTS[i % len(TEXTS)]} a{i}", "latitude": lat, "longitude": lng}
+
+
+def requests_for(name):
+    # i -> (method, path, json body)
+    if name == "classify":
+        return lambda i: ("POST", "/check_spam", {"description": f"{TEXTS[i % len(TEXTS)]} c{i}"})
+    if name == "report":
+        return lambda i: ("POST", "/report", report_body(i))
+    if name == "incidents":
+        return lambda i: ("GET", "/incidents?limit=50", None)
+    if name == "near":
+        return lambda i: ("GET", "/incidents/near?lat=%f&lng=%f&radius_km=5" % point(), None)
+    raise ValueError(name)
+
+
+ROUTES = ("classify", "report", "incidents", "near")
+
+
+async def wait_ready(base, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                async with session.get(base + "/") as r:
+                    if r.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def seed(session, base):
+    # Reports go in unmoderated; the sync and asgi runs see the same counts
+    for start in range(0, SEED_INCIDENTS, 500):
+        lines = "\n".join(json.dumps(report_body(start + i)) for i in range(500))
+        async with session.post(base + "/report/bulk", data=lines,
+                                headers={"Content-Type": "application/x-ndjson"}) as r:
+            await r.read()
+
+
+async def load(session, base, make_request, concurrency, duration):
+    samples, errors = [], [0]
+    counter = iter(range(10 ** 9))
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < deadline:
+            method, path, body = make_request(next(counter))
+            t0 = time.perf_counter()
+            try:
+                async with session.request(method, base + path, json=body) as r:
+                    await r.read()
+                    if r.status >= 400:
+                        errors[0] += 1
+                        continue
+            except aiohttp.ClientError:
+                errors[0] += 1
+                continue
+            samples.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(samples) * 1000, errors[0], time.perf_counter() - start
+
+
+async def connect_sockets(base, n):
+    clients, received = [], [0]
+    for _ in range(n):
+        client = socketio.AsyncClient(reconnection=False)
+
+        def count(*args):
+            received[0] += 1
+        client.on("incident_delta", count)
+        client.on("new_incident", count)
+        await client.connect(base, transports=["websocket"])
+        lat, lng = point()
+        await client.call("subscribe_viewport", {"south": lat - 0.2, "west": lng - 0.2,
+                                                 "north": lat + 0.2, "east": lng + 0.2})
+        clients.append(client)
+    return clients, received
+
+
+async def bench_mode(mode, args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, STORE_BACKEND="memory")
+    proc = subprocess.Popen(MODES[mode] + [str(port)], cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = []
+    try:
+        await wait_ready(base, proc)
+        connector = aiohttp.TCPConnector(limit=max(args.concurrency))
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await seed(session, base)
+            clients, received = await connect_sockets(base, args.sockets)
+            for name in args.routes:
+                for concurrency in args.concurrency:
+                    before = received[0]
+                    ms, errors, elapsed = await load(session, base, requests_for(name), concurrency, args.duration)
+                    result = {
+                        "name": f"{mode} {name} c={concurrency}",
+                        "mode": mode,
+                        "route": name,
+                        "concurrency": concurrency,
+                        "ops": len(ms),
+                        "errors": errors,
+                        "p50_ms": round(float(np.percentile(ms, 50)), 3) if len(ms) else None,
+                        "p99_ms": round(float(np.percentile(ms, 99)), 3) if len(ms) else None,
+                        "throughput": round(len(ms) / elapsed, 1),
+                        "socket_events": received[0] - before,
+                    }
+                    print(f"  {result['name']:<24} | p50 {result['p50_ms'] or 0:8.2f} ms"
+                          f" | p99 {result['p99_ms'] or 0:8.2f} ms | {result['throughput']:8.0f} req/s"
+                          f" | {errors} errors | {result['socket_events']} events")
+                    results.append(result)
+            for client in clients:
+                await client.disconnect()
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the threaded and ASGI servers under load")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=list(ROUTES))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per route and concurrency")
+    parser.add_argument("--sockets", type=int, default=200, help="connected Socket.IO clients")
+    parser.add_argument("--out", help="results file (default bench_results/asgi-<time>.json)")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        print(mode)
+        results.extend(asyncio.run(bench_mode(mode, args)))
+
+    run = {
+        "time": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sockets": args.sockets,
+        "duration_s": args.duration,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"asgi-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
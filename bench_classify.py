@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+import warnings
+
+from classifier import MicroBatcher
+from model_registry import ModelRegistry
+
+# Classification latency/throughput: one transform+predict per description
+# (old path) vs. one batched pass, at batch sizes 1, 32 and 512, plus the
+# micro-batcher under concurrent single-item callers.
+#   python bench_classify.py
+
+warnings.filterwarnings("ignore")
+TEXTS = [
+    "Robbery reported at local bank", "Fire broke out in apartment building",
+    "Congratulations! You have won a brand new car!", "Masjid ke bahar jhagda hua",
+    "Multiple gunshots heard in downtown area", "Claim your free hotel stay now!",
+    "Traffic accident involving three vehicles", "Warehouse mein aag lag gayi",
+]
+TOTAL = 4096
+
+
+def load_classifier():
+    # The sklearn pickles of the current version in models/
+    return ModelRegistry(prefer_compact=False).load()
+
+
+def single_path(clf, texts):
+    for text in texts:
+        clf.spam_model.predict(clf.spam_vectorizer.transform([text]))
+        clf.incident_model.predict(clf.incident_vectorizer.transform([text]))
+
+
+def bench_batches(clf, texts):
+    start = time.perf_counter()
+    single_path(clf, texts)
+    base = time.perf_counter() - start
+    print(f"per-item (old)   | {base / len(texts) * 1e6:8.1f} us/item | {len(texts) / base:9.0f} items/s")
+    for size in (1, 32, 512):
+        start = time.perf_counter()
+        for i in range(0, len(texts), size):
+            clf.classify(texts[i:i + size])
+        elapsed = time.perf_counter() - start
+        batch_ms = elapsed / (len(texts) / size) * 1000
+        print(f"batch={size:<4}       | {elapsed / len(texts) * 1e6:8.1f} us/item | {len(texts) / elapsed:9.0f} items/s | {batch_ms:7.2f} ms/batch")
+
+
+def bench_micro_batcher(clf, texts, threads=32):
+    batcher = MicroBatcher(clf.classify, max_batch=64, max_wait=0.002)
+    per_thread = len(texts) // threads
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(chunk):
+        local = []
+        for text in chunk:
+            t0 = time.perf_counter()
+            batcher.submit(text)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=caller, args=(texts[i * per_thread:(i + 1) * per_thread],)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    avg_batch = batcher.stats["items"] / max(1, batcher.stats["batches"])
+    print(f"micro-batcher x{threads} | {len(latencies) / elapsed:9.0f} items/s | p50 {p50:.2f} ms | p99 {p99:.2f} ms | avg batch {avg_batch:.1f}")
+
+
+if __name__ == "__main__":
+    clf = load_classifier()
+    rng = random.Random(0)
+    texts = [rng.choice(TEXTS) + f" #{i}" for i in range(TOTAL)]
+    bench_batches(clf, texts)
+    bench_micro_batcher(clf, texts)
@@ -0,0 +1,62 @@
+import random
+import time
+
+from dedupe import NUM_HASHES, DuplicateIndex, text_fingerprint
+
+# Duplicate-report lookup latency against an index of 1M recent reports
+# spread over a metro area and a 30 minute window.
+#   python bench_dedupe.py
+
+N = 1_000_000
+LOOKUPS = 5_000
+CENTER = (33.6844, 73.0479)
+SPREAD_DEG = 0.5
+
+SAMPLES = [
+    "Fire broke out in apartment building near the main market",
+    "Multiple gunshots heard in downtown area near the bank",
+    "Traffic accident involving three vehicles on the highway",
+    "Warehouse mein aag lag gayi, fire brigade bulayi gayi",
+]
+
+
+def main():
+    rng = random.Random(7)
+    index = DuplicateIndex(window_minutes=30, radius_km=1.0)
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(N):
+        lat = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        lng = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        index.add(i, (rng.randbytes(NUM_HASHES * 4), frozenset([f"w{i}"])), lat, lng, now - rng.uniform(0, 1800))
+    print(f"indexed {len(index):,} reports in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    fingerprints = [text_fingerprint(rng.choice(SAMPLES) + f" #{i}") for i in range(LOOKUPS)]
+    hash_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+    print(f"fingerprint      | {hash_us:7.1f} us/report")
+
+    latencies = []
+    for fp in fingerprints:
+        lat = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        lng = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        t0 = time.perf_counter()
+        index.find(fp, lat, lng, now)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"lookup (miss)    | p50 {p50:7.1f} us | p99 {p99:7.1f} us")
+
+    # Hits: near-identical text at almost the same place
+    text = SAMPLES[0]
+    index.add("canonical", text_fingerprint(text), CENTER[0], CENTER[1], now)
+    t0 = time.perf_counter()
+    for _ in range(LOOKUPS):
+        found = index.find(text_fingerprint(text + "!!"), CENTER[0] + 0.001, CENTER[1], now)
+    hit_us = (time.perf_counter() - t0) / LOOKUPS * 1e6
+    print(f"lookup (hit)     | {hit_us:7.1f} us incl. fingerprint | found={found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import time
+
+from dispatch import AlertDispatcher, FakeTransport
+
+# Alert dispatch throughput against fake transports (no network).
+#   python bench_dispatch.py
+
+JOBS = 20_000
+LATENCY = 0.0005  # simulated per-send network latency in seconds
+
+
+def run(workers, failure_rate):
+    email = FakeTransport(latency=LATENCY, failure_rate=failure_rate, seed=1)
+    sms = FakeTransport(latency=LATENCY, failure_rate=failure_rate, seed=2)
+    dispatcher = AlertDispatcher({"email": email, "sms": sms}, workers=workers,
+                                 queue_size=JOBS * 2, max_retries=3, backoff=0.01)
+    start = time.perf_counter()
+    for i in range(JOBS // 2):
+        dispatcher.enqueue("email", f"user{i}@example.com", "Fire reported nearby", subject="Alert")
+        dispatcher.enqueue("sms", f"+1{i:010d}", "Fire reported nearby")
+    enqueue_s = time.perf_counter() - start
+    dispatcher.stop()
+    total_s = time.perf_counter() - start
+    stats = dispatcher.stats
+    print(f"workers={workers:>2} fail={failure_rate:.0%} | enqueue {enqueue_s * 1e6 / JOBS:5.1f} us/job"
+          f" | {stats['sent'] / total_s:9.0f} sends/s | retried {stats['retried']:>5} | dead {stats['dead']}")
+
+
+if __name__ == "__main__":
+    for workers in (1, 4, 16):
+        run(workers, 0.0)
+    run(16, 0.05)
@@ -0,0 +1,94 @@
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from database import MemoryStore, MongoStore
+from geo import haversine_np, to_point
+
+# Latency of /incidents/near, /bbox and /knn at up to 1M incidents, against
+# the in-memory grid by default or a local mongod (2dsphere) with --mongod.
+# The numpy full scan is what answering without an index costs.
+#   python bench_geo.py [N] [--mongod]
+
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 3.0
+QUERIES = 200
+RADIUS_KM = 2
+BOX_DEG = 0.1
+K = 10
+INSERT_BATCH = 10_000
+
+
+def make_store(use_mongod):
+    store = MongoStore(db_name="bench_geo") if use_mongod else MemoryStore("bench_geo")
+    store.incidents.drop()
+    store.ensure_indexes()
+    return store
+
+
+def populate(store, n, rng):
+    lats = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    lngs = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    now = datetime.utcnow()
+    for start in range(0, n, INSERT_BATCH):
+        store.incidents.insert_many([{
+            "type": "theft",
+            "latitude": float(lats[i]),
+            "longitude": float(lngs[i]),
+            "location_point": to_point(lats[i], lngs[i]),
+            "timestamp": now,
+            "approved": True,
+            "flagged": False,
+            "spam": False,
+        } for i in range(start, min(start + INSERT_BATCH, n))])
+    return lats, lngs
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def timed(fn, points):
+    samples, sizes = [], []
+    for point in points:
+        start = time.perf_counter()
+        docs = list(fn(*point))
+        samples.append(time.perf_counter() - start)
+        sizes.append(len(docs))
+    return samples, np.mean(sizes)
+
+
+def report(name, samples, size):
+    p50, p99 = percentiles(samples)
+    print(f"  {name:<6} | p50 {p50:8.3f} ms | p99 {p99:8.3f} ms | {size:6.1f} results")
+
+
+def run(n, use_mongod, rng):
+    store = make_store(use_mongod)
+    start = time.perf_counter()
+    lats, lngs = populate(store, n, rng)
+    print(f"{n:,} incidents ({'mongod' if use_mongod else 'memory'}) loaded in {time.perf_counter() - start:.1f}s")
+
+    points = [(CENTER[0] + rng.uniform(-2, 2), CENTER[1] + rng.uniform(-2, 2)) for _ in range(QUERIES)]
+    boxes = [(lat, lng, lat + BOX_DEG, lng + BOX_DEG) for lat, lng in points]
+    report("near", *timed(lambda lat, lng: store.near(lat, lng, RADIUS_KM, 500), points))
+    report("bbox", *timed(lambda s, w, n_, e: store.bbox(s, w, n_, e, 500), boxes))
+    report("knn", *timed(lambda lat, lng: store.knn(lat, lng, K), points))
+    samples, sizes = [], []
+    for lat, lng in points[:20]:
+        start = time.perf_counter()
+        dists = haversine_np(lat, lng, lats, lngs)
+        sizes.append(len(np.sort(dists[dists <= RADIUS_KM])))
+        samples.append(time.perf_counter() - start)
+    report("scan", samples, np.mean(sizes))
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    sizes = [int(args[0])] if args else [100_000, 1_000_000]
+    rng = np.random.default_rng(42)
+    for n in sizes:
+        run(n, "--mongod" in sys.argv, rng)
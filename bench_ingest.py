@@ -0,0 +1,127 @@
+import io
+import json
+import random
+import sys
+import time
+import warnings
+from datetime import datetime
+
+from classify_cache import CachedClassifier
+from database import MemoryStore, MongoStore
+from dedupe import DuplicateIndex, text_fingerprint
+from ingest import IngestPipeline, read_ndjson, read_csv, validate_report, build_incident
+from keywords import KeywordMatcher
+from model_registry import ModelRegistry
+
+# Bulk ingest throughput: NDJSON and CSV feeds through validate ->
+# dedupe -> batch classify -> insert_many, against the in-memory store by default
+# or a local mongod with --mongod, next to the one-report-at-a-time path.
+#   python bench_ingest.py [N] [--mongod]
+
+warnings.filterwarnings("ignore")
+N = 50_000
+PER_REPORT_N = 5_000
+CENTER = (33.6844, 73.0479)
+SPREAD_DEG = 0.5
+STREETS = ["Main Boulevard", "Jinnah Avenue", "Mall Road", "Canal Road", "GT Road", "Murree Road"]
+EVENTS = [
+    "Robbery reported at {} near the bank, two men on a motorcycle",
+    "Fire broke out in an apartment building on {}",
+    "Traffic accident involving three vehicles on {}",
+    "{} par mobile snatching, larka bhaag gaya",
+    "Multiple gunshots heard near {} market",
+    "Congratulations! Claim your free prize at {} now",
+]
+DUPLICATE_RATE = 0.05
+
+
+def make_reports(n, rng):
+    reports = []
+    for i in range(n):
+        if reports and rng.random() < DUPLICATE_RATE:
+            reports.append(dict(rng.choice(reports[-50:])))
+            continue
+        street = f"{rng.choice(STREETS)} block {rng.randint(1, 400)} house {i}"
+        reports.append({
+            "location": street,
+            "severity": rng.choice(["low", "medium", "high"]),
+            "description": rng.choice(EVENTS).format(street),
+            "latitude": round(CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+            "longitude": round(CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+        })
+    return reports
+
+
+def as_ndjson(reports):
+    return "".join(json.dumps(r) + "\n" for r in reports)
+
+
+def as_csv(reports):
+    fields = ["location", "severity", "description", "latitude", "longitude"]
+    out = io.StringIO()
+    out.write(",".join(fields) + "\n")
+    for r in reports:
+        out.write(",".join('"' + str(r[f]).replace('"', '""') + '"' for f in fields) + "\n")
+    return out.getvalue()
+
+
+def make_collection(use_mongod):
+    if use_mongod:
+        collection = MongoStore(db_name="bench_ingest").incidents
+    else:
+        collection = MemoryStore("bench_ingest").incidents
+    collection.drop()
+    return collection
+
+
+def run(name, reader, payload, collection, classifier, notified):
+    pipeline = IngestPipeline(collection, classifier, duplicate_index=DuplicateIndex(),
+                              notify=lambda docs: notified.append(len(docs)))
+    summary = pipeline.run(reader(io.StringIO(payload)))
+    print(f"{name:<7} | {summary['received']:>7,} reports | {summary['elapsed_s']:6.2f}s | "
+          f"{summary['rate']:>7,} reports/s | inserted {summary['inserted']:,} merged {summary['merged']:,} "
+          f"| {len(notified)} notifications")
+    return summary
+
+
+def per_report(reports, collection, registry, keywords):
+    # What POSTing each record to /report costs: one classify + insert_one each
+    index = DuplicateIndex()
+    start = time.perf_counter()
+    for record in reports:
+        report = validate_report(record)
+        prediction = registry.classify([report["description"]])[0]
+        match = keywords.match(report["description"])
+        prediction.update(suspicious=match["suspicious"], suspicion_score=match["score"],
+                          suspicious_terms=[t["term"] for t in match["terms"]])
+        now = datetime.utcnow()
+        fingerprint = text_fingerprint(report["description"])
+        if index.find(fingerprint, report["latitude"], report["longitude"], now) is None:
+            result = collection.insert_one(build_incident(report, prediction, now))
+            index.add(str(result.inserted_id), fingerprint, report["latitude"], report["longitude"], now)
+    elapsed = time.perf_counter() - start
+    print(f"{'single':<7} | {len(reports):>7,} reports | {elapsed:6.2f}s | {len(reports) / elapsed:>7,.0f} reports/s | /report one at a time")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else N
+    use_mongod = "--mongod" in sys.argv
+    rng = random.Random(11)
+    reports = make_reports(n, rng)
+
+    registry = ModelRegistry()
+    registry.load()
+    keywords = KeywordMatcher.from_file()
+
+    per_report(reports[:PER_REPORT_N], make_collection(use_mongod), registry, keywords)
+    for name, reader, payload in (("ndjson", read_ndjson, as_ndjson(reports)), ("csv", read_csv, as_csv(reports))):
+        # Fresh cache and collection per run so every description is classified
+        classifier = CachedClassifier(registry, keywords.match, lexicon_version=keywords.version, max_size=n)
+        collection = make_collection(use_mongod)
+        summary = run(name, reader, payload, collection, classifier, [])
+        assert collection.count_documents({}) == summary["inserted"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import MemoryStore, set_store
+from dispatch import AlertDispatcher, FakeTransport
+
+# Moderating N pending incidents one request at a time (the per-incident
+# admin routes) vs. one /admin/incidents/bulk request, on the in-memory
+# store with fake SMTP/Twilio transports. Reports wall time, the Socket.IO
+# events a map client and an admin dashboard receive, and the alert
+# messages delivered to subscribers around the incidents.
+#   python bench_moderation.py [--sizes 10 100 1000] [--subscribers 200] [--out FILE]
+
+set_store(MemoryStore("bench_moderation"))
+import app as server  # noqa: E402  (after set_store, so the app uses the memory store)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 0.05
+
+
+def point(rng):
+    return CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+
+
+def seed(rng, n):
+    now = datetime.utcnow()
+    docs = []
+    for i in range(n):
+        lat, lng = point(rng)
+        docs.append({
+            "type": "fire", "location": f"Block {i}", "severity": "high", "description": f"Fire reported {i}",
+            "latitude": lat, "longitude": lng, "location_point": {"type": "Point", "coordinates": [lng, lat]},
+            "timestamp": now - timedelta(seconds=i), "approved": False, "flagged": False, "spam": False,
+            "spam_score": round(rng.random(), 4), "suspicion_score": 0, "report_count": 1,
+        })
+    server.store.incidents.insert_many(docs)
+    server.stats_engine.add_many(docs)
+    return [str(doc["_id"]) for doc in docs]
+
+
+def run(mode, n, rng):
+    ids = seed(rng, n)
+    email, sms = FakeTransport(), FakeTransport()
+    server.alert_dispatcher = AlertDispatcher({"email": email, "sms": sms}, workers=4, max_retries=0)
+    viewer = server.socketio.test_client(server.app)
+    admin = server.socketio.test_client(server.app)
+    admin.emit("subscribe_moderation")
+    viewer.get_received()
+    admin.get_received()
+    client = server.app.test_client()
+
+    start = time.perf_counter()
+    if mode == "single":
+        for incident_id in ids:
+            client.post(f"/admin/incidents/{incident_id}/approve")
+    else:
+        for i in range(0, n, server.MAX_BULK_MODERATION):
+            client.post("/admin/incidents/bulk", json={"action": "approve",
+                                                       "ids": ids[i:i + server.MAX_BULK_MODERATION]})
+    elapsed = time.perf_counter() - start
+    server.alert_dispatcher.drain(timeout=60)
+    server.alert_dispatcher.stop()
+
+    result = {
+        "name": f"{mode} n={n}",
+        "mode": mode,
+        "incidents": n,
+        "ms": round(elapsed * 1000, 2),
+        "per_incident_ms": round(elapsed * 1000 / n, 3),
+        "map_events": len(viewer.get_received()),
+        "admin_events": len([p for p in admin.get_received() if p["name"] == "queue_update"]),
+        "alerts": len(email.sent) + len(sms.sent),
+    }
+    viewer.disconnect()
+    admin.disconnect()
+    print(f"  {result['name']:<13} | {result['ms']:9.1f} ms | {result['per_incident_ms']:7.3f} ms/incident"
+          f" | map {result['map_events']:5} | admin {result['admin_events']:5} | alerts {result['alerts']:6}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single vs. bulk moderation")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--subscribers", type=int, default=200, help="subscribers around the incidents")
+    parser.add_argument("--out", help="results file (default bench_results/moderation-<time>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for i in range(args.subscribers):
+        lat, lng = point(rng)
+        server.subscriber_index.add(f"user{i}@example.com", f"+1{i:010d}", lat, lng)
+    server.subscriber_index.load()
+
+    results = []
+    for n in args.sizes:
+        for mode in ("single", "bulk"):
+            results.append(run(mode, n, rng))
+
+    out_run = {
+        "time": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "subscribers": args.subscribers,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"moderation-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(out_run, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
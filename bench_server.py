@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from database import MemoryStore, set_store
+from dispatch import AlertDispatcher, FakeTransport
+
+# Server benchmark suite: the Flask routes through the test client and the
+# Socket.IO fan-out through simulated clients, against the in-memory store
+# (no MongoDB) and fake SMTP/Twilio transports. Every scenario reports
+# p50/p99 latency, throughput and peak traced memory; the run is saved as
+# JSON so it can be compared with an earlier one.
+#   python bench_server.py [--quick] [--only classify report ...] [--out FILE]
+#                          [--compare OLD.json] [--tolerance 0.3]
+
+set_store(MemoryStore("bench_server"))
+import app as server  # noqa: E402  (after set_store, so the app uses the memory store)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+SCENARIOS = ("classify", "report", "incidents", "hotspots", "fanout", "socketio")
+
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 0.5
+TEXTS = [
+    "Robbery reported at local bank", "Fire broke out in apartment building",
+    "Congratulations! You have won a brand new car!", "Masjid ke bahar jhagda hua",
+    "Multiple gunshots heard in downtown area", "Claim your free hotel stay now!",
+    "Traffic accident involving three vehicles", "Warehouse mein aag lag gayi",
+]
+TYPES = ["theft", "violence", "vandalism", "fraud", "harassment"]
+SEVERITIES = ["low", "medium", "high"]
+WARMUP = 10
+TRACED = 50
+INSERT_BATCH = 10_000
+
+
+def text(tag, i):
+    # Unique per call, so the classification cache is not what we measure
+    return f"{TEXTS[i % len(TEXTS)]} {tag}{i}"
+
+
+def point(rng):
+    return (float(CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)),
+            float(CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)))
+
+
+def check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def measure(name, op, ops, **extra):
+    for i in range(WARMUP):
+        op(i)
+    samples = np.empty(ops)
+    start = time.perf_counter()
+    for i in range(ops):
+        t0 = time.perf_counter()
+        op(WARMUP + i)
+        samples[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    # Peak memory in a separate pass: tracing would skew the timings
+    tracemalloc.start()
+    for i in range(TRACED):
+        op(WARMUP + ops + i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ms = samples * 1000
+    result = {
+        "name": name,
+        "ops": ops,
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "throughput": round(ops / elapsed, 1),
+        "peak_mb": round(peak / 2 ** 20, 3),
+        "elapsed_s": round(elapsed, 3),
+        **extra,
+    }
+    print(f"  {name:<24} | p50 {result['p50_ms']:8.3f} ms | p99 {result['p99_ms']:8.3f} ms"
+          f" | {result['throughput']:9.0f} ops/s | peak {result['peak_mb']:7.2f} MB")
+    return result
+
+
+# === SCENARIOS ===
+
+def bench_classify(client, rng, quick):
+    ops = 200 if quick else 2000
+    return [
+        measure("/check_spam", lambda i: check(client.post("/check_spam", json={"description": text("s", i)})), ops),
+        measure("/predict-type", lambda i: check(client.post("/predict-type", json={"description": text("t", i)})), ops),
+    ]
+
+
+def bench_report(client, rng, quick):
+    ops = 200 if quick else 2000
+
+    def op(i):
+        lat, lng = point(rng)
+        check(client.post("/report", json={
+            "location": f"Block {i}",
+            "severity": SEVERITIES[i % len(SEVERITIES)],
+            "description": text("r", i),
+            "latitude": lat,
+            "longitude": lng,
+        }))
+
+    return [measure("/report", op, ops)]
+
+
+def populate(size, rng):
+    # Refills the incidents collection with exactly `size` public incidents;
+    # leftovers from a larger size or from /report would skew the timings
+    collection = server.incidents_collection
+    collection.delete_many({})
+    now = datetime.utcnow()
+    for start in range(0, size, INSERT_BATCH):
+        n = min(INSERT_BATCH, size - start)
+        lats = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+        lngs = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+        ages = rng.uniform(0, 7 * 24, n)
+        collection.insert_many([{
+            "type": TYPES[i % len(TYPES)],
+            "location": f"Block {start + i}",
+            "severity": SEVERITIES[i % len(SEVERITIES)],
+            "description": text("p", start + i),
+            "latitude": float(lats[i]),
+            "longitude": float(lngs[i]),
+            "timestamp": now - timedelta(hours=float(ages[i])),
+            "approved": True,
+            "flagged": False,
+            "spam": False,
+            "report_count": 1,
+        } for i in range(n)])
+
+
+def sizes(quick):
+    return (1_000, 10_000) if quick else (1_000, 10_000, 100_000)
+
+
+def bench_incidents(client, rng, quick):
+    results = []
+    for size in sizes(quick):
+        populate(size, rng)
+        cursor = [None]
+
+        def op(i):
+            # Walks the pages from newest to oldest, starting over at the end
+            url = "/incidents?limit=50" + (f"&after={cursor[0]}" if cursor[0] else "")
+            cursor[0] = check(client.get(url)).get_json()["next"]
+
+        results.append(measure(f"/incidents n={size}", op, 100 if quick else 500, size=size))
+    return results
+
+
+def bench_hotspots(client, rng, quick):
+    results = []
+    for size in sizes(quick):
+        populate(size, rng)
+        server.hotspot_engine.load()
+
+        def op(i):
+            server.hotspot_engine._changed(notify=False)  # no cached clustering
+            check(client.get("/hotspots?k=5"))
+
+        results.append(measure(f"/hotspots n={size}", op, 50 if quick else 200, size=size))
+    return results
+
+
+def bench_fanout(client, rng, quick):
+    # Subscriber radius lookup + enqueue of every email/SMS for one
+    # high-severity incident; delivery happens on the dispatcher workers
+    subscribers = 2_000 if quick else 10_000
+    ops = 50 if quick else 200
+    for i in range(subscribers):
+        lat, lng = point(rng)
+        server.subscriber_index.add(f"user{i}@example.com", f"+1{i:010d}", lat, lng)
+    server.subscriber_index.load()
+    email, sms = FakeTransport(), FakeTransport()
+    dispatcher = AlertDispatcher({"email": email, "sms": sms}, workers=4, queue_size=10_000_000, max_retries=0)
+    server.alert_dispatcher = dispatcher
+
+    def op(i):
+        lat, lng = point(rng)
+        server.send_alerts_to_nearby_users({"type": "fire", "severity": "high", "location": f"Block {i}",
+                                            "description": text("f", i), "latitude": lat, "longitude": lng})
+
+    start = time.perf_counter()
+    result = measure(f"fanout subscribers={subscribers}", op, ops, subscribers=subscribers)
+    dispatcher.stop()
+    sent = len(email.sent) + len(sms.sent)
+    result["alerts_per_op"] = round(sent / (WARMUP + ops + TRACED), 1)
+    result["delivered_per_s"] = round(sent / (time.perf_counter() - start), 1)
+    print(f"  {'':<24} | {result['alerts_per_op']:.0f} alerts/incident | {result['delivered_per_s']:9.0f} delivered/s")
+    return [result]
+
+
+def bench_socketio(client, rng, quick):
+    results = []
+    for n in ((100,) if quick else (100, 1_000)):
+        clients = [server.socketio.test_client(server.app) for _ in range(n)]
+        # Half stay on the legacy global broadcast, half follow a viewport
+        for c in clients[::2]:
+            lat, lng = point(rng)
+            c.emit("subscribe_viewport", {"south": lat - 0.1, "west": lng - 0.1,
+                                          "north": lat + 0.1, "east": lng + 0.1}, callback=True)
+        for c in clients:
+            c.get_received()
+        delivered = [0]
+
+        def op(i):
+            lat, lng = point(rng)
+            server.broadcaster.publish({"_id": f"bench{i}", "type": "theft", "severity": "high",
+                                        "description": text("b", i), "latitude": lat, "longitude": lng,
+                                        "timestamp": datetime.utcnow().isoformat()})
+            if i % 20 == 0:
+                delivered[0] += sum(len(c.get_received()) for c in clients)
+
+        result = measure(f"socketio clients={n}", op, 100 if quick else 500, clients=n)
+        delivered[0] += sum(len(c.get_received()) for c in clients)
+        ops = WARMUP + result["ops"] + TRACED
+        result["events_per_op"] = round(delivered[0] / ops, 1)
+        result["events_per_s"] = round(result["events_per_op"] * result["throughput"], 1)
+        print(f"  {'':<24} | {result['events_per_op']:.1f} events/incident | {result['events_per_s']:9.0f} events/s")
+        for c in clients:
+            c.disconnect()
+        results.append(result)
+    return results
+
+
+# === RESULTS ===
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    # Regression: p99 slower or throughput lower than the baseline by more than `tolerance`
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nvs {baseline_path}")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None:
+            continue
+        p99 = r["p99_ms"] / old["p99_ms"] if old["p99_ms"] else 1.0
+        rate = r["throughput"] / old["throughput"] if old["throughput"] else 1.0
+        slower = p99 > 1 + tolerance or rate < 1 / (1 + tolerance)
+        if slower:
+            regressions.append(r["name"])
+        print(f"  {r['name']:<24} | p99 x{p99:5.2f} | throughput x{rate:5.2f}{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crime alert server")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a smoke run")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--out", help="results file (default bench_results/server-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    client = server.app.test_client()
+    results = []
+    for name in SCENARIOS:
+        if name in args.only:
+            print(name)
+            results.extend(globals()[f"bench_{name}"](client, rng, args.quick))
+
+    run = {
+        "time": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"server-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nSaved {out}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
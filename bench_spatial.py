@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+
+from geo import GridIndex, haversine
+
+# Compares the old per-user haversine loop with the grid index + vectorized
+# filter used by send_alerts_to_nearby_users.
+#   python bench_spatial.py
+
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 3.0
+RADIUS_KM = 20
+QUERIES = 20
+
+
+def make_users(n, rng):
+    lats = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    lngs = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    return [{"email": f"user{i}@example.com", "lat": float(lats[i]), "lng": float(lngs[i])} for i in range(n)]
+
+
+def linear_scan(users, lat, lng):
+    return [u for u in users if haversine(lat, lng, u["lat"], u["lng"]) <= RADIUS_KM]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def run(n, rng):
+    users = make_users(n, rng)
+    start = time.perf_counter()
+    grid = GridIndex(cell_km=10)
+    for i, u in enumerate(users):
+        grid.add(i, u["lat"], u["lng"], u)
+    build_s = time.perf_counter() - start
+
+    points = [(CENTER[0] + rng.uniform(-1, 1), CENTER[1] + rng.uniform(-1, 1)) for _ in range(QUERIES)]
+    scan_repeat = 1 if n >= 1_000_000 else 3
+    scan_ms, grid_ms = 0.0, 0.0
+    for lat, lng in points[:scan_repeat]:
+        ms, expected = timed(lambda: linear_scan(users, lat, lng), 1)
+        scan_ms += ms / scan_repeat
+        found = grid.query_radius(lat, lng, RADIUS_KM)
+        assert len(found) == len(expected), (len(found), len(expected))
+    for lat, lng in points:
+        ms, _ = timed(lambda: grid.query_radius(lat, lng, RADIUS_KM), 5)
+        grid_ms += ms / len(points)
+
+    print(f"{n:>9,} users | build {build_s:6.2f}s | linear {scan_ms:9.2f} ms | grid {grid_ms:7.3f} ms | speedup {scan_ms / grid_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    for n in (10_000, 100_000, 1_000_000):
+        run(n, rng)
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Cold start of a server process: import time of app.py (models included),
+# warm_up() over SEED_INCIDENTS stored incidents, and the latency of the
+# first and second request to each route, `--idle` seconds after warm_up
+# (time a new worker usually waits for its first traffic). Every run is a
+# fresh interpreter on the in-memory store. Compares the default start with
+# FAST_START=1 and saves the medians as JSON.
+#   python bench_startup.py [--runs 5] [--idle 0] [--modes default fast] [--out FILE]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+SEED_INCIDENTS = 5_000
+MODES = {"default": {}, "fast": {"FAST_START": "1"}}
+REQUESTS = [
+    ("check_spam", "POST", "/check_spam", {"description": "Robbery reported at local bank"}),
+    ("report", "POST", "/report", {"location": "Block 1", "severity": "high",
+                                   "description": "Fire broke out in apartment building",
+                                   "latitude": 33.68, "longitude": 73.04}),
+    ("incidents", "GET", "/incidents?limit=50", None),
+    ("hotspots", "GET", "/hotspots?k=3", None),
+    ("stats", "GET", "/stats", None),
+]
+
+
+def seed(collection):
+    # Approved incidents around one city, what warm_up() and /hotspots load
+    now = datetime.utcnow()
+    collection.insert_many([{
+        "type": "theft", "location": f"Block {i}", "severity": "medium",
+        "description": f"Incident {i}", "latitude": 33.68 + (i % 100) * 0.004, "longitude": 73.04 + (i // 100) * 0.004,
+        "timestamp": now - timedelta(minutes=i), "approved": True, "flagged": False, "spam": False, "report_count": 1,
+    } for i in range(SEED_INCIDENTS)])
+
+
+def child(idle):
+    # One cold start; prints a JSON line on stdout
+    started = time.perf_counter()
+    import app as server
+    imported = time.perf_counter()
+    seed(server.store.incidents)
+    seeded = time.perf_counter()
+    server.warm_up()
+    warmed = time.perf_counter()
+    time.sleep(idle)
+    client = server.app.test_client()
+    result = {"import_s": imported - started, "warm_up_s": warmed - seeded}
+    for name, method, path, body in REQUESTS:
+        for attempt in ("first", "second"):
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            result[f"{name}_{attempt}_ms"] = (time.perf_counter() - t0) * 1000
+            if response.status_code >= 400:
+                result[f"{name}_status"] = response.status_code
+    result["ready_s"] = warmed - started - (seeded - imported)
+    print(json.dumps(result), flush=True)
+    sys.stdout.flush()
+    os._exit(0)  # skip waiting on the watcher and dispatcher threads
+
+
+def run_once(mode, idle):
+    env = dict(os.environ, STORE_BACKEND="memory", **MODES[mode])
+    t0 = time.perf_counter()
+    output = subprocess.run([sys.executable, __file__, "--child", "--idle", str(idle)], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - t0
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_s"] = wall  # interpreter start to exit, as seen from outside
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=0.0, help="seconds between warm_up and the first request")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--out", help="results file (default bench_results/startup-<time>.json)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.idle)
+
+    results = []
+    for mode in args.modes:
+        runs = [run_once(mode, args.idle) for _ in range(args.runs)]
+        medians = {key: round(statistics.median(r[key] for r in runs), 4)
+                   for key in runs[0] if not key.endswith("_status")}
+        errors = sorted({key for r in runs for key in r if key.endswith("_status")})
+        results.append({"name": mode, "runs": args.runs, "errors": errors, **medians})
+        print(f"{mode:<8} | import {medians['import_s'] * 1000:7.1f} ms | warm_up {medians['warm_up_s'] * 1000:7.1f} ms"
+              f" | ready {medians['ready_s'] * 1000:7.1f} ms | process {medians['process_s'] * 1000:7.1f} ms")
+        for name, _, _, _ in REQUESTS:
+            print(f"{'':<8} | {name:<12} first {medians[f'{name}_first_ms']:8.2f} ms"
+                  f" | second {medians[f'{name}_second_ms']:8.2f} ms")
+        if errors:
+            print(f"{'':<8} | errors: {', '.join(errors)}")
+
+    run = {
+        "time": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "idle_s": args.idle,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"startup-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from database import MemoryStore
+from stats import StatsEngine
+
+# Dashboard queries answered from the stats counters vs the $group
+# aggregation a cold query would otherwise run over the whole collection.
+#   python bench_stats.py
+
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 3.0
+TYPES = ["theft", "violence", "vandalism", "fraud", "harassment"]
+SEVERITIES = ["low", "medium", "high"]
+QUERIES = [
+    {"status": "all"},
+    {"group": "type"},
+    {"group": "severity", "status": "all"},
+    {"group": "cell"},
+    {"group": "hour", "type": "theft"},
+    {"group": "type", "severity": "high"},
+]
+
+
+def make_incidents(n, rng):
+    now = datetime.utcnow()
+    lats = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    lngs = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    ages = rng.uniform(0, 30 * 24, n)
+    state = rng.random(n)
+    return [{
+        "type": TYPES[i % len(TYPES)],
+        "severity": SEVERITIES[i % len(SEVERITIES)],
+        "latitude": float(lats[i]),
+        "longitude": float(lngs[i]),
+        "timestamp": now - timedelta(hours=float(ages[i])),
+        "approved": bool(state[i] < 0.7),
+        "flagged": bool(0.7 <= state[i] < 0.75),
+        "spam": bool(state[i] >= 0.95),
+    } for i in range(n)]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def run(n, rng):
+    collection = MemoryStore("bench_stats").incidents
+    collection.insert_many(make_incidents(n, rng))
+    engine = StatsEngine(collection)
+    scan_ms, _ = timed(engine.reconcile, 1)
+
+    query_ms = 0.0
+    for params in QUERIES:
+        # Fresh counters each time so the result cache is not what we measure
+        engine._changed()
+        ms, _ = timed(lambda: engine.query(**params), 1)
+        query_ms += ms / len(QUERIES)
+
+    start = time.perf_counter()
+    doc = {"type": "theft", "severity": "high", "latitude": CENTER[0], "longitude": CENTER[1],
+           "timestamp": datetime.utcnow(), "approved": False, "flagged": False, "spam": False}
+    for _ in range(10_000):
+        engine.update(doc, {**doc, "approved": True})
+        engine.update({**doc, "approved": True}, doc)
+    update_us = (time.perf_counter() - start) / 20_000 * 1e6
+
+    print(f"{n:>9,} incidents | aggregation {scan_ms:9.1f} ms | query {query_ms:7.3f} ms | "
+          f"update {update_us:5.1f} us | {len(engine.cube):,} counter keys")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    for n in (10_000, 100_000, 300_000):
+        run(n, rng)
@@ -0,0 +1,79 @@
+import json
+import time
+
+import numpy as np
+
+from database import MemoryStore
+from tiles import TileIndex, mercator
+
+# Clustered /tiles/z/x/y against shipping every incident to the browser.
+# Tiles are rendered cold (cache cleared) for a 1280x800 viewport's worth
+# of tiles at several zooms over a city.
+#   python bench_tiles.py
+
+CENTER = (33.6844, 73.0479)  # Islamabad
+SPREAD_DEG = 1.0
+ZOOMS = (4, 8, 11, 13, 15, 17)
+VIEWPORT_TILES = (5, 4)  # 1280 x 800 px at 256 px tiles
+SEVERITIES = ["low", "medium", "high"]
+
+
+def populate(n, rng):
+    store = MemoryStore("bench_tiles")
+    lats = CENTER[0] + rng.normal(0, SPREAD_DEG / 3, n)
+    lngs = CENTER[1] + rng.normal(0, SPREAD_DEG / 3, n)
+    store.incidents.insert_many([{
+        "type": "theft",
+        "severity": SEVERITIES[i % 3],
+        "description": "Phone snatched near the market by two men on a motorbike",
+        "location": "Blue Area",
+        "latitude": float(lats[i]),
+        "longitude": float(lngs[i]),
+        "approved": True,
+        "flagged": False,
+        "spam": False,
+    } for i in range(n)])
+    return store
+
+
+def viewport(z):
+    x, y = mercator([CENTER[0]], [CENTER[1]])
+    cx, cy = int(x[0] * (1 << z)), int(y[0] * (1 << z))
+    w, h = VIEWPORT_TILES
+    return [(z, tx, ty) for tx in range(cx - w // 2, cx - w // 2 + w) for ty in range(cy - h // 2, cy - h // 2 + h)
+            if 0 <= tx < 1 << z and 0 <= ty < 1 << z]
+
+
+def run(n, rng):
+    store = populate(n, rng)
+    index = TileIndex(store.incidents)
+    start = time.perf_counter()
+    index.load()
+    load_s = time.perf_counter() - start
+    full_bytes = len(json.dumps([{k: v for k, v in d.items() if k != "_id"} for d in store.incidents.find()]))
+    print(f"{n:,} incidents | index built in {load_s:.2f}s | all incidents as JSON {full_bytes / 1e6:.1f} MB")
+    for z in ZOOMS:
+        tiles = viewport(z)
+        index.cache.clear()
+        samples, size, clusters = [], 0, 0
+        for t in tiles:
+            start = time.perf_counter()
+            data = index.tile(*t)
+            samples.append(time.perf_counter() - start)
+            size += len(json.dumps(data))
+            clusters += len(data)
+        ms = np.array(samples) * 1000
+        print(f"  z{z:<2} | {len(tiles):2} tiles | p50 {np.percentile(ms, 50):6.2f} ms | p99 {np.percentile(ms, 99):6.2f} ms "
+              f"| {clusters:5} clusters | {size / 1e3:7.1f} kB")
+    doc = {"latitude": CENTER[0], "longitude": CENTER[1], "severity": "high", "type": "theft"}
+    start = time.perf_counter()
+    for i in range(200):
+        index.add(f"bench{i}", doc)
+        index.tile(0, 0, 0)
+    print(f"  approve + re-render z0: {(time.perf_counter() - start) / 200 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    for n in (10_000, 100_000, 1_000_000):
+        run(n, rng)
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import stage
+
+SPAM_LABELS = {1, True, "1", "spam"}
+
+
+def is_spam_label(label):
+    # Dummy models predict 0/1, train_model.py predicts "real"/"spam"
+    if hasattr(label, "item"):
+        label = label.item()
+    return label in SPAM_LABELS
+
+
+def predict_spam(model, X):
+    # (is_spam, spam_score) per row; the score is P(spam) when the model
+    # gives probabilities, else the verdict as 0/1. One pass either way:
+    # the predicted label is the most probable class.
+    if hasattr(model, "predict_proba"):
+        spam_columns = [i for i, label in enumerate(model.classes_) if is_spam_label(label)]
+        proba = model.predict_proba(X)
+        labels = model.classes_[proba.argmax(axis=1)]
+        scores = proba[:, spam_columns].sum(axis=1)
+        return [(is_spam_label(label), round(float(score), 4)) for label, score in zip(labels, scores)]
+    return [(s, 1.0 if s else 0.0) for s in map(is_spam_label, model.predict(X))]
+
+
+# === BATCH CLASSIFICATION ===
+# Spam and type are predicted in one pass over a whole batch: each
+# vectorizer transforms the batch once (once total when both models share
+# a vectorizer), and each model predicts once on the sparse matrix.
+
+class Classifier:
+    def __init__(self, spam_model=None, spam_vectorizer=None, incident_model=None, incident_vectorizer=None, version=None):
+        self.version = version
+        self.spam_model = spam_model
+        self.spam_vectorizer = spam_vectorizer
+        self.incident_model = incident_model
+        self.incident_vectorizer = incident_vectorizer
+
+    @property
+    def has_spam(self):
+        return self.spam_model is not None and self.spam_vectorizer is not None
+
+    @property
+    def has_type(self):
+        return self.incident_model is not None and self.incident_vectorizer is not None
+
+    def classify(self, descriptions):
+        descriptions = list(descriptions)
+        if not descriptions:
+            return []
+        spam = [(None, None)] * len(descriptions)
+        types = [None] * len(descriptions)
+        X_spam = None
+        if self.has_spam:
+            with stage("vectorize"):
+                X_spam = self.spam_vectorizer.transform(descriptions)
+            with stage("predict"):
+                spam = predict_spam(self.spam_model, X_spam)
+        if self.has_type:
+            if X_spam is not None and self.incident_vectorizer is self.spam_vectorizer:
+                X_type = X_spam
+            else:
+                with stage("vectorize"):
+                    X_type = self.incident_vectorizer.transform(descriptions)
+            with stage("predict"):
+                types = [str(label) for label in self.incident_model.predict(X_type)]
+        return [{"is_spam": s, "spam_score": score, "predicted_type": t} for (s, score), t in zip(spam, types)]
+
+
+# === MICRO-BATCHER ===
+# Concurrent single-item requests are coalesced by a background thread into
+# one batch call: the first item opens a window of `max_wait` seconds (or
+# until `max_batch` items arrive) and every caller gets its own result.
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch=64, max_wait=0.002):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {"batches": 0, "items": 0}
+        self.in_flight = 0  # submitted, not answered yet
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self.thread.start()
+
+    def submit(self, item, timeout=5.0):
+        self.start()
+        future = Future()
+        with self.lock:
+            self.in_flight += 1
+        self.queue.put((item, future))
+        return future.result(timeout)
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        self._drain(batch)
+        # Only wait for more when other callers are between submit and put;
+        # a lone request is answered right away
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            with self.lock:
+                others = self.in_flight > len(batch)
+            remaining = deadline - time.monotonic()
+            if not others or remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            self._drain(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.fn(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self._done(batch)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            self._done(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _done(self, batch):
+        with self.lock:
+            self.in_flight -= len(batch)
@@ -0,0 +1,261 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from classifier import MicroBatcher
+
+# Same token pattern as the vectorizers, so texts that differ only in case,
+# punctuation, whitespace or one-letter tokens share a key and are
+# guaranteed to get the same prediction.
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def normalize(text):
+    return " ".join(TOKEN_RE.findall(text.lower()))
+
+
+def copy_result(value):
+    # Cached results are shared; callers get their own lists (suspicious_terms)
+    return {k: list(v) if isinstance(v, list) else v for k, v in value.items()}
+
+
+# === STORES ===
+
+class LRUStore:
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if self.ttl and expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        results = []
+        with self.lock:
+            items = self.items
+            for key in keys:
+                entry = items.get(key)
+                if entry is not None and self.ttl and entry[1] < now:
+                    del items[key]
+                    entry = None
+                if entry is not None:
+                    items.move_to_end(key)
+                    results.append(entry[0])
+                else:
+                    results.append(None)
+        return results
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, pairs):
+        expires = time.monotonic() + (self.ttl or 0)
+        with self.lock:
+            items = self.items
+            for key, value in pairs:
+                items[key] = (value, expires)
+                items.move_to_end(key)
+            while len(items) > self.max_size:
+                items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SqliteStore:
+    # On-disk second level shared by every worker process on the host.
+    # Writers purge expired rows every purge_interval seconds and then trim
+    # the table to max_rows, soonest-expiring first.
+    def __init__(self, path, ttl=3600, max_rows=100000, purge_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.purge_interval = purge_interval
+        self.purged_at = time.monotonic()
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS classify_cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS classify_cache_expires ON classify_cache (expires)")
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM classify_cache WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        expires = time.time() + self.ttl
+        try:
+            with self._conn() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO classify_cache (key, value, expires) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), expires) for key, value in items],
+                )
+            if time.monotonic() - self.purged_at >= self.purge_interval:
+                self.purge()
+        except sqlite3.Error as e:
+            print("Classify cache error:", e)
+
+    def purge(self):
+        # Returns how many rows were deleted
+        self.purged_at = time.monotonic()
+        with self._conn() as conn:
+            deleted = conn.execute("DELETE FROM classify_cache WHERE expires < ?", (time.time(),)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM classify_cache").fetchone()[0] - self.max_rows
+            if excess > 0:
+                deleted += conn.execute(
+                    "DELETE FROM classify_cache WHERE key IN "
+                    "(SELECT key FROM classify_cache ORDER BY expires LIMIT ?)", (excess,)
+                ).rowcount
+        return deleted
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM classify_cache").fetchone()[0]
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM classify_cache")
+
+
+# === CACHED CLASSIFIER ===
+# Result = model predictions + suspicious-keyword match, computed once per
+# normalized text. Keys carry the model version (and keyword lexicon
+# version), so publishing a new model invalidates every entry. Results are
+# stored under the version that computed them, which can differ from the
+# one looked up while a publish reaches the pool workers (offload.py).
+
+class CachedClassifier:
+    def __init__(self, registry, keyword_fn=None, max_size=10000, ttl=3600, shared_path=None,
+                 shared_max_rows=100000, lexicon_version=None, max_batch=64, max_wait=0.002):
+        self.registry = registry
+        self.keyword_fn = keyword_fn
+        self.lexicon_version = lexicon_version
+        self.local = LRUStore(max_size, ttl)
+        self.shared = SqliteStore(shared_path, ttl, shared_max_rows) if shared_path else None
+        self.batcher = MicroBatcher(self._compute_batch, max_batch=max_batch, max_wait=max_wait)
+        self.version = None
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _prefix(self):
+        version = (self.registry.version, self.lexicon_version)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.local.clear()
+                    self.version = version
+        return self._key_prefix(version[0])
+
+    def _key_prefix(self, model_version):
+        return f"{model_version}:{self.lexicon_version}:"
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _compute(self, texts):
+        # (model version, results)
+        version, results = self.registry.classify_versioned(texts)
+        for text, result in zip(texts, results):
+            match = self.keyword_fn(text) if self.keyword_fn else {"suspicious": False, "score": 0, "terms": []}
+            result["suspicious"] = match["suspicious"]
+            result["suspicion_score"] = match["score"]
+            result["suspicious_terms"] = [t["term"] for t in match["terms"]]
+        return version, results
+
+    def _compute_batch(self, texts):
+        version, results = self._compute(texts)
+        return [(version, result) for result in results]
+
+    def _lookup(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        if self.shared is not None:
+            return self._lookup_shared(key)
+        return None
+
+    def _lookup_shared(self, key):
+        value = self.shared.get(key)
+        if value is not None:
+            self._count("shared_hits")
+            self.local.set(key, value)
+        return value
+
+    def _store(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def classify_one(self, text):
+        text_key = normalize(text)
+        value = self._lookup(self._prefix() + text_key)
+        if value is None:
+            self._count("misses")
+            version, value = self.batcher.submit(text)
+            self._store(self._key_prefix(version) + text_key, value)
+        return copy_result(value)
+
+    def classify(self, texts):
+        prefix = self._prefix()
+        keys = [prefix + normalize(t) for t in texts]
+        results = self.local.get_many(keys)
+        self._count("hits", len(keys) - results.count(None))
+        if self.shared is not None:
+            for i, value in enumerate(results):
+                if value is None:
+                    results[i] = self._lookup_shared(keys[i])
+        missing = {}
+        for i, value in enumerate(results):
+            if value is None:
+                missing.setdefault(keys[i], i)
+        if missing:
+            self._count("misses", len(missing))
+            version, values = self._compute([texts[i] for i in missing.values()])
+            computed = dict(zip(missing, values))
+            stored_prefix = self._key_prefix(version)
+            stored = [(stored_prefix + key[len(prefix):], value) for key, value in computed.items()]
+            self.local.set_many(stored)
+            if self.shared is not None:
+                self.shared.set_many(stored)
+            results = [r if r is not None else computed[k] for r, k in zip(results, keys)]
+        return [copy_result(r) for r in results]
+
+    def info(self):
+        return {**self.stats, "size": len(self.local), "evictions": self.local.evictions}
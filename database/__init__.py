@@ -0,0 +1,37 @@
+import os
+import threading
+
+from database.memory import MemoryStore
+from database.mongo import MONGO_DB, MONGO_URI, MongoStore, get_client
+from database.serialize import JSONProvider, serialize
+from database.store import PUBLIC_QUERY, Store, object_id
+
+STORE_BACKEND = os.environ.get("STORE_BACKEND", "mongo")  # mongo | memory
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = MemoryStore() if STORE_BACKEND == "memory" else MongoStore()
+    return _store
+
+
+def set_store(store):
+    # Swap the backend (benchmarks, load tests) before anything reads it
+    global _store
+    _store = store
+
+
+# Blueprint helpers
+
+def get_alerts(limit=100):
+    return get_store().high_alerts(limit)
+
+
+def get_all_incidents(limit=100):
+    return get_store().public_incidents(limit)
@@ -0,0 +1,704 @@
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from database.store import Store
+from geo import EARTH_RADIUS_KM, GridIndex
+
+# === IN-MEMORY BACKEND ===
+# Implements the subset of the pymongo Collection API this app uses, so
+# every component that takes a collection runs unchanged against it (load
+# tests, benchmarks, local development without a mongod). Documents live
+# in a dict keyed by _id; lookups by _id are O(1), anything else scans,
+# except $geoNear, which walks a grid kept for each 2dsphere index.
+
+GEO_CELL_KM = 5
+TTL_MONITOR_SECONDS = 60  # how often mongod's TTL monitor runs
+HALF_EARTH_KM = math.pi * EARTH_RADIUS_KM
+
+
+def _copy(value):
+    # Documents are plain dict/list trees; cheaper than deepcopy
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _get(doc, path):
+    # Dotted-path lookup; returns (found, value)
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return False, None
+    return True, value
+
+
+def _type_rank(value):
+    # BSON comparison order: null < numbers < strings < objects < arrays < ObjectId < bool < dates
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    return (_type_rank(value), value if _type_rank(value) in (2, 3, 7, 8, 9) else 0)
+
+
+def _compare(a, op, b):
+    if _type_rank(a) != _type_rank(b):
+        return False
+    try:
+        if op == "$gt":
+            return a > b
+        if op == "$gte":
+            return a >= b
+        if op == "$lt":
+            return a < b
+        return a <= b
+    except TypeError:
+        return False
+
+
+def _equals(found, value, expected):
+    if not found:
+        return expected is None
+    if value == expected:
+        return True
+    return isinstance(value, list) and expected in value
+
+
+_TYPES = {
+    "double": float, "int": int, "long": int, "number": (int, float), "string": str,
+    "object": dict, "array": list, "objectId": ObjectId, "bool": bool, "date": datetime,
+}
+
+
+def _is_type(value, name):
+    if name == "null":
+        return value is None
+    if isinstance(value, bool) and name != "bool":
+        return False
+    return isinstance(value, _TYPES[name])
+
+
+def _match_operators(found, value, spec):
+    for op, arg in spec.items():
+        if op == "$eq":
+            ok = _equals(found, value, arg)
+        elif op == "$ne":
+            ok = not _equals(found, value, arg)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            values = value if isinstance(value, list) else [value]
+            ok = found and any(_compare(v, op, arg) for v in values)
+        elif op == "$in":
+            ok = any(_equals(found, value, a) for a in arg)
+        elif op == "$nin":
+            ok = not any(_equals(found, value, a) for a in arg)
+        elif op == "$exists":
+            ok = found == bool(arg)
+        elif op == "$regex":
+            ok = found and isinstance(value, str) and re.search(arg, value, re.I if "i" in spec.get("$options", "") else 0) is not None
+        elif op == "$options":
+            ok = True
+        elif op == "$size":
+            ok = found and isinstance(value, list) and len(value) == arg
+        elif op == "$type":
+            ok = found and any(_is_type(value, t) for t in (arg if isinstance(arg, list) else [arg]))
+        else:
+            raise NotImplementedError(f"Query operator {op} is not supported by the memory backend")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc, query):
+    for key, spec in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in spec):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in spec):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in spec):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key} is not supported by the memory backend")
+        else:
+            found, value = _get(doc, key)
+            if isinstance(spec, dict) and spec and all(k.startswith("$") for k in spec):
+                if not _match_operators(found, value, spec):
+                    return False
+            elif not _equals(found, value, spec):
+                return False
+    return True
+
+
+def project(doc, projection):
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: _copy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: _copy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def apply_update(doc, update, inserting=False):
+    if isinstance(update, list):
+        # Aggregation-pipeline update
+        for stage in update:
+            (op, arg), = stage.items()
+            if op in ("$set", "$addFields"):
+                for path, expr in arg.items():
+                    _set_path(doc, path, evaluate(expr, doc))
+            elif op == "$unset":
+                for path in [arg] if isinstance(arg, str) else arg:
+                    _unset_path(doc, path)
+            else:
+                raise NotImplementedError(f"Pipeline update stage {op} is not supported by the memory backend")
+        return
+    if not any(k.startswith("$") for k in update):
+        # Replacement document
+        replaced = {"_id": doc["_id"], **_copy(update)}
+        doc.clear()
+        doc.update(replaced)
+        return
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            found, current = _get(doc, path)
+            if op == "$set":
+                _set_path(doc, path, _copy(arg))
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, path, _copy(arg))
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                _set_path(doc, path, (current if found else 0) + arg)
+            elif op == "$max":
+                if not found or _sort_key(arg) > _sort_key(current):
+                    _set_path(doc, path, arg)
+            elif op == "$min":
+                if not found or _sort_key(arg) < _sort_key(current):
+                    _set_path(doc, path, arg)
+            elif op in ("$push", "$addToSet"):
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                target = current if found and isinstance(current, list) else []
+                for item in items:
+                    if op == "$push" or item not in target:
+                        target.append(_copy(item))
+                if op == "$push" and isinstance(arg, dict) and "$slice" in arg:
+                    n = arg["$slice"]
+                    target = target[n:] if n < 0 else target[:n]
+                _set_path(doc, path, target)
+            elif op == "$pull":
+                if found and isinstance(current, list):
+                    _set_path(doc, path, [v for v in current if v != arg])
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the memory backend")
+
+
+def _sorted(docs, sort):
+    # Stable multi-key sort: apply keys last to first
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda d: _sort_key(_get(d, field)[1]), reverse=direction < 0)
+    return docs
+
+
+def _truthy(value):
+    return value is not None and value is not False and value != 0
+
+
+def evaluate(expr, doc):
+    # Aggregation expressions: "$field" paths, literals and the operators
+    # the reconciliation pipelines use. Null/missing inputs give null, as in Mongo.
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get(doc, expr[1:])[1]
+    if isinstance(expr, list):
+        return [evaluate(e, doc) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        # Fields that name a missing path are left out, not set to null
+        return {k: evaluate(v, doc) for k, v in expr.items()
+                if not (isinstance(v, str) and v.startswith("$") and not _get(doc, v[1:])[0])}
+    (op, arg), = expr.items()
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return evaluate(arg[1] if _truthy(evaluate(arg[0], doc)) else arg[2], doc)
+    if op == "$ifNull":
+        value = evaluate(arg[0], doc)
+        return evaluate(arg[1], doc) if value is None else value
+    args = evaluate(arg, doc)
+    if op in ("$and", "$or"):
+        values = [_truthy(v) for v in args]
+        return all(values) if op == "$and" else any(values)
+    if op == "$not":
+        return not _truthy(args[0] if isinstance(args, list) else args)
+    if op == "$eq":
+        return _sort_key(args[0]) == _sort_key(args[1])
+    if op == "$ne":
+        return _sort_key(args[0]) != _sort_key(args[1])
+    if op == "$toLong":
+        if isinstance(args, datetime):
+            if args.tzinfo is None:
+                args = args.replace(tzinfo=timezone.utc)  # stored as naive UTC
+            return int(args.timestamp() * 1000)
+        return None if args is None else int(args)
+    if op == "$toDouble":
+        return None if args is None else float(args)
+    if op == "$floor":
+        return None if args is None else math.floor(args)
+    if op in ("$add", "$multiply", "$subtract", "$divide"):
+        if any(v is None for v in args):
+            return None
+        if op == "$add":
+            return sum(args)
+        if op == "$multiply":
+            return math.prod(args)
+        if op == "$subtract":
+            return args[0] - args[1]
+        return args[0] / args[1]
+    raise NotImplementedError(f"Expression operator {op} is not supported by the memory backend")
+
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        out = groups.get(hashable)
+        if out is None:
+            out = groups[hashable] = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, arg), = accumulator.items()
+            value = evaluate(arg, doc)
+            if op == "$sum":
+                out[field] = out.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif op == "$max":
+                if field not in out or _sort_key(value) > _sort_key(out[field]):
+                    out[field] = value
+            elif op == "$min":
+                if field not in out or _sort_key(value) < _sort_key(out[field]):
+                    out[field] = value
+            elif op == "$first":
+                out.setdefault(field, value)
+            else:
+                raise NotImplementedError(f"Accumulator {op} is not supported by the memory backend")
+    return list(groups.values())
+
+
+class MemoryCursor:
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __iter__(self):
+        docs = self.collection._scan(self.query)
+        if self._sort:
+            docs = _sorted(docs, self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return iter([project(doc, self.projection) for doc in docs])
+
+
+class MemoryCollection:
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self.indexes = {}
+        self.geo = {}       # 2dsphere field -> GridIndex of _id
+        self.lock = threading.RLock()
+        self.expired_at = time.monotonic()
+
+    def _geo_index(self, doc):
+        for field, grid in self.geo.items():
+            found, value = _get(doc, field)
+            if found and isinstance(value, dict) and value.get("type") == "Point":
+                lng, lat = value["coordinates"]
+                grid.add(doc["_id"], lat, lng)
+            else:
+                grid.remove(doc["_id"])
+
+    def _geo_unindex(self, doc):
+        for grid in self.geo.values():
+            grid.remove(doc["_id"])
+
+    def _expire(self):
+        # TTL indexes (expireAfterSeconds, optional partialFilterExpression):
+        # like mongod's monitor, expired documents go at most once a minute,
+        # here on the next read rather than from a background thread
+        now = time.monotonic()
+        if now - self.expired_at < TTL_MONITOR_SECONDS:
+            return
+        self.expired_at = now
+        for keys, options in list(self.indexes.values()):
+            seconds = options.get("expireAfterSeconds")
+            if seconds is None or len(keys) != 1:
+                continue
+            cutoff = datetime.utcnow() - timedelta(seconds=seconds)
+            partial = options.get("partialFilterExpression") or {}
+            for doc in list(self.docs.values()):
+                found, value = _get(doc, keys[0][0])
+                if not found or not isinstance(value, datetime):
+                    continue
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                if value < cutoff and matches(doc, partial):
+                    self._geo_unindex(doc)
+                    del self.docs[doc["_id"]]
+
+    def _scan(self, query):
+        query = query or {}
+        with self.lock:
+            self._expire()
+            oid = query.get("_id")
+            if oid is not None and not isinstance(oid, dict):
+                doc = self.docs.get(oid)
+                return [doc] if doc is not None and matches(doc, query) else []
+            return [doc for doc in self.docs.values() if matches(doc, query)]
+
+    def _check_unique(self, doc, ignore_id=None):
+        for name, (keys, options) in self.indexes.items():
+            if not options.get("unique"):
+                continue
+            fields = [k for k, _ in keys]
+            values = [_get(doc, f) for f in fields]
+            if options.get("sparse") and not all(found for found, _ in values):
+                continue
+            for other in self.docs.values():
+                if other["_id"] != ignore_id and [_get(other, f) for f in fields] == values:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {name}")
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        with self.lock:
+            if doc["_id"] in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key error index: _id_")
+            self._check_unique(doc)
+            stored = self.docs[doc["_id"]] = _copy(doc)
+            if self.geo:
+                self._geo_index(stored)
+        return InsertOneResult(doc["_id"], True)
+
+    def insert_many(self, docs, ordered=True):
+        ids, errors = [], []
+        for index, doc in enumerate(docs):
+            try:
+                ids.append(self.insert_one(doc).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": doc})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ids)})
+        return InsertManyResult(ids, True)
+
+    def find(self, filter=None, projection=None, sort=None, limit=0):
+        cursor = MemoryCursor(self, filter, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.limit(limit)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        for doc in self.find(filter, projection, sort=sort, limit=1):
+            return doc
+        return None
+
+    def count_documents(self, filter):
+        return len(self._scan(filter))
+
+    def _update(self, filter, update, upsert, many, sort=None):
+        with self.lock:
+            targets = self._scan(filter)
+            if sort:
+                targets = _sorted(targets, sort)
+            if not many:
+                targets = targets[:1]
+            for doc in targets:
+                apply_update(doc, update)
+                if self.geo:
+                    self._geo_index(doc)
+            if targets or not upsert:
+                return targets, None
+            doc = {k: _copy(v) for k, v in (filter or {}).items() if not k.startswith("$") and not isinstance(v, dict)}
+            doc.setdefault("_id", ObjectId())
+            apply_update(doc, update, inserting=True)
+            self._check_unique(doc)
+            self.docs[doc["_id"]] = doc
+            if self.geo:
+                self._geo_index(doc)
+            return [doc], doc["_id"]
+
+    def update_one(self, filter, update, upsert=False):
+        targets, upserted = self._update(filter, update, upsert, many=False)
+        matched = 0 if upserted is not None else len(targets)
+        return UpdateResult({"n": len(targets), "nModified": matched, "upserted": upserted}, True)
+
+    def update_many(self, filter, update, upsert=False):
+        targets, upserted = self._update(filter, update, upsert, many=True)
+        matched = 0 if upserted is not None else len(targets)
+        return UpdateResult({"n": len(targets), "nModified": matched, "upserted": upserted}, True)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE):
+        with self.lock:
+            targets = _sorted(self._scan(filter), sort) if sort else self._scan(filter)
+            before = _copy(targets[0]) if targets else None
+            if before is None and not upsert:
+                return None
+            docs, _ = self._update({"_id": before["_id"]} if before else filter, update, upsert, many=False)
+            doc = docs[0] if return_document == ReturnDocument.AFTER else before
+            return project(doc, projection) if doc is not None else None
+
+    def delete_one(self, filter):
+        with self.lock:
+            targets = self._scan(filter)[:1]
+            for doc in targets:
+                del self.docs[doc["_id"]]
+                self._geo_unindex(doc)
+        return DeleteResult({"n": len(targets)}, True)
+
+    def delete_many(self, filter):
+        with self.lock:
+            targets = self._scan(filter)
+            for doc in targets:
+                del self.docs[doc["_id"]]
+                self._geo_unindex(doc)
+        return DeleteResult({"n": len(targets)}, True)
+
+    def find_one_and_delete(self, filter, projection=None, sort=None):
+        with self.lock:
+            targets = _sorted(self._scan(filter), sort) if sort else self._scan(filter)
+            if not targets:
+                return None
+            doc = self.docs.pop(targets[0]["_id"])
+            self._geo_unindex(doc)
+            return project(doc, projection)
+
+    def bulk_write(self, requests, ordered=True):
+        # InsertOne / UpdateOne / UpdateMany / ReplaceOne / DeleteOne /
+        # DeleteMany, applied in order under the collection lock
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0,
+                  "upserted": [], "writeErrors": []}
+        with self.lock:
+            for index, op in enumerate(requests):
+                kind = type(op).__name__
+                try:
+                    if kind == "InsertOne":
+                        self.insert_one(op._doc)
+                        result["nInserted"] += 1
+                    elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                        targets, upserted = self._update(op._filter, op._doc, op._upsert, many=kind == "UpdateMany")
+                        if upserted is not None:
+                            result["nUpserted"] += 1
+                            result["upserted"].append({"index": index, "_id": upserted})
+                        else:
+                            result["nMatched"] += len(targets)
+                            result["nModified"] += len(targets)
+                    elif kind in ("DeleteOne", "DeleteMany"):
+                        delete = self.delete_many if kind == "DeleteMany" else self.delete_one
+                        result["nRemoved"] += delete(op._filter).deleted_count
+                    else:
+                        raise NotImplementedError(f"Bulk operation {kind} is not supported by the memory backend")
+                except DuplicateKeyError as e:
+                    result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e), "op": op})
+                    if ordered:
+                        break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def _geo_near(self, spec, limit):
+        # Documents nearest first. With a 2dsphere index the grid is searched
+        # in growing circles until `limit` matches are found; without one
+        # every document is measured, as a plain scan would.
+        lng, lat = spec["near"]["coordinates"] if isinstance(spec["near"], dict) else spec["near"]
+        max_km = spec["maxDistance"] / 1000 if spec.get("maxDistance") is not None else None
+        query = spec.get("query") or {}
+        key = spec.get("key") or next(iter(self.geo), None)
+        multiplier = spec.get("distanceMultiplier", 1)
+        out = []
+
+        def emit(doc, km):
+            doc = _copy(doc)
+            _set_path(doc, spec["distanceField"], km * 1000 * multiplier)
+            out.append(doc)
+
+        with self.lock:
+            grid = self.geo.get(key)
+            if grid is None:
+                raise NotImplementedError("$geoNear needs a 2dsphere index in the memory backend")
+            radius, done = min(1.0, max_km) if max_km else 1.0, 0.0
+            while True:
+                for oid, _, km in grid.query_radius(lat, lng, radius):
+                    if km <= done and done > 0:
+                        continue
+                    doc = self.docs[oid]
+                    if matches(doc, query):
+                        emit(doc, km)
+                        if limit and len(out) >= limit:
+                            return out
+                if (max_km and radius >= max_km) or radius >= HALF_EARTH_KM:
+                    return out
+                done = radius
+                radius = min(radius * 4, max_km or HALF_EARTH_KM)
+
+    def aggregate(self, pipeline, **options):
+        docs = None
+        if pipeline and "$geoNear" in pipeline[0]:
+            # Pass a directly following $limit down so the search can stop early
+            limit = pipeline[1].get("$limit") if len(pipeline) > 1 else None
+            docs = self._geo_near(pipeline[0]["$geoNear"], limit)
+            pipeline = pipeline[1:]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if docs is None:
+                docs = self._scan(arg) if op == "$match" else self._scan({})
+                docs = [_copy(d) for d in docs]
+                if op == "$match":
+                    continue
+            if op == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif op == "$sort":
+                docs = _sorted(docs, list(arg.items()))
+            elif op == "$skip":
+                docs = docs[arg:]
+            elif op == "$limit":
+                docs = docs[:arg]
+            elif op == "$project":
+                docs = [project(d, arg) for d in docs]
+            elif op == "$group":
+                docs = _group(docs, arg)
+            elif op == "$count":
+                docs = [{arg: len(docs)}]
+            else:
+                raise NotImplementedError(f"Aggregation stage {op} is not supported by the memory backend")
+        return iter(docs or [])
+
+    def create_index(self, keys, **options):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = options.get("name") or "_".join(f"{k}_{v}" for k, v in keys)
+        with self.lock:
+            self.indexes[name] = (list(keys), options)
+            for field, kind in keys:
+                if kind == "2dsphere" and field not in self.geo:
+                    self.geo[field] = GridIndex(GEO_CELL_KM)
+                    for doc in self.docs.values():
+                        self._geo_index(doc)
+        return name
+
+    def drop_index(self, name):
+        with self.lock:
+            if name not in self.indexes:
+                raise OperationFailure(f"index not found with name [{name}]", 27)
+            keys, _ = self.indexes.pop(name)
+            for field, kind in keys:
+                if kind == "2dsphere":
+                    self.geo.pop(field, None)
+
+    def index_information(self):
+        info = {"_id_": {"key": [("_id", 1)]}}
+        info.update({name: {"key": keys, **options} for name, (keys, options) in self.indexes.items()})
+        return info
+
+    def drop(self):
+        with self.lock:
+            self.docs.clear()
+            self.indexes.clear()
+            self.geo.clear()
+
+
+class MemoryDatabase:
+    def __init__(self, name="crime_reports"):
+        self.name = name
+        self.collections = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(name)
+            return self.collections[name]
+
+
+class MemoryStore(Store):
+    def __init__(self, db_name="crime_reports"):
+        super().__init__(MemoryDatabase(db_name))
@@ -0,0 +1,61 @@
+import os
+import threading
+
+from pymongo import MongoClient, monitoring
+
+from database.store import Store
+from metrics import counter, observe_stage
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "crime_reports")
+
+# One pool per process, sized for the Flask/Socket.IO worker threads plus
+# the dispatcher and ingest writer threads
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", 50)),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", 5)),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_MS", 60000)),
+    "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    "connectTimeoutMS": 5000,
+    "retryWrites": True,
+    "appname": "crime-alert-system",
+}
+
+
+class CommandTimer(monitoring.CommandListener):
+    # Server round trip of every command, as stage "mongo.<command>" of the
+    # route that issued it (events fire on the calling thread)
+    errors = counter("mongo_command_errors_total", "Failed MongoDB commands", ("command",))
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        observe_stage("mongo." + event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        observe_stage("mongo." + event.command_name, event.duration_micros / 1e6)
+        self.errors.inc(event.command_name)
+
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(uri=MONGO_URI):
+    # MongoClient is thread-safe but not fork-safe: keyed by pid so a
+    # pre-forked worker never reuses its parent's sockets
+    key = (uri, os.getpid())
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = MongoClient(uri, event_listeners=[CommandTimer()], **POOL_OPTIONS)
+            _clients[key] = client
+        return client
+
+
+class MongoStore(Store):
+    def __init__(self, uri=MONGO_URI, db_name=MONGO_DB):
+        self.client = get_client(uri)
+        super().__init__(self.client[db_name])
@@ -0,0 +1,29 @@
+from datetime import date, datetime
+
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+
+def serialize(value):
+    # ObjectId -> str, datetime -> ISO 8601, recursively; the one place
+    # documents are turned into JSON-safe values (socket payloads included)
+    if isinstance(value, dict):
+        return {k: serialize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class JSONProvider(DefaultJSONProvider):
+    # jsonify() documents straight from the store
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
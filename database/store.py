@@ -0,0 +1,217 @@
+from datetime import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+
+from geo import bbox_center, haversine, to_point
+from ingest import escalation
+from pagination import SORT, fetch_page, open_page, open_queue, ensure_incident_indexes
+
+PUBLIC_QUERY = {"approved": True, "flagged": False, "spam": False}
+
+
+def object_id(value):
+    # None for anything that is not a valid ObjectId, so callers answer 404
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+REJECT_FIELDS = {"description": 1, "type": 1, "severity": 1, "timestamp": 1}
+
+# Store.moderate: the update each action applies, None for a delete
+MODERATION_ACTIONS = {
+    "approve": {"$set": {"approved": True, "flagged": False}},
+    "flag": {"$set": {"flagged": True}},
+    "unflag": {"$set": {"flagged": False}},
+    "reject": None,
+    "remove": None,
+}
+
+
+def rejection(doc):
+    # What train_model.py keeps of a rejected report
+    return {
+        "incident_id": doc["_id"],
+        "description": doc["description"],
+        "type": doc.get("type"),
+        "severity": doc.get("severity"),
+        "reported_at": doc.get("timestamp"),
+        "rejected_at": datetime.utcnow(),
+    }
+
+
+# === STORE ===
+# Every route and blueprint goes through one Store. A backend only has to
+# provide a database whose collections speak the pymongo Collection API;
+# the query logic below is shared.
+
+class Store:
+    def __init__(self, db):
+        self.db = db
+        self.incidents = db["incidents"]
+        self.subscribers = db["subscribers"]
+        self.dead_letters = db["alert_dead_letters"]
+        # Descriptions of rejected reports, the spam labels for train_model.py
+        self.rejections = db["rejected_reports"]
+        # Incidents past ARCHIVE_AFTER_DAYS (retention.py, collection backend)
+        self.archive = db["incidents_archive"]
+        # Change counters that worker processes poll to refresh in-memory state
+        self.counters = db["counters"]
+
+    def ensure_indexes(self):
+        # Listings, hotspot and duplicate-index reloads all filter/sort on
+        # the compound (…, timestamp, _id) indexes
+        ensure_incident_indexes(self.incidents)
+        # /incidents/near, /bbox and /knn ($geoNear)
+        self.incidents.create_index([("location_point", "2dsphere")])
+        # Radius lookups while the subscriber grid is stale, subscribe upserts
+        self.subscribers.create_index([("location", "2dsphere")])
+        self.subscribers.create_index("email", unique=True, sparse=True)
+
+    # --- incidents ---
+
+    def insert_incident(self, doc):
+        return self.incidents.insert_one(doc).inserted_id
+
+    def backfill_location_points(self):
+        # Older documents only have latitude/longitude; (0, 0) was the
+        # placeholder for "no location" and stays unindexed
+        query = {
+            "location_point": {"$exists": False},
+            "latitude": {"$type": "number", "$gte": -90, "$lte": 90},
+            "longitude": {"$type": "number", "$gte": -180, "$lte": 180},
+            "$nor": [{"latitude": 0, "longitude": 0}],
+        }
+        update = [{"$set": {"location_point": {
+            "type": "Point",
+            "coordinates": [{"$toDouble": "$longitude"}, {"$toDouble": "$latitude"}],
+        }}}]
+        return self.incidents.update_many(query, update).modified_count
+
+    def get_incident(self, incident_id, projection=None):
+        oid = object_id(incident_id)
+        return self.incidents.find_one({"_id": oid}, projection) if oid else None
+
+    def page(self, query, args):
+        return fetch_page(self.incidents, query, args)
+
+    def page_cursor(self, query, args, **limits):
+        # Unread cursor for streamed listings: (cursor, limit)
+        return open_page(self.incidents, query, args, **limits)
+
+    def queue_cursor(self, args, **limits):
+        # Pending incidents in moderation order (pagination.QUEUE_SORT)
+        return open_queue(self.incidents, args, **limits)
+
+    def update_incident(self, incident_id, update, projection=None, return_document=ReturnDocument.AFTER):
+        # Returns the updated document, or None when it does not exist
+        oid = object_id(incident_id)
+        if oid is None:
+            return None
+        return self.incidents.find_one_and_update(
+            {"_id": oid}, update, projection=projection, return_document=return_document
+        )
+
+    def escalate_incident(self, incident_id, severity, projection=None):
+        # A more severe duplicate raises its canonical incident. Returns the
+        # document before the write, or None when it was already as severe
+        raise_to = escalation(severity)
+        oid = object_id(incident_id)
+        if raise_to is None or oid is None:
+            return None
+        query, update = raise_to
+        return self.incidents.find_one_and_update({"_id": oid, **query}, update, projection=projection,
+                                                  return_document=ReturnDocument.BEFORE)
+
+    # Moderation changes return the document as it was *before* the write,
+    # so callers can move its stats from the old status to the new one
+
+    def approve_incident(self, incident_id):
+        return self.update_incident(incident_id, {"$set": {"approved": True, "flagged": False}},
+                                    return_document=ReturnDocument.BEFORE)
+
+    def set_flagged(self, incident_id, flagged):
+        return self.update_incident(incident_id, {"$set": {"flagged": bool(flagged)}},
+                                    return_document=ReturnDocument.BEFORE)
+
+    def delete_incident(self, incident_id, projection=None):
+        oid = object_id(incident_id)
+        return self.incidents.find_one_and_delete({"_id": oid}, projection=projection) if oid else None
+
+    def reject_incident(self, incident_id, projection=None):
+        # Deletes the incident and keeps what training needs of it
+        doc = self.delete_incident(incident_id, {**REJECT_FIELDS, **projection} if projection else None)
+        if doc is not None and doc.get("description"):
+            self.rejections.insert_one(rejection(doc))
+        return doc
+
+    def moderate(self, action, incident_ids):
+        # One action over many incidents: one read of the documents as they
+        # were, then one unordered bulk_write. Returns the befores of the
+        # incidents it changed; ids that are invalid, gone, or already in
+        # the target state are left out.
+        if action not in MODERATION_ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        oids = [oid for oid in map(object_id, incident_ids) if oid]
+        befores = list(self.incidents.find({"_id": {"$in": oids}})) if oids else []
+        update = MODERATION_ACTIONS[action]
+        if update is not None:
+            befores = [doc for doc in befores if any(doc.get(k) != v for k, v in update["$set"].items())]
+        if not befores:
+            return []
+        if update is None:
+            ops = [DeleteOne({"_id": doc["_id"]}) for doc in befores]
+        else:
+            ops = [UpdateOne({"_id": doc["_id"]}, update) for doc in befores]
+        self.incidents.bulk_write(ops, ordered=False)
+        if action == "reject":
+            rejected = [rejection(doc) for doc in befores if doc.get("description")]
+            if rejected:
+                self.rejections.insert_many(rejected)
+        return befores
+
+    # --- geo ---
+    # All three return a cursor of documents nearest first, each with a
+    # distance_km field; only the 2dsphere index is touched.
+
+    def near(self, lat, lng, radius_km=None, limit=100, query=PUBLIC_QUERY):
+        stage = {
+            "near": to_point(lat, lng),
+            "key": "location_point",
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "spherical": True,
+            "query": query,
+        }
+        if radius_km is not None:
+            stage["maxDistance"] = radius_km * 1000
+        return self.incidents.aggregate([{"$geoNear": stage}, {"$limit": limit}])
+
+    def knn(self, lat, lng, k=10, max_km=None, query=PUBLIC_QUERY):
+        return self.near(lat, lng, max_km, k, query)
+
+    def bbox(self, south, west, north, east, limit=100, query=PUBLIC_QUERY):
+        # Ordered by distance from the centre of the box: $geoNear out to the
+        # corners, with latitude/longitude bounds as an exact filter
+        if west <= east:
+            lng_range = {"longitude": {"$gte": west, "$lte": east}}
+        else:  # crosses the antimeridian
+            lng_range = {"$or": [{"longitude": {"$gte": west}}, {"longitude": {"$lte": east}}]}
+        within = {"$and": [query, {"latitude": {"$gte": south, "$lte": north}}, lng_range]}
+        lat, lng = bbox_center(south, west, north, east)
+        corner = max(haversine(lat, lng, y, x) for y in (south, north) for x in (west, east))
+        return self.near(lat, lng, corner + 1, limit, within)
+
+    def recent(self, query, limit=100):
+        return list(self.incidents.find(query).sort(SORT).limit(limit))
+
+    def public_incidents(self, limit=100):
+        return self.recent(PUBLIC_QUERY, limit)
+
+    def high_alerts(self, limit=100):
+        return self.recent({**PUBLIC_QUERY, "severity": "high"}, limit)
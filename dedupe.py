@@ -0,0 +1,199 @@
+import hashlib
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from math import cos, radians, ceil, floor
+
+import numpy as np
+
+from geo import KM_PER_DEGREE, haversine
+
+NUM_HASHES = 16
+ROWS_PER_BAND = 2
+MIN_SIMILARITY = 0.6
+LOAD_BATCH = 1000
+
+# Every word counts, digits and one-letter tokens included ("shop 1" is
+# not "shop 7"); only filler words are left out, so "a fire"/"the fire"
+# or "ke bahar"/"bahar" do not set two reports apart.
+TOKEN_RE = re.compile(r"(?u)\w+")
+STOPWORDS = frozenset("""
+    a an the and or but of in on at to for from by with is are was were be been has have had it its
+    this that there here some any near ke ki ka ko mein me se par pe hai hain tha thi hua hui aur
+""".split())
+NUMBER_WORDS = frozenset("one two three four five six seven eight nine ten eleven twelve".split())
+EMPTY_SIGNATURE = b"\xff" * (NUM_HASHES * 4)
+
+
+def tokens(text):
+    return frozenset(t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS)
+
+
+# === FINGERPRINTS ===
+# (MinHash signature, word set). The signature holds NUM_HASHES minimum
+# hashes over the words: two reports agree on each of them with
+# probability equal to the Jaccard similarity of their word sets, which is
+# what the index bands on. Candidates are then compared on the words.
+
+def text_fingerprint(text):
+    return text_fingerprints([text])[0]
+
+
+def text_fingerprints(texts):
+    # One 64-byte blake2b digest per word gives all NUM_HASHES hashes at
+    # once; one segmented minimum over the whole batch
+    token_sets = [tokens(text) for text in texts]
+    lengths = np.array([len(words) for words in token_sets], dtype=np.int64)
+    signatures = [EMPTY_SIGNATURE] * len(texts)
+    nonempty = np.flatnonzero(lengths)
+    if len(nonempty):
+        digests = b"".join(hashlib.blake2b(word.encode(), digest_size=NUM_HASHES * 4).digest()
+                           for words in token_sets for word in words)
+        hashes = np.frombuffer(digests, dtype=np.uint32).reshape(-1, NUM_HASHES)
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        for i, row in zip(nonempty, np.minimum.reduceat(hashes, starts, axis=0)):
+            signatures[i] = row.tobytes()
+    return list(zip(signatures, token_sets))
+
+
+def _numbers(words):
+    return {w for w in words if w in NUMBER_WORDS or any(c.isdigit() for c in w)}
+
+
+def similarity(a, b):
+    # Jaccard similarity of the word sets; 0 when both mention numbers
+    # (house, shop, street, plate) and they differ
+    words_a, words_b = a[1], b[1]
+    if not words_a or not words_b:
+        return 0.0
+    numbers_a, numbers_b = _numbers(words_a), _numbers(words_b)
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def to_epoch(ts):
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)  # stored as naive UTC
+        return ts.timestamp()
+    return float(ts)
+
+
+# === DUPLICATE INDEX ===
+# Recent reports are bucketed by (grid row, MinHash band): ROWS_PER_BAND
+# hashes per band, so two reports with Jaccard similarity 0.6 share at
+# least one band with probability ~0.97 (0.998 at 0.7). A lookup only
+# inspects the bands of the three neighbouring rows, filters those
+# entries by column, and keeps the most similar one at or above
+# min_similarity. Entries older than the time window are pruned.
+
+class DuplicateIndex:
+    def __init__(self, window_minutes=30, radius_km=1.0, min_similarity=MIN_SIMILARITY):
+        self.window = window_minutes * 60
+        self.radius_km = radius_km
+        self.min_similarity = min_similarity
+        self.bands = NUM_HASHES // ROWS_PER_BAND
+        self.band_bytes = ROWS_PER_BAND * 4
+        self.cell_deg = radius_km / KM_PER_DEGREE
+        self.buckets = {}       # (row, band, value) -> {entry_id: column}
+        self.entries = {}       # entry_id -> (fingerprint, lat, lng, ts, keys)
+        self.order = deque()    # (ts, entry_id) in insertion order
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _band_values(self, fingerprint):
+        signature = fingerprint[0]
+        size = self.band_bytes
+        return [(band, signature[band * size:(band + 1) * size]) for band in range(self.bands)]
+
+    def _cell(self, lat, lng):
+        return (int(floor(lat / self.cell_deg)), int(floor(lng / self.cell_deg)))
+
+    def add(self, entry_id, fingerprint, lat, lng, ts):
+        ts = to_epoch(ts)
+        row, column = self._cell(lat, lng)
+        keys = [(row, band, value) for band, value in self._band_values(fingerprint)]
+        with self.lock:
+            self._prune(ts)
+            for key in keys:
+                self.buckets.setdefault(key, {})[entry_id] = column
+            self.entries[entry_id] = (fingerprint, lat, lng, ts, keys)
+            self.order.append((ts, entry_id))
+
+    def remove(self, entry_id):
+        with self.lock:
+            self._drop(entry_id)
+
+    def _drop(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in entry[4]:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.pop(entry_id, None)
+                if not bucket:
+                    del self.buckets[key]
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        while self.order and self.order[0][0] < cutoff:
+            _, entry_id = self.order.popleft()
+            entry = self.entries.get(entry_id)
+            if entry is not None and entry[3] < cutoff:
+                self._drop(entry_id)
+
+    def find(self, fingerprint, lat, lng, ts):
+        # Returns the most similar matching entry_id or None
+        if not fingerprint[1]:
+            return None
+        ts = to_epoch(ts)
+        best, best_similarity = None, self.min_similarity
+        row, column = self._cell(lat, lng)
+        dx = ceil(1 / max(cos(radians(lat)), 0.01))  # lng cells shrink towards the poles
+        bands = self._band_values(fingerprint)
+        with self.lock:
+            seen = set()
+            for y in (row - 1, row, row + 1):
+                for band, value in bands:
+                    bucket = self.buckets.get((y, band, value))
+                    if not bucket:
+                        continue
+                    for entry_id, x in bucket.items():
+                        if abs(x - column) > dx or entry_id in seen:
+                            continue
+                        seen.add(entry_id)
+                        fp, elat, elng, ets, _ = self.entries[entry_id]
+                        if abs(ts - ets) > self.window:
+                            continue
+                        score = similarity(fp, fingerprint)
+                        if score < best_similarity or (best is not None and score == best_similarity):
+                            continue
+                        if haversine(lat, lng, elat, elng) > self.radius_km:
+                            continue
+                        best, best_similarity = entry_id, score
+        return best
+
+    def load(self, collection, now=None):
+        # Rebuild from the reports still inside the window (e.g. after a restart)
+        now = now or datetime.utcnow()
+        since = now - timedelta(seconds=self.window)
+        query = {"timestamp": {"$gte": since}, "latitude": {"$exists": True}}
+        cursor = collection.find(query, {"description": 1, "latitude": 1, "longitude": 1, "timestamp": 1}).sort("timestamp", 1)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == LOAD_BATCH:
+                self._add_docs(batch)
+                batch = []
+        self._add_docs(batch)
+        print(f"Duplicate index loaded: {len(self)} recent reports.")
+
+    def _add_docs(self, docs):
+        fingerprints = text_fingerprints([doc.get("description", "") for doc in docs])
+        for doc, fingerprint in zip(docs, fingerprints):
+            self.add(str(doc["_id"]), fingerprint, doc["latitude"], doc["longitude"], doc["timestamp"])
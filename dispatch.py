@@ -0,0 +1,360 @@
+import queue
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.mime.text import MIMEText
+
+from metrics import histogram
+
+# Per-send latency of each transport, by outcome
+SEND_SECONDS = histogram("alert_send_duration_seconds", "Email/SMS send latency", ("channel", "outcome"))
+
+
+# === TRANSPORTS ===
+# A transport exposes send_many(jobs), which returns one error (None when
+# sent) per job, and send(job), which raises. Connections are opened once
+# and reused instead of per recipient.
+
+class SMTPTransport:
+    # Jobs of one batch with the same subject and body (an alert to everyone
+    # nearby) go out as one message with the recipients on the envelope,
+    # up to max_recipients per message
+    def __init__(self, user, password, host="smtp.gmail.com", port=465, max_recipients=50):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.max_recipients = max_recipients
+        self.local = threading.local()  # one persistent connection per worker
+
+    def _connection(self):
+        server = getattr(self.local, "server", None)
+        if server is None:
+            server = smtplib.SMTP_SSL(self.host, self.port)
+            server.login(self.user, self.password)
+            self.local.server = server
+        return server
+
+    def _reset(self):
+        server = getattr(self.local, "server", None)
+        self.local.server = None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def _sendmail(self, recipients, msg):
+        # Returns {recipient: error} for the recipients the server refused
+        try:
+            try:
+                return self._connection().sendmail(self.user, recipients, msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # Idle connection was dropped by the server; reconnect once
+                self._reset()
+                return self._connection().sendmail(self.user, recipients, msg.as_string())
+        except smtplib.SMTPRecipientsRefused as e:
+            return e.recipients
+        except Exception:
+            self._reset()
+            raise
+
+    def send_many(self, jobs):
+        groups = {}
+        for i, job in enumerate(jobs):
+            groups.setdefault((job.get("subject") or "", job["body"]), []).append(i)
+        errors = [None] * len(jobs)
+        for (subject, body), indexes in groups.items():
+            for start in range(0, len(indexes), self.max_recipients):
+                chunk = indexes[start:start + self.max_recipients]
+                recipients = [jobs[i]["to"] for i in chunk]
+                msg = MIMEText(body)
+                msg["Subject"] = subject
+                msg["From"] = self.user
+                msg["To"] = recipients[0] if len(recipients) == 1 else "undisclosed-recipients:;"
+                try:
+                    refused = self._sendmail(recipients, msg)
+                except Exception as e:
+                    for i in chunk:
+                        errors[i] = e
+                    continue
+                for i in chunk:
+                    if jobs[i]["to"] in refused:
+                        errors[i] = smtplib.SMTPRecipientsRefused({jobs[i]["to"]: refused[jobs[i]["to"]]})
+        return errors
+
+    def send(self, job):
+        error = self.send_many([job])[0]
+        if error is not None:
+            raise error
+
+    def close(self):
+        self._reset()
+
+
+class TwilioTransport:
+    def __init__(self, sid, auth_token, from_number):
+        self.sid = sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.client = None
+        self.lock = threading.Lock()
+
+    def _client(self):
+        if self.client is None:
+            with self.lock:
+                if self.client is None:
+                    from twilio.rest import Client
+                    self.client = Client(self.sid, self.auth_token)
+        return self.client
+
+    def send(self, job):
+        self._client().messages.create(body=job["body"], from_=self.from_number, to=job["to"])
+
+    def send_many(self, jobs):
+        # The Messages API takes one recipient per request; the batch shares
+        # the client's HTTP session
+        errors = []
+        for job in jobs:
+            try:
+                self.send(job)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    # Offline stand-in: records every send, with optional latency (one round
+    # trip per send_many call) and failure rate
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send(self, job):
+        error = self.send_many([job])[0]
+        if error is not None:
+            raise error
+
+    def send_many(self, jobs):
+        if self.latency:
+            time.sleep(self.latency)
+        errors = []
+        with self.lock:
+            self.calls += 1
+            for job in jobs:
+                if self.failure_rate and self.random.random() < self.failure_rate:
+                    errors.append(RuntimeError("fake transport failure"))
+                else:
+                    self.sent.append(job)
+                    errors.append(None)
+        return errors
+
+    def close(self):
+        pass
+
+
+# === DEAD LETTERS ===
+
+class MemoryDeadLetters:
+    def __init__(self):
+        self.items = []
+        self.lock = threading.Lock()
+
+    def add(self, job, error):
+        with self.lock:
+            self.items.append({**job, "error": error, "failed_at": datetime.utcnow()})
+
+    def __len__(self):
+        return len(self.items)
+
+
+class MongoDeadLetters:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def add(self, job, error):
+        try:
+            self.collection.insert_one({**job, "error": error, "failed_at": datetime.utcnow()})
+        except Exception as e:
+            print("Dead letter error:", e)
+
+
+# === RATE LIMITING ===
+
+class RateLimiter:
+    # Token bucket: `rate` sends per second with bursts up to `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# === DISPATCHER ===
+
+class AlertDispatcher:
+    def __init__(self, transports, workers=4, queue_size=10000, batch_size=20,
+                 rate_limits=None, max_retries=3, backoff=1.0, dead_letters=None):
+        self.transports = transports
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.limiters = {ch: RateLimiter(rate) for ch, rate in (rate_limits or {}).items()}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dead_letters = dead_letters if dead_letters is not None else MemoryDeadLetters()
+        self.threads = []
+        self.pending_retries = set()
+        self.lock = threading.Lock()
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead": 0}
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"alert-dispatch-{i}", daemon=True)
+                t.start()
+                self.threads.append(t)
+
+    def enqueue(self, channel, to, body, subject=None):
+        if channel not in self.transports:
+            raise ValueError(f"Unknown alert channel: {channel}")
+        self.start()
+        job = {"channel": channel, "to": to, "subject": subject, "body": body, "attempt": 0}
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self._dead(job, "queue full")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _dead(self, job, error):
+        self._count("dead")
+        self.dead_letters.add(job, error)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        while batch[0] is not None and len(batch) < self.batch_size:
+            try:
+                job = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # Leave the stop sentinel for another worker
+                self.queue.task_done()
+                self.queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            batch = self._next_batch()
+            jobs = [job for job in batch if job is not None]
+            stopping = len(jobs) < len(batch)
+            by_channel = {}
+            for job in jobs:
+                by_channel.setdefault(job["channel"], []).append(job)
+            try:
+                for channel, group in by_channel.items():
+                    self._deliver(channel, group)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _deliver(self, channel, jobs):
+        # One send_many per channel and batch, over the worker's connection
+        limiter = self.limiters.get(channel)
+        if limiter:
+            for _ in jobs:
+                limiter.acquire()
+        start = time.perf_counter()
+        try:
+            errors = self.transports[channel].send_many(jobs)
+        except Exception as e:
+            errors = [e] * len(jobs)
+        # Latency per job, so the histogram stays comparable across batch sizes
+        elapsed = (time.perf_counter() - start) / len(jobs)
+        for job, error in zip(jobs, errors):
+            if error is None:
+                SEND_SECONDS.observe(elapsed, channel, "sent")
+                self._count("sent")
+                continue
+            SEND_SECONDS.observe(elapsed, channel, "failed")
+            if job["attempt"] >= self.max_retries:
+                self._dead(job, str(error))
+            else:
+                self._schedule_retry({**job, "attempt": job["attempt"] + 1})
+
+    def _schedule_retry(self, job):
+        # Exponential backoff with jitter, without holding a worker while waiting
+        delay = self.backoff * (2 ** (job["attempt"] - 1)) * random.uniform(0.5, 1.5)
+        timer = threading.Timer(delay, self._requeue, args=(job,))
+        timer.daemon = True
+        with self.lock:
+            self.pending_retries.add(timer)
+            self.stats["retried"] += 1
+        timer.start()
+
+    def _requeue(self, job):
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self._dead(job, "queue full")
+        with self.lock:
+            current = threading.current_thread()
+            self.pending_retries = {t for t in self.pending_retries if t.is_alive() and t is not current}
+
+    def drain(self, timeout=None):
+        # Block until the queue and scheduled retries are empty (tests / shutdown)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.queue.join()
+            with self.lock:
+                waiting = any(t.is_alive() for t in self.pending_retries)
+            if not waiting and self.queue.empty():
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def stop(self, timeout=None):
+        self.drain(timeout)
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(None)
+        for t in threads:
+            t.join(timeout)
+        for transport in self.transports.values():
+            transport.close()
@@ -0,0 +1,197 @@
+import threading
+from math import radians, cos, sin, asin, sqrt, floor
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
+    return R * 2 * asin(sqrt(a))
+
+
+def haversine_np(lat, lng, lats, lngs):
+    # Distance in km from one point to every point in the lats/lngs arrays
+    lat, lng = np.radians(lat), np.radians(lng)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lngs = np.radians(np.asarray(lngs, dtype=np.float64))
+    a = np.sin((lats - lat) / 2)**2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2)**2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def to_point(lat, lng):
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+def bbox_center(south, west, north, east):
+    width = (east - west) % 360 or 360.0  # west > east crosses the antimeridian
+    lng = west + width / 2
+    return (south + north) / 2, lng - 360 if lng > 180 else lng
+
+
+def in_bbox(lat, lng, south, west, north, east):
+    if not south <= lat <= north:
+        return False
+    if west > east:  # crosses the antimeridian
+        return lng >= west or lng <= east
+    return west <= lng <= east
+
+
+def radius_to_boxes(lat, lng, radius_km):
+    # Bounding box(es) of a circle, split in two when it crosses the antimeridian
+    dlat = radius_km / KM_PER_DEGREE
+    lat_min, lat_max = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    widest = cos(radians(max(abs(lat_min), abs(lat_max))))
+    if lat_max >= 90.0 or lat_min <= -90.0 or widest < 1e-6:
+        return [(lat_min, lat_max, -180.0, 180.0)]
+    dlng = radius_km / (KM_PER_DEGREE * widest)
+    if dlng >= 180.0:
+        return [(lat_min, lat_max, -180.0, 180.0)]
+    lng_min, lng_max = lng - dlng, lng + dlng
+    if lng_min < -180.0:
+        return [(lat_min, lat_max, -180.0, lng_max), (lat_min, lat_max, lng_min + 360.0, 180.0)]
+    if lng_max > 180.0:
+        return [(lat_min, lat_max, lng_min, 180.0), (lat_min, lat_max, -180.0, lng_max - 360.0)]
+    return [(lat_min, lat_max, lng_min, lng_max)]
+
+
+# === GRID INDEX ===
+# Points are bucketed into fixed-size lat/lng cells so a radius lookup only
+# touches the cells overlapping the circle's bounding box.
+
+class GridIndex:
+    def __init__(self, cell_km=10):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cells = {}
+        self.points = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def cell_of(self, lat, lng):
+        return (int(floor(lat / self.cell_deg)), int(floor(lng / self.cell_deg)))
+
+    def add(self, key, lat, lng, value=None):
+        lat, lng = float(lat), float(lng)
+        with self.lock:
+            self.remove(key)
+            cell = self.cell_of(lat, lng)
+            self.cells.setdefault(cell, {})[key] = (lat, lng, value)
+            self.points[key] = cell
+
+    def remove(self, key):
+        with self.lock:
+            cell = self.points.pop(key, None)
+            if cell is None:
+                return False
+            bucket = self.cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[cell]
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.cells.clear()
+            self.points.clear()
+
+    def _cells_in_box(self, lat_min, lat_max, lng_min, lng_max):
+        y0, x0 = self.cell_of(lat_min, lng_min)
+        y1, x1 = self.cell_of(lat_max, lng_max)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self.cells):
+            # Sparse grid: cheaper to walk the occupied cells than the box
+            return [c for c in self.cells if y0 <= c[0] <= y1 and x0 <= c[1] <= x1]
+        return [(y, x) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (y, x) in self.cells]
+
+    def query_bbox(self, lat_min, lat_max, lng_min, lng_max):
+        results = []
+        with self.lock:
+            for cell in self._cells_in_box(lat_min, lat_max, lng_min, lng_max):
+                for key, (lat, lng, value) in self.cells[cell].items():
+                    if lat_min <= lat <= lat_max and lng_min <= lng <= lng_max:
+                        results.append((key, lat, lng, value))
+        return results
+
+    def query_radius(self, lat, lng, radius_km):
+        # Returns [(key, value, distance_km)] nearest first
+        candidates = []
+        for box in radius_to_boxes(lat, lng, radius_km):
+            candidates.extend(self.query_bbox(*box))
+        if not candidates:
+            return []
+        lats = np.fromiter((c[1] for c in candidates), dtype=np.float64, count=len(candidates))
+        lngs = np.fromiter((c[2] for c in candidates), dtype=np.float64, count=len(candidates))
+        dists = haversine_np(lat, lng, lats, lngs)
+        hits = np.nonzero(dists <= radius_km)[0]
+        hits = hits[np.argsort(dists[hits], kind="stable")]
+        return [(candidates[i][0], candidates[i][3], float(dists[i])) for i in hits]
+
+
+# === GEOHASH ===
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lng, precision=5):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = ch << 1 | 1
+            rng[0] = mid
+        else:
+            ch = ch << 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    # (lat_degrees, lng_degrees) covered by one cell
+    total = 5 * precision
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cover(south, west, north, east, precision):
+    # Geohash cells at `precision` that intersect the bounding box
+    if west > east:  # crosses the antimeridian
+        return geohash_cover(south, west, north, 180.0, precision) | geohash_cover(south, -180.0, north, east, precision)
+    dlat, dlng = geohash_cell_size(precision)
+    south, north = max(south, -90.0), min(north, 90.0)
+    west, east = max(west, -180.0), min(east, 180.0)
+    cells = set()
+    lat = floor(south / dlat) * dlat
+    while lat <= north:
+        lng = floor(west / dlng) * dlng
+        while lng <= east:
+            cells.add(geohash_encode(min(lat + dlat / 2, 90.0), min(lng + dlng / 2, 180.0), precision))
+            lng += dlng
+        lat += dlat
+    return cells
+
+
+def geohash_cover_count(south, west, north, east, precision):
+    if west > east:
+        return geohash_cover_count(south, west, north, 180.0, precision) + geohash_cover_count(south, -180.0, north, east, precision)
+    dlat, dlng = geohash_cell_size(precision)
+    rows = floor(min(north, 90.0) / dlat) - floor(max(south, -90.0) / dlat) + 1
+    cols = floor(min(east, 180.0) / dlng) - floor(max(west, -180.0) / dlng) + 1
+    return rows * cols
@@ -5,6 +5,12 @@ import { useNavigate } from "react-router-dom"; // You used navigate but didn't
 
 const API_BASE = "http://localhost:5000";
 
+// Newest first; an incident that is already listed is replaced, not repeated
+const mergeIncidents = (prev, incoming) => {
+  const ids = new Set(incoming.map((incident) => incident._id));
+  return [...incoming, ...prev.filter((incident) => !ids.has(incident._id))];
+};
+
 function Home() {
   const navigate = useNavigate();
 
@@ -18,15 +24,19 @@ function Home() {
   });
 
   const [incidents, setIncidents] = useState([]);
+  const [next, setNext] = useState(null);
   const [filters, setFilters] = useState({ severity: "", location: "" });
 
-  // Updated fetchIncidents with try/catch and comment
-  const fetchIncidents = async () => {
+  // First page on load, older pages on "Load more"
+  const fetchIncidents = async (after = null) => {
     try {
-      const res = await fetch(`${API_BASE}/incidents`);
+      const query = after ? `?${new URLSearchParams({ after })}` : "";
+      const res = await fetch(`${API_BASE}/incidents${query}`);
       const json = await res.json();
       if (json.status === "success") {
-        setIncidents(json.data); // This will only include approved & non-flagged incidents
+        // This will only include approved & non-flagged incidents
+        setIncidents((prev) => (after ? mergeIncidents(json.data, prev) : json.data));
+        setNext(json.next);
       }
     } catch (err) {
       console.error("Error fetching incidents:", err);
@@ -36,8 +46,16 @@ function Home() {
   useEffect(() => {
     fetchIncidents();
     const socket = io(API_BASE);
-    socket.on("new_incident", () => {
-      fetchIncidents();
+    // Patch the list from the events instead of fetching it again
+    socket.on("new_incident", (incident) => {
+      setIncidents((prev) => mergeIncidents(prev, [incident]));
+    });
+    socket.on("new_incidents", (batch) => {
+      setIncidents((prev) => mergeIncidents(prev, batch.data));
+    });
+    socket.on("incidents_removed", (batch) => {
+      const gone = new Set(batch.ids);
+      setIncidents((prev) => prev.filter((inc) => !gone.has(inc._id)));
     });
     return () => socket.disconnect();
   }, []);
@@ -60,7 +78,6 @@ function Home() {
         latitude: "",
         longitude: "",
       });
-      fetchIncidents();
     } else {
       alert(json.message);
     }
@@ -70,7 +87,7 @@ function Home() {
     return (
       (filters.severity ? inc.severity === filters.severity : true) &&
       (filters.location
-        ? inc.location.toLowerCase().includes(filters.location.toLowerCase())
+        ? (inc.location || "").toLowerCase().includes(filters.location.toLowerCase())
         : true)
     );
   });
@@ -123,6 +140,8 @@ function Home() {
         <option value="critical">Critical</option>
       </select>
 
+      {next && <button onClick={() => fetchIncidents(next)}>Load more</button>}
+
       <MapView incidents={filtered} />
     </div>
   );
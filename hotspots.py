@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from geo import KM_PER_DEGREE, in_bbox
+from metrics import stage
+
+HOUR = 3600
+
+
+# === HOTSPOT ENGINE ===
+# Approved incidents are aggregated incrementally into fixed-size grid cells
+# split into hourly buckets. A hotspot query only clusters the occupied
+# cells (weighted by incident count), never the raw incidents, and results
+# are cached until the next add/remove. Clustering runs outside the lock,
+# and "hotspots_updated" goes out at most once per publish_delay however
+# many writes land in between.
+
+class HotspotEngine:
+    def __init__(self, collection, cell_km=1.0, default_k=5, cache_ttl=60, cache_size=128, publish_delay=1.0):
+        self.collection = collection
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.default_k = default_k
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.publish_delay = publish_delay
+        self.cells = {}     # cell -> {hour: [count, sum_lat, sum_lng]}
+        self.points = {}    # incident_id -> (cell, hour, lat, lng)
+        self.cache = OrderedDict()  # quantized query -> (time, result), LRU
+        self.version = 0
+        self.loaded = False
+        self.lock = threading.RLock()
+        self.on_change = None
+        self.publisher = None
+        # (lats, lngs, weights, k) -> hotspots; asgi.py runs it in a worker process
+        self.cluster = self._cluster
+
+    def _cell(self, lat, lng):
+        return (int(np.floor(lat / self.cell_deg)), int(np.floor(lng / self.cell_deg)))
+
+    @staticmethod
+    def _hour(ts):
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        if isinstance(ts, datetime):
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)  # stored as naive UTC
+            ts = ts.timestamp()
+        return int((ts or time.time()) // HOUR)
+
+    def load(self):
+        query = {
+            "latitude": {"$exists": True},
+            "longitude": {"$exists": True},
+            "approved": True,
+            "flagged": False,
+            "spam": False,
+        }
+        with self.lock:
+            self.cells.clear()
+            self.points.clear()
+            for doc in self.collection.find(query, {"latitude": 1, "longitude": 1, "timestamp": 1}):
+                self._add(str(doc["_id"]), doc)
+            self.loaded = True
+            self._changed(notify=False)
+            print(f"Hotspot engine loaded: {len(self.points)} incidents in {len(self.cells)} cells.")
+
+    def _add(self, incident_id, doc):
+        lat, lng = float(doc["latitude"]), float(doc["longitude"])
+        cell, hour = self._cell(lat, lng), self._hour(doc.get("timestamp"))
+        bucket = self.cells.setdefault(cell, {}).setdefault(hour, [0, 0.0, 0.0])
+        bucket[0] += 1
+        bucket[1] += lat
+        bucket[2] += lng
+        self.points[incident_id] = (cell, hour, lat, lng)
+
+    def _remove(self, incident_id):
+        entry = self.points.pop(incident_id, None)
+        if entry is None:
+            return False
+        cell, hour, lat, lng = entry
+        buckets = self.cells[cell]
+        bucket = buckets[hour]
+        bucket[0] -= 1
+        bucket[1] -= lat
+        bucket[2] -= lng
+        if bucket[0] == 0:
+            del buckets[hour]
+            if not buckets:
+                del self.cells[cell]
+        return True
+
+    def add(self, incident_id, doc):
+        if doc.get("latitude") is None or doc.get("longitude") is None:
+            return
+        with self.lock:
+            if not self.loaded:
+                return  # picked up from the database on first load
+            self._remove(incident_id)
+            self._add(incident_id, doc)
+            self._changed()
+
+    def remove(self, incident_id):
+        with self.lock:
+            if self.loaded and self._remove(incident_id):
+                self._changed()
+
+    # Batches (bulk moderation, archiving): one recluster and one
+    # "hotspots_updated" for the whole batch
+
+    def add_many(self, items):
+        # items: (incident_id, doc) pairs
+        with self.lock:
+            if not self.loaded:
+                return
+            added = False
+            for incident_id, doc in items:
+                if doc.get("latitude") is None or doc.get("longitude") is None:
+                    continue
+                self._remove(incident_id)
+                self._add(incident_id, doc)
+                added = True
+            if added:
+                self._changed()
+
+    def remove_many(self, incident_ids):
+        with self.lock:
+            if not self.loaded:
+                return
+            removed = [self._remove(incident_id) for incident_id in incident_ids]
+            if any(removed):
+                self._changed()
+
+    def _changed(self, notify=True):
+        self.version += 1
+        self.cache.clear()
+        if notify and self.on_change and self.publisher is None:
+            # Later writes inside the delay ride on this publish
+            self.publisher = threading.Timer(self.publish_delay, self._publish)
+            self.publisher.daemon = True
+            self.publisher.start()
+
+    def _publish(self):
+        with self.lock:
+            self.publisher = None
+        try:
+            self.on_change(self.hotspots())
+        except Exception as e:
+            print("Hotspot publish error:", e)
+
+    def _cell_weights(self, window_hours, half_life_hours, bbox):
+        now_hour = self._hour(None)
+        min_hour = now_hour - window_hours if window_hours else None
+        lats, lngs, weights = [], [], []
+        for buckets in self.cells.values():
+            count = sum_lat = sum_lng = 0.0
+            for hour, (n, slat, slng) in buckets.items():
+                if min_hour is not None and hour < min_hour:
+                    continue
+                w = 0.5 ** ((now_hour - hour) / half_life_hours) if half_life_hours else 1.0
+                count += n * w
+                sum_lat += slat * w
+                sum_lng += slng * w
+            if count <= 0:
+                continue
+            lat, lng = sum_lat / count, sum_lng / count
+            if bbox and not in_bbox(lat, lng, *bbox):
+                continue
+            lats.append(lat)
+            lngs.append(lng)
+            weights.append(count)
+        return np.array(lats), np.array(lngs), np.array(weights)
+
+    def hotspots(self, k=None, window_hours=None, half_life_hours=None, bbox=None):
+        # bbox is (south, west, north, east); west > east crosses the antimeridian
+        k = k or self.default_k
+        if window_hours is not None and window_hours <= 0:
+            raise ValueError("window_hours must be positive")
+        if half_life_hours is not None and half_life_hours <= 0:
+            raise ValueError("half_life_hours must be positive")
+        # Quantized, so arbitrary floats share cache entries: whole hours (the
+        # bucket size), 0.1 h half-lives and ~100 m bbox edges
+        if window_hours is not None:
+            window_hours = int(np.ceil(window_hours))
+        if half_life_hours is not None:
+            half_life_hours = max(round(half_life_hours, 1), 0.1)
+        if bbox:
+            bbox = tuple(round(float(v), 3) for v in bbox)
+        key = (k, window_hours, half_life_hours, bbox)
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            cached = self.cache.get(key)
+            # Windowed/decayed results age with the clock even without writes
+            timed = window_hours or half_life_hours
+            if cached and not (timed and time.monotonic() - cached[0] > self.cache_ttl):
+                self.cache.move_to_end(key)
+                return cached[1]
+            version = self.version
+            lats, lngs, weights = self._cell_weights(window_hours, half_life_hours, bbox)
+        with stage("kmeans"):
+            result = self.cluster(lats, lngs, weights, k)
+        with self.lock:
+            # A write during clustering already cleared the cache; don't refill it
+            if self.version == version:
+                self.cache[key] = (time.monotonic(), result)
+                self.cache.move_to_end(key)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _cluster(lats, lngs, weights, k):
+        if len(weights) == 0:
+            return []
+        k = min(k, len(weights))
+        coords = np.column_stack([lats, lngs])
+        if k == len(weights):
+            labels = np.arange(k)
+        else:
+            from sklearn.cluster import KMeans
+            labels = KMeans(n_clusters=k, random_state=42, n_init=3).fit_predict(coords, sample_weight=weights)
+        hotspots = []
+        for i in range(k):
+            mask = labels == i
+            total = weights[mask].sum()
+            if total <= 0:
+                continue
+            hotspots.append({
+                "lat": float((lats[mask] * weights[mask]).sum() / total),
+                "lng": float((lngs[mask] * weights[mask]).sum() / total),
+                "count": int(round(total)),
+            })
+        return hotspots
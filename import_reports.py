@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+
+from classify_cache import CachedClassifier
+from database import MongoStore, MONGO_DB, MONGO_URI
+from dedupe import DuplicateIndex
+from ingest import IngestPipeline, READERS, DEFAULT_BATCH_SIZE
+from keywords import KeywordMatcher
+from model_registry import ModelRegistry
+
+# Stream a partner feed or historical backfill into crime_reports.incidents.
+#   python import_reports.py reports.ndjson
+#   python import_reports.py backfill.csv --batch-size 5000 --no-dedupe
+#   cat feed.ndjson | python import_reports.py - --format ndjson
+# With SOCKETIO_MESSAGE_QUEUE set, connected map clients get one
+# notification per batch through the running servers.
+
+
+def open_input(path):
+    if path == "-":
+        return sys.stdin
+    return open(path, encoding="utf-8", newline="")
+
+
+def make_notifier():
+    url = os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+    if not url:
+        return None
+    from flask_socketio import SocketIO
+    from realtime import GeoBroadcaster
+    return GeoBroadcaster(SocketIO(message_queue=url)).publish_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import incident reports from NDJSON or CSV")
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=sorted(READERS), help="default: from the file extension")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--db", default=MONGO_DB)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--no-dedupe", action="store_true", help="skip near-duplicate merging")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    collection = MongoStore(args.mongo_uri, args.db).incidents
+
+    registry = ModelRegistry()
+    registry.load()
+    keywords = KeywordMatcher.from_file()
+    classifier = CachedClassifier(registry, keywords.match, lexicon_version=keywords.version)
+
+    duplicate_index = None
+    if not args.no_dedupe:
+        duplicate_index = DuplicateIndex(window_minutes=30, radius_km=1.0)
+        duplicate_index.load(collection)
+
+    pipeline = IngestPipeline(collection, classifier, duplicate_index=duplicate_index,
+                              notify=make_notifier(), batch_size=args.batch_size)
+    with open_input(args.path) as f:
+        summary = pipeline.run(READERS[fmt](f))
+
+    for error in summary.pop("errors"):
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(", ".join(f"{k}={v}" for k, v in summary.items()))
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,8 @@
 from flask import Blueprint, jsonify
-from database.mongo import get_all_incidents
+from database import get_all_incidents
 
 incidents_bp = Blueprint("incidents", __name__)
 
-@incidents_bp.route("/", methods=["GET"])
+@incidents_bp.route("", methods=["GET"])
 def get_incidents():
-    incidents = get_all_incidents()
-    for i in incidents:
-        i["_id"] = str(i["_id"])
-    return jsonify(incidents)
\ No newline at end of file
+    return jsonify(get_all_incidents())
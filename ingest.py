@@ -0,0 +1,338 @@
+import csv
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from dedupe import text_fingerprints
+from geo import to_point
+from metrics import stage
+from stats import STATS_PROJECTION
+
+REQUIRED_FIELDS = ("location", "severity", "description")
+DEFAULT_BATCH_SIZE = 1000
+MAX_ERRORS = 100
+MAX_DUPLICATE_REPORTS = 50  # newest kept on the incident; report_count keeps the total
+SEVERITY_RANK = {"low": 0, "moderate": 1, "medium": 1, "high": 2, "critical": 3}
+
+
+# === VALIDATION ===
+
+def _coordinate(value, name, limit):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not -limit <= value <= limit:
+        raise ValueError(f"{name} out of range")
+    return value
+
+
+def _timestamp(value):
+    # Backfills carry their own time: ISO string or epoch seconds, stored as naive UTC
+    if isinstance(value, datetime):
+        ts = value
+    elif isinstance(value, (int, float)):
+        ts = datetime.fromtimestamp(value, timezone.utc)
+    else:
+        try:
+            ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError("timestamp must be ISO 8601 or epoch seconds")
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def validate_report(data, allow_timestamp=False):
+    # Returns a cleaned copy of the report or raises ValueError
+    if not isinstance(data, dict):
+        raise ValueError("Report must be an object")
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        raise ValueError("Missing fields: " + ", ".join(missing))
+    report = {field: str(data[field]) for field in REQUIRED_FIELDS}
+    lat, lng = data.get("latitude"), data.get("longitude")
+    if lat not in (None, "") and lng not in (None, ""):
+        report["latitude"] = _coordinate(lat, "latitude", 90)
+        report["longitude"] = _coordinate(lng, "longitude", 180)
+    elif lat not in (None, "") or lng not in (None, ""):
+        raise ValueError("latitude and longitude must be given together")
+    if allow_timestamp and data.get("timestamp") not in (None, ""):
+        report["timestamp"] = _timestamp(data["timestamp"])
+    return report
+
+
+def build_incident(report, prediction, now):
+    # Auto-flag logic based on spam detection and suspicious keywords
+    spam_flag = bool(prediction["is_spam"])
+    flagged = spam_flag or bool(prediction["suspicious"])
+    incident = {
+        "type": prediction["predicted_type"] or "unknown",
+        "location": report["location"],
+        "severity": report["severity"],
+        "description": report["description"],
+        "latitude": float(report.get("latitude", 0)),
+        "longitude": float(report.get("longitude", 0)),
+        "timestamp": now,
+        "approved": False,
+        "flagged": flagged,
+        "spam": spam_flag,
+        # Cached results from before spam_score existed only carry the verdict
+        "spam_score": prediction.get("spam_score", 1.0 if spam_flag else 0.0),
+        "suspicion_score": prediction["suspicion_score"],
+        "suspicious_terms": prediction["suspicious_terms"],
+        "report_count": 1,
+    }
+    if "latitude" in report:
+        # GeoJSON copy for the 2dsphere index behind /incidents/near|bbox|knn
+        incident["location_point"] = to_point(report["latitude"], report["longitude"])
+    return incident
+
+
+def duplicate_entry(report, now):
+    return {
+        "description": report["description"],
+        "latitude": float(report["latitude"]),
+        "longitude": float(report["longitude"]),
+        "timestamp": now,
+    }
+
+
+def merge_update(report, now):
+    # Update that folds a duplicate report into its canonical incident
+    return merge_many_update([(report, now)])
+
+
+def merge_many_update(reports):
+    # merge_update for several (report, ts) duplicates of the same incident
+    return {
+        "$inc": {"report_count": len(reports)},
+        "$max": {"last_reported": max(ts for _, ts in reports)},
+        "$push": {"duplicate_reports": {
+            "$each": [duplicate_entry(r, ts) for r, ts in reports],
+            "$slice": -MAX_DUPLICATE_REPORTS,
+        }},
+    }
+
+
+def most_severe(severities):
+    # Unknown severities rank below "low"
+    return max(severities, key=lambda s: SEVERITY_RANK.get(s, -1))
+
+
+def escalation(severity):
+    # (filter, update) raising an incident to `severity` while it is less
+    # severe: a no-op otherwise, so concurrent merges keep the highest rank
+    rank = SEVERITY_RANK.get(severity)
+    lower = [s for s, r in SEVERITY_RANK.items() if rank is not None and r < rank]
+    if not lower:
+        return None
+    return {"severity": {"$in": lower}}, {"$set": {"severity": severity}}
+
+
+# === READERS ===
+# Each reader yields (line_number, record); unparseable lines yield the
+# exception instead of a record so the pipeline can report them.
+
+def read_ndjson(lines):
+    for line_no, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+def read_csv(lines):
+    lines = (l.decode("utf-8") if isinstance(l, bytes) else l for l in lines)
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_json_array(records):
+    for index, record in enumerate(records, 1):
+        yield index, record
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# === INGEST PIPELINE ===
+# read -> validate -> batch -> dedupe -> classify on the calling thread,
+# insert_many(ordered=False) + duplicate merges + one notification per
+# batch on a writer thread. The hand-off queue is bounded, so a slow
+# database blocks the producer, which in turn stops pulling input.
+# Each batch is held back until the next one has been deduped, so
+# duplicates straddling a batch boundary still fold in memory instead of
+# costing an update round trip.
+
+class IngestPipeline:
+    def __init__(self, collection, classifier, duplicate_index=None, notify=None, stats=None,
+                 batch_size=DEFAULT_BATCH_SIZE, queue_depth=2, max_errors=MAX_ERRORS, queued=None,
+                 escalated=None):
+        self.collection = collection
+        self.classifier = classifier
+        self.duplicate_index = duplicate_index
+        self.notify = notify        # non-spam incidents of a batch (map clients)
+        self.queued = queued        # every inserted incident of a batch (moderation queue)
+        self.escalated = escalated  # (before, severity) when a duplicate raised an older incident
+        self.stats = stats
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.max_errors = max_errors
+
+    def run(self, records, allow_timestamp=True):
+        summary = {"received": 0, "inserted": 0, "merged": 0, "invalid": 0, "failed": 0, "errors": []}
+        started = time.perf_counter()
+        jobs = queue.Queue(maxsize=self.queue_depth)
+        writer = threading.Thread(target=self._write_loop, args=(jobs, summary), daemon=True)
+        writer.start()
+        held = {}
+        try:
+            valid = self._validate(records, summary, allow_timestamp)
+            for batch in batched(valid, self.batch_size):
+                fresh, merges = self._prepare(batch, held, summary)
+                jobs.put(self._job(held, merges))
+                held = fresh
+            jobs.put(self._job(held, {}))
+        finally:
+            jobs.put(None)
+            writer.join()
+        elapsed = time.perf_counter() - started
+        summary["elapsed_s"] = round(elapsed, 3)
+        summary["rate"] = round(summary["received"] / elapsed) if elapsed else 0
+        return summary
+
+    def _error(self, summary, line_no, message):
+        if len(summary["errors"]) < self.max_errors:
+            summary["errors"].append({"line": line_no, "error": message})
+
+    def _validate(self, records, summary, allow_timestamp):
+        for line_no, record in records:
+            summary["received"] += 1
+            if isinstance(record, Exception):
+                summary["invalid"] += 1
+                self._error(summary, line_no, str(record))
+                continue
+            try:
+                yield line_no, validate_report(record, allow_timestamp)
+            except ValueError as e:
+                summary["invalid"] += 1
+                self._error(summary, line_no, str(e))
+
+    def _prepare(self, batch, held, summary):
+        # Dedupe first so merged reports are never classified
+        now = datetime.utcnow()
+        if self.duplicate_index is not None:
+            fingerprints = text_fingerprints([report["description"] for _, report in batch])
+        else:
+            fingerprints = [None] * len(batch)
+        fresh = {}       # id -> [ObjectId, line, report, ts, [(duplicate report, ts), ...], prediction]
+        merges = {}      # written incident id -> [(report, ts), ...]
+        for (line_no, report), fingerprint in zip(batch, fingerprints):
+            ts = report.get("timestamp", now)
+            located = fingerprint is not None and "latitude" in report
+            if located:
+                duplicate_id = self.duplicate_index.find(fingerprint, report["latitude"], report["longitude"], ts)
+                if duplicate_id is not None:
+                    summary["merged"] += 1
+                    canonical = fresh.get(duplicate_id) or held.get(duplicate_id)
+                    if canonical is not None:
+                        canonical[4].append((report, ts))
+                    else:
+                        merges.setdefault(duplicate_id, []).append((report, ts))
+                    continue
+            object_id = ObjectId()
+            fresh[str(object_id)] = [object_id, line_no, report, ts, [], None]
+            if located:
+                self.duplicate_index.add(str(object_id), fingerprint, report["latitude"], report["longitude"], ts)
+
+        with stage("classify"):
+            predictions = self.classifier.classify([entry[2]["description"] for entry in fresh.values()])
+        for entry, prediction in zip(fresh.values(), predictions):
+            entry[5] = prediction
+        return fresh, merges
+
+    def _job(self, fresh, merges):
+        docs, lines = [], {}
+        for object_id, line_no, report, ts, duplicates, prediction in fresh.values():
+            incident = build_incident(report, prediction, ts)
+            incident["_id"] = object_id
+            if duplicates:
+                incident["report_count"] += len(duplicates)
+                incident["last_reported"] = max(t for _, t in duplicates)
+                incident["duplicate_reports"] = [duplicate_entry(r, t) for r, t in duplicates[-MAX_DUPLICATE_REPORTS:]]
+                incident["severity"] = most_severe([incident["severity"]] + [r["severity"] for r, _ in duplicates])
+            docs.append(incident)
+            lines[str(object_id)] = line_no
+        return docs, lines, merges
+
+    def _write_loop(self, jobs, summary):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            try:
+                self._write(*job, summary)
+            except Exception as e:
+                print("Ingest write error:", e)
+                self._error(summary, None, str(e))
+
+    def _write(self, docs, lines, merges, summary):
+        inserted = docs
+        if docs:
+            try:
+                with stage("insert"):
+                    self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+                for index, message in sorted(failed.items()):
+                    incident_id = str(docs[index]["_id"])
+                    self._error(summary, lines.get(incident_id), message)
+                    if self.duplicate_index is not None:
+                        self.duplicate_index.remove(incident_id)
+                summary["failed"] += len(failed)
+                inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+            except Exception:
+                summary["failed"] += len(docs)
+                raise
+            summary["inserted"] += len(inserted)
+            if self.stats is not None:
+                self.stats.add_many(inserted)
+        # Duplicates of older incidents are rare; one combined update per incident
+        for incident_id, reports in merges.items():
+            oid = ObjectId(incident_id)
+            self.collection.update_one({"_id": oid}, merge_many_update(reports))
+            raise_to = escalation(most_severe([r["severity"] for r, _ in reports]))
+            if raise_to:
+                before = self.collection.find_one_and_update({"_id": oid, **raise_to[0]}, raise_to[1],
+                                                             projection=STATS_PROJECTION)
+                if before and self.escalated:
+                    self.escalated(before, raise_to[1]["$set"]["severity"])
+        if self.queued and inserted:
+            self.queued(inserted)
+        if self.notify:
+            visible = [doc for doc in inserted if not doc["spam"]]
+            if visible:
+                self.notify(visible)
@@ -0,0 +1,171 @@
+import json
+import os
+import re
+from collections import deque
+
+WORD_RE = re.compile(r"\w+")
+
+LEXICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons.json")
+
+
+def is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+# === TEXT FOLDING ===
+# Text and patterns go through the same folding so transliteration variants
+# meet in the middle: lowercase, configured letter substitutions (q -> k,
+# v -> w, ...), runs of the same letter collapsed ("maaro" -> "maro"), and
+# any run of non-word characters reduced to one space.
+
+class Folder:
+    def __init__(self, substitutions=None, collapse_repeats=True, memo_size=100000):
+        self.substitutions = substitutions or {}
+        self.collapse_repeats = collapse_repeats
+        self.memo_size = memo_size
+        self.memo = {}
+
+    def __call__(self, text):
+        # Folding never crosses a word boundary, so fold word by word and
+        # remember each word: report vocabulary repeats heavily
+        memo = self.memo
+        words = WORD_RE.findall(text.lower())
+        out = [memo.get(w) or self._fold_word(w) for w in words]
+        return " ".join(out)
+
+    def _fold_word(self, word):
+        out = []
+        prev = None
+        for ch in word:
+            ch = self.substitutions.get(ch, ch)
+            if ch == prev and self.collapse_repeats:
+                continue
+            out.append(ch)
+            prev = ch
+        folded = "".join(out)
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[word] = folded
+        return folded
+
+
+# === AHO-CORASICK ===
+
+class AhoCorasick:
+    def __init__(self, patterns):
+        # patterns: list of strings; matches report the pattern's index
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = nxt
+            self.output[node].append(index)
+        self.lengths = [len(p) for p in patterns]
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        # Fold the failure links into full transition tables (a DFA), so
+        # scanning costs one dict lookup per character
+        self.delta = [dict(self.goto[0])] + [None] * (len(self.goto) - 1)
+        for node in order:
+            self.delta[node] = {**self.delta[self.fail[node]], **self.goto[node]}
+
+    def iter(self, text):
+        # Yields (start, end, pattern_index) for every occurrence
+        node = 0
+        delta, output, lengths = self.delta, self.output, self.lengths
+        for i, ch in enumerate(text):
+            node = delta[node].get(ch, 0)
+            if output[node]:
+                for index in output[node]:
+                    yield i - lengths[index] + 1, i + 1, index
+
+
+# === KEYWORD MATCHER ===
+# Lexicon entries are "term": weight or "term": {"weight": w, "variants": [...]}.
+# A trailing "*" makes the term a prefix ("terror*" matches "terrorist");
+# otherwise both ends must sit on word boundaries, so "skill" never hits "kill".
+
+class KeywordMatcher:
+    def __init__(self, lexicons, threshold=1.0, substitutions=None, collapse_repeats=True, version=None):
+        self.threshold = threshold
+        self.version = version
+        self.fold = Folder(substitutions, collapse_repeats)
+        self.terms = []     # (term, lexicon, weight, prefix)
+        patterns = []
+        seen = {}
+        for lexicon, entries in lexicons.items():
+            for term, spec in entries.items():
+                if isinstance(spec, dict):
+                    weight, variants = float(spec.get("weight", 1.0)), spec.get("variants", [])
+                else:
+                    weight, variants = float(spec), []
+                for surface in [term] + list(variants):
+                    prefix = surface.endswith("*")
+                    folded = self.fold(surface.rstrip("*"))
+                    if not folded or (folded, prefix) in seen:
+                        continue
+                    seen[(folded, prefix)] = len(patterns)
+                    patterns.append(folded)
+                    self.terms.append((term.rstrip("*"), lexicon, weight, prefix))
+        self.automaton = AhoCorasick(patterns)
+
+    @classmethod
+    def from_file(cls, path=LEXICON_FILE):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            config["lexicons"],
+            threshold=config.get("threshold", 1.0),
+            substitutions=config.get("substitutions"),
+            collapse_repeats=config.get("collapse_repeats", True),
+            version=config.get("version"),
+        )
+
+    def match(self, text):
+        folded = self.fold(text)
+        hits = {}
+        n = len(folded)
+        for start, end, index in self.automaton.iter(folded):
+            term, lexicon, weight, prefix = self.terms[index]
+            if start > 0 and is_word_char(folded[start - 1]):
+                continue
+            if not prefix and end < n and is_word_char(folded[end]):
+                continue
+            hit = hits.get(term)
+            if hit is None:
+                hits[term] = {"term": term, "lexicon": lexicon, "weight": weight, "count": 1}
+            else:
+                hit["count"] += 1
+                hit["weight"] = max(hit["weight"], weight)
+        # Each distinct term counts once towards the score
+        score = sum(h["weight"] for h in hits.values())
+        return {
+            "suspicious": score >= self.threshold,
+            "score": round(score, 3),
+            "terms": sorted(hits.values(), key=lambda h: -h["weight"]),
+        }
+
+    def is_suspicious(self, text):
+        return self.match(text)["suspicious"]
@@ -0,0 +1,318 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from contextvars import ContextVar
+from functools import wraps
+
+# === METRICS ===
+# Prometheus-style counters, histograms and callback gauges kept in process
+# memory and rendered by GET /metrics in the text exposition format.
+# Recording a value is a bisect and a short locked increment (about a
+# microsecond), cheap enough to leave on under load. Each worker process
+# has its own registry; Prometheus scrapes them separately.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = list(self.values.items())
+        return [(self.name, _labels(self.labels, key), value) for key, value in values]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.series.get(labels)
+            if counts is None:
+                counts = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[i] += 1
+            counts[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self.lock:
+            series = [(key, list(counts)) for key, counts in self.series.items()]
+        samples = []
+        for key, counts in series:
+            total = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                total += n
+                samples.append((self.name + "_bucket", _labels(self.labels + ("le",), key + (_number(bound),)), total))
+            samples.append((self.name + "_sum", _labels(self.labels, key), counts[-1]))
+            samples.append((self.name + "_count", _labels(self.labels, key), total))
+        return samples
+
+
+class Gauge:
+    # Read when scraped: fn() returns a number, or {label value(s): number}
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Gauge {self.name} failed: {e}")
+            return []
+        if not isinstance(value, dict):
+            return [(self.name, "", value)]
+        return [(self.name, _labels(self.labels, key if isinstance(key, tuple) else (key,)), v)
+                for key, v in value.items()]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = cls(name, *args, **kwargs)
+        return metric
+
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labels, buckets)
+
+
+def gauge(name, help, fn, labels=()):
+    with _registry_lock:
+        REGISTRY[name] = Gauge(name, help, fn, labels)  # latest callback wins
+        return REGISTRY[name]
+
+
+def render():
+    lines = []
+    for metric in list(REGISTRY.values()):
+        samples = metric.samples()
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# === STAGES ===
+# Per-route, per-stage time: `with stage("classify"):` or @timed("kmeans").
+# The route comes from the request being handled in this context (set by
+# instrument(), or by asgi.py per task); work done on worker threads is
+# labelled "background".
+
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency", ("route", "method", "status"))
+STAGE_SECONDS = histogram("stage_duration_seconds", "Time spent per stage of a route", ("route", "stage"))
+
+_route = ContextVar("metrics_route", default="background")
+_started = ContextVar("metrics_started", default=None)
+
+
+def current_route():
+    return _route.get()
+
+
+def set_route(route):
+    _route.set(route)
+
+
+class stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, current_route(), self.name)
+
+
+def timed(name):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, current_route(), name)
+
+
+def instrument(app):
+    from flask import request
+
+    @app.before_request
+    def _start_timer():
+        _route.set(request.url_rule.rule if request.url_rule else "unmatched")
+        _started.set(time.perf_counter())
+
+    @app.after_request
+    def _record(response):
+        start = _started.get()
+        if start is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, current_route(), request.method,
+                                    str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def _clear(exc):
+        _route.set("background")
+        _started.set(None)
+
+
+# === SAMPLING PROFILER ===
+# Off by default. While running, a daemon thread snapshots every thread's
+# Python stack every `interval` seconds and counts them in the folded
+# format ("thread;file:func;file:func count") read by flamegraph.pl and
+# speedscope. It stops itself after `duration` seconds.
+
+class SamplingProfiler:
+    def __init__(self):
+        self.stacks = StackCounter()
+        self.samples = 0
+        self.interval = None
+        self.started = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval=0.005, duration=30.0, reset=True):
+        if not 0.001 <= interval <= 1.0:
+            raise ValueError("interval must be between 1 and 1000 ms")
+        if not 0 < duration <= 600:
+            raise ValueError("duration must be between 0 and 600 seconds")
+        with self.lock:
+            if self.running:
+                return False
+            if reset:
+                self.stacks.clear()
+                self.samples = 0
+            self.interval = interval
+            self.started = time.time()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, args=(interval, duration),
+                                           name="sampling-profiler", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        self.stop_event.set()
+        thread = self.thread
+        if thread is not None:
+            thread.join()
+        return self.samples
+
+    def _run(self, interval, duration):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self.stop_event.wait(interval) and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            folded = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                folded.append(";".join(reversed(stack)))
+            with self.lock:
+                self.stacks.update(folded)
+                self.samples += 1
+
+    def folded(self):
+        with self.lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def info(self):
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "interval_ms": self.interval * 1000 if self.interval else None,
+            "started": self.started,
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,465 @@
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from classifier import Classifier
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+ARTIFACTS = {
+    "spam_model": "spam_model.pkl",
+    "spam_vectorizer": "spam_vectorizer.pkl",
+    "incident_model": "incident_model.pkl",
+    "incident_vectorizer": "incident_vectorizer.pkl",
+}
+COMPACT_DIR = "compact"
+COMPACT_FILE = "compact.npz"  # versions exported before COMPACT_DIR
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+# Layout:
+#   models/CURRENT            name of the active version
+#   models/<version>/         the four pickles, manifest.json, compact/*.npy
+
+
+# === COMPACT INFERENCE FORMAT ===
+# A fitted Count/Tfidf/HashingVectorizer + MultinomialNB reduced to NumPy
+# arrays (plus the vocabulary for Count/Tfidf), so serving needs neither
+# sklearn nor pickle. Arrays are plain .npy files, memory-mapped on load:
+# a worker starts without reading the model matrices, and workers on one
+# host share their pages.
+
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+HASH_MEMO_SIZE = 200_000
+
+
+def murmurhash3_32(data, seed=0):
+    # Signed MurmurHash3 (x86, 32-bit) of bytes, as sklearn.utils.murmurhash3_32
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed
+    length = len(data)
+    rounded = length & ~3
+    for i in range(0, rounded, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    if length & 3:
+        k = int.from_bytes(data[rounded:], "little")
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+class CompactVectorizer:
+    def __init__(self, vocabulary, idf=None, norm=None, token_pattern=DEFAULT_TOKEN_PATTERN, ngram_range=(1, 1)):
+        self.vocabulary_ = vocabulary
+        self.idf = idf
+        self.norm = norm
+        self.token_re = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = len(vocabulary)
+
+    def terms(self, text):
+        # sklearn's word analyzer: lowercase, token_pattern, then n-grams
+        tokens = self.token_re.findall(text.lower())
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def column(self, term):
+        return self.vocabulary_.get(term)
+
+    def transform(self, texts):
+        # Whole batch as flat arrays: (n_rows, row ids, feature indices, weights)
+        column = self.column
+        n_features = self.n_features
+        keys = []
+        for row, text in enumerate(texts):
+            offset = row * n_features
+            for term in self.terms(text):
+                idx = column(term)
+                if idx is not None:
+                    keys.append(offset + idx)
+        keys, counts = np.unique(np.array(keys, dtype=np.int64), return_counts=True)
+        rows, indices = np.divmod(keys, n_features)
+        values = counts.astype(np.float64)
+        if self.idf is not None:
+            values *= self.idf[indices]
+        if self.norm == "l2" and len(values):
+            norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(texts)))
+            values /= norms[rows]
+        return len(texts), rows, indices, values
+
+
+class CompactHashingVectorizer(CompactVectorizer):
+    # HashingVectorizer(alternate_sign=False): a term's column is its hash
+    # modulo n_features. Hashes are memoised; report vocabulary is small
+    # next to the number of requests.
+    def __init__(self, n_features, norm="l2", token_pattern=DEFAULT_TOKEN_PATTERN, ngram_range=(1, 1)):
+        self.n_features = n_features
+        self.idf = None
+        self.norm = norm
+        self.token_re = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.columns = {}
+
+    def column(self, term):
+        idx = self.columns.get(term)
+        if idx is None:
+            h = murmurhash3_32(term.encode("utf-8"))
+            # abs(-2**31) does not fit an int32; sklearn special-cases it
+            idx = (2147483647 - (self.n_features - 1)) % self.n_features if h == -2147483648 else abs(h) % self.n_features
+            if len(self.columns) < HASH_MEMO_SIZE:
+                self.columns[term] = idx
+        return idx
+
+
+class CompactNB:
+    def __init__(self, classes, class_log_prior, feature_log_prob):
+        self.classes_ = classes
+        self.class_log_prior_ = class_log_prior
+        self.feature_log_prob_ = feature_log_prob
+        self.n_features_in_ = feature_log_prob.shape[1]
+
+    def _joint_log_likelihood(self, X):
+        # (n_classes, n_rows)
+        n_rows, rows, indices, values = X
+        weighted = self.feature_log_prob_[:, indices] * values
+        return self.class_log_prior_[:, None] + np.stack(
+            [np.bincount(rows, weights=w, minlength=n_rows) for w in weighted])
+
+    def predict(self, X):
+        return self.classes_[self._joint_log_likelihood(X).argmax(axis=0)]
+
+    def predict_proba(self, X):
+        scores = self._joint_log_likelihood(X)
+        scores = np.exp(scores - scores.max(axis=0))
+        return (scores / scores.sum(axis=0)).T
+
+
+def _check_exportable(vectorizer):
+    params = vectorizer.get_params()
+    hashing = not hasattr(vectorizer, "vocabulary_")
+    if hashing and not hasattr(vectorizer, "n_features"):
+        raise ValueError(f"{type(vectorizer).__name__} has no vocabulary for the compact format")
+    supported = (
+        params.get("analyzer") == "word"
+        and params.get("lowercase", True)
+        and not params.get("stop_words")
+        and not params.get("strip_accents")
+        and params.get("tokenizer") is None
+        and params.get("preprocessor") is None
+        and not params.get("binary")
+        and not params.get("sublinear_tf")
+        and not (hashing and params.get("alternate_sign"))
+        and params.get("norm") in (None, "l2")
+    )
+    if not supported:
+        raise ValueError(f"{type(vectorizer).__name__} configuration is not supported by the compact format")
+    return hashing
+
+
+def _compact_arrays(prefix, model, vectorizer):
+    hashing = _check_exportable(vectorizer)
+    arrays = {
+        f"{prefix}_classes": np.asarray(model.classes_).astype(str) if model.classes_.dtype == object else model.classes_,
+        f"{prefix}_class_log_prior": model.class_log_prior_,
+        f"{prefix}_feature_log_prob": model.feature_log_prob_,
+        f"{prefix}_token_pattern": np.array(vectorizer.token_pattern),
+        f"{prefix}_ngram_range": np.array(vectorizer.ngram_range),
+    }
+    if hashing:
+        arrays[f"{prefix}_n_features"] = np.array(vectorizer.n_features)
+        arrays[f"{prefix}_norm"] = np.array(vectorizer.norm or "")
+    else:
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        arrays[f"{prefix}_terms"] = np.array(terms, dtype=str)
+    if hasattr(vectorizer, "idf_"):
+        arrays[f"{prefix}_idf"] = vectorizer.idf_
+        arrays[f"{prefix}_norm"] = np.array(vectorizer.norm or "")
+    return arrays
+
+
+def _compact_pair(data, prefix):
+    token_pattern = str(data[f"{prefix}_token_pattern"])
+    ngram_range = tuple(int(n) for n in data[f"{prefix}_ngram_range"]) if f"{prefix}_ngram_range" in data else (1, 1)
+    norm = str(data[f"{prefix}_norm"]) or None if f"{prefix}_norm" in data else None
+    if f"{prefix}_n_features" in data:
+        vectorizer = CompactHashingVectorizer(int(data[f"{prefix}_n_features"]), norm, token_pattern, ngram_range)
+    else:
+        terms = data[f"{prefix}_terms"].tolist()
+        vocabulary = dict(zip(terms, range(len(terms))))
+        idf = data[f"{prefix}_idf"] if f"{prefix}_idf" in data else None
+        vectorizer = CompactVectorizer(vocabulary, idf, norm, token_pattern, ngram_range)
+    model = CompactNB(data[f"{prefix}_classes"], data[f"{prefix}_class_log_prior"], data[f"{prefix}_feature_log_prob"])
+    return model, vectorizer
+
+
+def load_pickles(version_dir):
+    import joblib
+
+    return {name: joblib.load(os.path.join(version_dir, f)) for name, f in ARTIFACTS.items()}
+
+
+def export_compact(version_dir):
+    models = load_pickles(version_dir)
+    arrays = {}
+    arrays.update(_compact_arrays("spam", models["spam_model"], models["spam_vectorizer"]))
+    arrays.update(_compact_arrays("incident", models["incident_model"], models["incident_vectorizer"]))
+    tmp_dir = os.path.join(version_dir, f".{COMPACT_DIR}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), array, allow_pickle=False)
+    final_dir = os.path.join(version_dir, COMPACT_DIR)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.rename(tmp_dir, final_dir)
+
+
+def has_compact(version_dir):
+    return os.path.isdir(os.path.join(version_dir, COMPACT_DIR)) or os.path.exists(os.path.join(version_dir, COMPACT_FILE))
+
+
+def load_compact(version_dir):
+    compact_dir = os.path.join(version_dir, COMPACT_DIR)
+    if os.path.isdir(compact_dir):
+        data = {f[:-4]: np.load(os.path.join(compact_dir, f), mmap_mode="r", allow_pickle=False)
+                for f in os.listdir(compact_dir) if f.endswith(".npy")}
+    else:
+        with np.load(os.path.join(version_dir, COMPACT_FILE), allow_pickle=False) as npz:
+            data = dict(npz)
+    spam_model, spam_vectorizer = _compact_pair(data, "spam")
+    incident_model, incident_vectorizer = _compact_pair(data, "incident")
+    return {
+        "spam_model": spam_model,
+        "spam_vectorizer": spam_vectorizer,
+        "incident_model": incident_model,
+        "incident_vectorizer": incident_vectorizer,
+    }
+
+
+# === VALIDATION / PUBLISHING ===
+
+def n_features(model):
+    if hasattr(model, "feature_log_prob_"):
+        return model.feature_log_prob_.shape[1]
+    return getattr(model, "n_features_in_", None)
+
+
+def validate_pair(name, model, vectorizer):
+    expected = n_features(model)
+    if hasattr(vectorizer, "vocabulary_"):
+        actual = len(vectorizer.vocabulary_)
+    else:
+        actual = vectorizer.n_features  # HashingVectorizer
+    if expected is not None and expected != actual:
+        raise ValueError(f"{name}: vectorizer has {actual} features but model expects {expected}")
+
+
+def new_version():
+    return datetime.utcnow().strftime("v%Y%m%d%H%M%S")
+
+
+def publish(spam_model, spam_vectorizer, incident_model, incident_vectorizer,
+            version=None, metrics=None, root=MODELS_DIR, make_current=True):
+    # Written to a temp directory and renamed, then CURRENT is swapped, so
+    # readers never observe a half-written version.
+    validate_pair("spam", spam_model, spam_vectorizer)
+    validate_pair("incident", incident_model, incident_vectorizer)
+    version = version or new_version()
+    final_dir = os.path.join(root, version)
+    if os.path.exists(final_dir):
+        raise ValueError(f"Model version {version} already exists")
+    tmp_dir = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    objects = {
+        "spam_model": spam_model,
+        "spam_vectorizer": spam_vectorizer,
+        "incident_model": incident_model,
+        "incident_vectorizer": incident_vectorizer,
+    }
+    import joblib
+
+    for name, filename in ARTIFACTS.items():
+        joblib.dump(objects[name], os.path.join(tmp_dir, filename))
+    manifest = {
+        "version": version,
+        "created": datetime.utcnow().isoformat(),
+        "spam_classes": [str(c) for c in spam_model.classes_],
+        "incident_classes": [str(c) for c in incident_model.classes_],
+        "metrics": metrics or {},
+    }
+    try:
+        export_compact(tmp_dir)
+        manifest["compact"] = True
+    except ValueError as e:
+        print(f"Compact export skipped: {e}")
+        manifest["compact"] = False
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp_dir, final_dir)
+    if make_current:
+        set_current(version, root)
+    return version
+
+
+def set_current(version, root=MODELS_DIR):
+    # Only a published version directory under root: the value comes from
+    # POST /admin/models/reload and is later unpickled
+    if not isinstance(version, str) or version not in list_versions(root):
+        raise ValueError(f"Unknown model version: {version}")
+    tmp = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+
+def list_versions(root=MODELS_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        d for d in os.listdir(root)
+        if not d.startswith(".") and os.path.isfile(os.path.join(root, d, MANIFEST_FILE))
+    )
+
+
+def train_dummy_models():
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+
+    def fit(texts, labels):
+        vectorizer = CountVectorizer()
+        model = MultinomialNB()
+        model.fit(vectorizer.fit_transform(texts), labels)
+        return model, vectorizer
+
+    spam_model, spam_vectorizer = fit(
+        ["Help me!", "There's a robbery", "Buy now!", "Free money", "Shooting", "spam message"],
+        [0, 0, 1, 1, 0, 1],
+    )
+    incident_model, incident_vectorizer = fit(
+        ["shooting", "fire", "accident", "flood", "robbery", "murder"],
+        ["violence", "fire", "accident", "disaster", "theft", "violence"],
+    )
+    return spam_model, spam_vectorizer, incident_model, incident_vectorizer
+
+
+# === REGISTRY ===
+
+class ModelRegistry:
+    def __init__(self, root=MODELS_DIR, prefer_compact=True):
+        self.root = root
+        self.prefer_compact = prefer_compact
+        self.current = Classifier()
+        self.version = None
+        self.lock = threading.Lock()
+        self.watcher = None
+        self.listeners = []
+
+    def resolve_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            version = None
+        versions = list_versions(self.root)
+        if version in versions:
+            return version
+        if version:
+            print(f"Ignoring CURRENT: {version!r} is not a published model version")
+        return versions[-1] if versions else None
+
+    def _load_version(self, version):
+        version_dir = os.path.join(self.root, version)
+        if self.prefer_compact and has_compact(version_dir):
+            models = load_compact(version_dir)
+        else:
+            models = load_pickles(version_dir)
+        validate_pair("spam", models["spam_model"], models["spam_vectorizer"])
+        validate_pair("incident", models["incident_model"], models["incident_vectorizer"])
+        return Classifier(version=version, **models)
+
+    def load(self, version=None, train_missing=True):
+        version = version or self.resolve_version()
+        if version is None and not train_missing:
+            # The watcher loads the first version train_model.py publishes
+            print("No model versions found; serving without models.")
+            return None
+        if version is None:
+            print("No model versions found; training dummy models.")
+            version = publish(*train_dummy_models(), root=self.root)
+        classifier = self._load_version(version)
+        # Single reference swap: in-flight requests finish on the old models
+        with self.lock:
+            self.current = classifier
+            self.version = version
+        print(f"Models loaded successfully (version {version}).")
+        for listener in self.listeners:
+            listener(version)
+        return classifier
+
+    def reload(self):
+        version = self.resolve_version()
+        if version and version != self.version:
+            self.load(version)
+            return True
+        return False
+
+    def watch(self, interval=5.0):
+        # Each worker process polls CURRENT, so a publish reaches every worker
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Model reload failed: {e}")
+
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+            self.watcher.start()
+
+    def classify(self, descriptions):
+        return self.current.classify(descriptions)
+
+    def classify_versioned(self, descriptions):
+        # (version, results) from one model snapshot, for cache keys
+        current = self.current
+        return current.version, current.classify(descriptions)
+
+
+if __name__ == "__main__":
+    # python model_registry.py list | current <version> | export <version>
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        for v in list_versions():
+            print(v)
+    elif command == "current":
+        set_current(sys.argv[2])
+        print(f"CURRENT -> {sys.argv[2]}")
+    elif command == "export":
+        export_compact(os.path.join(MODELS_DIR, sys.argv[2]))
+        print(f"Exported {COMPACT_DIR}/ for {sys.argv[2]}")
+    else:
+        print(f"Unknown command: {command}")
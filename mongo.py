@@ -1,59 +1,66 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-
-app = Flask(__name__)
-CORS(app)
-
-# MongoDB connection
-client = MongoClient("mongodb://localhost:27017/")
-db = client["crime_alert_app"]
-reports_collection = db["reports"]
-
-# 🟢 Route: Add a new crime report
-@app.route("/report", methods=["POST"])
-def add_report():
-    try:
-        data = request.get_json()
-        result = reports_collection.insert_one(data)
-        return jsonify({"message": "Report added", "id": str(result.inserted_id)}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# 🔵 Route: Get all incident reports
-@app.route("/incidents", methods=["GET"])
-def get_all_reports():
-    try:
-        reports = list(reports_collection.find())
-        for r in reports:
-            r["_id"] = str(r["_id"])
-        return jsonify(reports), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# 🟠 Route: Get only high severity alerts
-@app.route("/alerts", methods=["GET"])
-def get_high_alerts():
-    try:
-        alerts = list(reports_collection.find({"severity": "high"}))
-        for alert in alerts:
-            alert["_id"] = str(alert["_id"])
-        return jsonify(alerts), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# 🔴 Route: Delete report by ID
-@app.route("/remove_report/<report_id>", methods=["DELETE"])
-def remove_report(report_id):
-    try:
-        result = reports_collection.delete_one({"_id": ObjectId(report_id)})
-        if result.deleted_count == 1:
-            return jsonify({"message": "Report removed successfully"}), 200
-        else:
-            return jsonify({"error": "Report not found"}), 404
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-if __name__ == "__main__":
-    app.run(debug=True)
+import sys
+
+from flask import Flask, jsonify
+from flask_cors import CORS
+
+import app as server
+from alerts import alerts_bp
+from database import JSONProvider, get_client, get_store
+from incidents import incidents_bp
+from report import report_bp
+
+# Legacy API (/report, /incidents, /alerts, /remove_report) served from the
+# same store as app.py. Writes go through app.py's report and remove paths,
+# so its in-memory engines and realtime clients see them too. It used to
+# write its own crime_alert_app.reports collection; `python mongo.py
+# migrate` copies those documents over once and adds the GeoJSON
+# location_point the geo queries need to old incidents.
+
+app = Flask(__name__)
+app.json = JSONProvider(app)
+CORS(app)
+
+app.register_blueprint(report_bp, url_prefix="/report")
+app.register_blueprint(incidents_bp, url_prefix="/incidents")
+app.register_blueprint(alerts_bp, url_prefix="/alerts")
+
+# 🔴 Route: Delete report by ID
+@app.route("/remove_report/<report_id>", methods=["DELETE"])
+def remove_report(report_id):
+    try:
+        removed = get_store().delete_incident(report_id, projection=server.REMOVE_PROJECTION)
+        if removed:
+            server.incident_removed(removed)
+            return jsonify({"message": "Report removed successfully"}), 200
+        else:
+            return jsonify({"error": "Report not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def migrate_legacy_reports(legacy_db="crime_alert_app"):
+    # Old reports were never moderated or classified: they land pending
+    legacy = get_client()[legacy_db]["reports"]
+    store = get_store()
+    moved = 0
+    for doc in legacy.find():
+        if store.get_incident(doc["_id"], {"_id": 1}):
+            continue
+        doc.setdefault("type", "unknown")
+        doc.setdefault("approved", False)
+        doc.setdefault("flagged", False)
+        doc.setdefault("spam", False)
+        doc.setdefault("report_count", 1)
+        doc.setdefault("timestamp", doc["_id"].generation_time.replace(tzinfo=None))
+        store.insert_incident(doc)
+        moved += 1
+    print(f"Migrated {moved} legacy reports.")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate_legacy_reports()
+        get_store().ensure_indexes()
+        print(f"Added location_point to {get_store().backfill_location_points()} incidents.")
+    else:
+        app.run(debug=True)
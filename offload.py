@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# CPU-bound work (model inference, hotspot clustering) moved out of the
+# serving process into a process pool, so it neither holds the GIL nor
+# blocks the event loop. Workers are spawned, not forked: the parent has
+# database sockets and threads that must not be copied. Each worker loads
+# the current models/ version itself and keeps polling CURRENT, like any
+# other server process.
+
+_registry = None
+
+
+def _init_worker():
+    global _registry
+    from model_registry import ModelRegistry
+
+    _registry = ModelRegistry()
+    _registry.load(train_missing=False)  # the serving process trains, if anyone
+    _registry.watch()
+
+
+def classify(texts):
+    # With the worker's own version: it polls CURRENT on its own schedule
+    return _registry.classify_versioned(texts)
+
+
+def cluster(lats, lngs, weights, k):
+    from hotspots import HotspotEngine
+
+    return HotspotEngine._cluster(lats, lngs, weights, k)
+
+
+def make_pool(workers=None):
+    workers = workers or int(os.environ.get("OFFLOAD_WORKERS", 0)) or max(1, (os.cpu_count() or 2) - 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker)
+
+
+class PooledRegistry:
+    # Stands in for ModelRegistry behind CachedClassifier: version and
+    # has_spam/has_type come from the local registry (which keeps watching
+    # CURRENT), predictions from the pool together with the version of the
+    # worker that made them
+    def __init__(self, registry, pool):
+        self.registry = registry
+        self.pool = pool
+
+    @property
+    def version(self):
+        return self.registry.version
+
+    @property
+    def current(self):
+        return self.registry.current
+
+    def classify(self, descriptions):
+        return self.classify_versioned(descriptions)[1]
+
+    def classify_versioned(self, descriptions):
+        return self.pool.submit(classify, list(descriptions)).result()
+
+
+def pooled_cluster(pool):
+    return lambda lats, lngs, weights, k: pool.submit(cluster, lats, lngs, weights, k).result()
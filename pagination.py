@@ -0,0 +1,163 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_EXPORT_SIZE = 1_000_000  # NDJSON exports are streamed, so they may run long
+
+# Every listing is ordered newest first on (timestamp, _id) so the pair is
+# a stable keyset cursor even when timestamps collide.
+SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+# The moderation queue: pending reports, likeliest spam and most suspicious
+# first, newest first among equals. Reports stored before spam_score
+# existed have none and sort below every scored one, as null does in Mongo.
+QUEUE_QUERY = {"approved": False}
+QUEUE_SORT = [("spam", DESCENDING), ("spam_score", DESCENDING), ("suspicion_score", DESCENDING)] + SORT
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def encode_cursor(doc):
+    raw = f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, oid = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), ObjectId(oid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def encode_queue_cursor(doc):
+    values = [doc.get("spam"), doc.get("spam_score"), doc.get("suspicion_score"),
+              doc["timestamp"].isoformat(), str(doc["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_queue_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        spam, spam_score, suspicion, ts, oid = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return spam, spam_score, suspicion, datetime.fromisoformat(ts), ObjectId(oid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def after_key(sort, values):
+    # Keyset condition: documents strictly past `values` in `sort` order.
+    # Missing fields compare as null, below any value.
+    branches = []
+    for i, ((field, direction), value) in enumerate(zip(sort, values)):
+        prefix = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        if direction < 0:
+            if value is None:
+                continue  # nothing sorts below null
+            branches.append({**prefix, "$or": [{field: {"$lt": value}}, {field: None}]})
+        else:
+            branches.append({**prefix, field: {"$ne": None} if value is None else {"$gt": value}})
+    return {"$or": branches}
+
+
+def parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' timestamp")
+
+
+def parse_page_args(args, max_limit=MAX_PAGE_SIZE, default_limit=DEFAULT_PAGE_SIZE, decode=decode_cursor):
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise ValueError("Invalid limit")
+    limit = max(1, min(limit, max_limit))
+
+    after = decode(args["after"]) if args.get("after") else None
+
+    fields = None
+    if args.get("fields"):
+        fields = [f.strip() for f in args["fields"].split(",") if f.strip()]
+        bad = [f for f in fields if not _FIELD_RE.match(f)]
+        if bad:
+            raise ValueError(f"Invalid field: {bad[0]}")
+
+    since = parse_time(args["since"], "since") if args.get("since") else None
+    until = parse_time(args["until"], "until") if args.get("until") else None
+    return {"limit": limit, "after": after, "fields": fields, "since": since, "until": until}
+
+
+def build_query(base, page):
+    clauses = [base] if base else []
+    window = {}
+    if page["since"]:
+        window["$gte"] = page["since"]
+    if page["until"]:
+        window["$lt"] = page["until"]
+    if window:
+        clauses.append({"timestamp": window})
+    if page["after"]:
+        ts, oid = page["after"]
+        clauses.append({"$or": [{"timestamp": {"$lt": ts}}, {"timestamp": ts, "_id": {"$lt": oid}}]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def build_projection(fields):
+    if not fields:
+        return None
+    # The cursor needs timestamp and _id regardless of what the client asked for
+    projection = {f: 1 for f in fields}
+    projection["timestamp"] = 1
+    return projection
+
+
+def open_page(collection, base_query, args, **limits):
+    # (cursor, limit): the page plus one look-ahead document, not read yet.
+    # Arguments are validated here, before a streamed response starts.
+    page = parse_page_args(args, **limits)
+    cursor = collection.find(build_query(base_query, page), build_projection(page["fields"]))
+    return cursor.sort(SORT).limit(page["limit"] + 1), page["limit"]
+
+
+def open_queue(collection, args, **limits):
+    # Like open_page, in QUEUE_SORT order; ?type= and ?severity= narrow it
+    page = parse_page_args(args, decode=decode_queue_cursor, **limits)
+    base = {**QUEUE_QUERY, **{k: args[k] for k in ("type", "severity") if args.get(k)}}
+    query = build_query(base, {**page, "after": None})
+    if page["after"]:
+        query = {"$and": [query, after_key(QUEUE_SORT, page["after"])]}
+    projection = build_projection(page["fields"])
+    if projection:
+        projection.update({field: 1 for field, _ in QUEUE_SORT})
+    cursor = collection.find(query, projection)
+    return cursor.sort(QUEUE_SORT).limit(page["limit"] + 1), page["limit"]
+
+
+def fetch_page(collection, base_query, args):
+    # Returns (docs, next_cursor); next_cursor is None on the last page
+    cursor, limit = open_page(collection, base_query, args)
+    docs = list(cursor)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
+
+
+def ensure_incident_indexes(collection):
+    # One compound index per listing query shape
+    collection.create_index([("approved", 1), ("flagged", 1), ("spam", 1), ("timestamp", -1), ("_id", -1)])
+    collection.create_index([("flagged", 1), ("timestamp", -1), ("_id", -1)])
+    collection.create_index([("timestamp", -1), ("_id", -1)])
+    # Moderation queue
+    collection.create_index([("approved", 1)] + [(field, -1) for field, _ in QUEUE_SORT])
@@ -0,0 +1,185 @@
+import threading
+
+from geo import geohash_encode, geohash_cover, geohash_cover_count
+from metrics import stage
+
+GLOBAL_ROOM = "global"
+WORLD_ROOM = "geo:all"
+PRECISIONS = (2, 3, 4, 5)   # ~1250 km down to ~5 km cells
+MAX_CELLS = 64
+DESCRIPTION_PREVIEW = 140
+
+
+def geo_room(geohash):
+    return f"geo:{len(geohash)}:{geohash}"
+
+
+def rooms_for_point(lat, lng):
+    full = geohash_encode(lat, lng, max(PRECISIONS))
+    return [WORLD_ROOM] + [geo_room(full[:p]) for p in PRECISIONS]
+
+
+def rooms_for_bbox(south, west, north, east, max_cells=MAX_CELLS):
+    # Finest precision whose cover of the viewport stays under max_cells
+    for precision in sorted(PRECISIONS, reverse=True):
+        if geohash_cover_count(south, west, north, east, precision) <= max_cells:
+            return [geo_room(g) for g in geohash_cover(south, west, north, east, precision)]
+    return [WORLD_ROOM]
+
+
+def incident_delta(op, incident):
+    # Compact payload: only what a map marker needs, description truncated
+    delta = {"op": op, "_id": str(incident["_id"])}
+    if op == "remove":
+        return delta
+    description = incident.get("description") or ""
+    if len(description) > DESCRIPTION_PREVIEW:
+        description = description[:DESCRIPTION_PREVIEW - 1] + "…"
+    timestamp = incident.get("timestamp")
+    delta.update({
+        "type": incident.get("type"),
+        "severity": incident.get("severity"),
+        "latitude": incident.get("latitude"),
+        "longitude": incident.get("longitude"),
+        "timestamp": timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp,
+        "description": description,
+        "report_count": incident.get("report_count", 1),
+    })
+    return delta
+
+
+# === GEO BROADCASTER ===
+# Every client starts in the global room and keeps receiving the legacy
+# full "new_incident" broadcast. Once it subscribes to a viewport (or an
+# explicit list of geohashes) it leaves the global room and only receives
+# compact "incident_delta" events for incidents inside its cells.
+
+class GeoBroadcaster:
+    def __init__(self, socketio, namespace="/"):
+        self.socketio = socketio
+        self.namespace = namespace
+        self.subscriptions = {}   # sid -> list of rooms
+        self.lock = threading.Lock()
+
+    def _server(self):
+        return self.socketio.server
+
+    def connect(self, sid):
+        self._server().enter_room(sid, GLOBAL_ROOM, namespace=self.namespace)
+
+    def disconnect(self, sid):
+        with self.lock:
+            self.subscriptions.pop(sid, None)
+
+    def subscribe(self, sid, data):
+        if data.get("geohashes"):
+            hashes = [str(g).lower() for g in data["geohashes"]][:MAX_CELLS]
+            rooms = [geo_room(g) for g in hashes if 1 <= len(g) <= max(PRECISIONS)]
+        else:
+            south, west, north, east = (float(data[k]) for k in ("south", "west", "north", "east"))
+            rooms = rooms_for_bbox(south, west, north, east)
+        server = self._server()
+        with self.lock:
+            previous = self.subscriptions.get(sid, [GLOBAL_ROOM])
+            for room in previous:
+                if room not in rooms:
+                    server.leave_room(sid, room, namespace=self.namespace)
+            for room in rooms:
+                if room not in previous:
+                    server.enter_room(sid, room, namespace=self.namespace)
+            self.subscriptions[sid] = rooms
+        return rooms
+
+    def unsubscribe(self, sid):
+        server = self._server()
+        with self.lock:
+            for room in self.subscriptions.pop(sid, []):
+                server.leave_room(sid, room, namespace=self.namespace)
+        server.enter_room(sid, GLOBAL_ROOM, namespace=self.namespace)
+
+    def publish(self, incident, op="add", legacy_event="new_incident"):
+        with stage("emit"):
+            self._publish(incident, op, legacy_event)
+
+    def _publish(self, incident, op, legacy_event):
+        if legacy_event and op == "add":
+            self.socketio.emit(legacy_event, incident, to=GLOBAL_ROOM)
+        elif legacy_event and op == "remove":
+            # Same event as publish_batch, so legacy clients drop it either way
+            self.socketio.emit("incidents_removed", {"count": 1, "ids": [str(incident["_id"])]}, to=GLOBAL_ROOM)
+        lat, lng = incident.get("latitude"), incident.get("longitude")
+        if lat is None or lng is None:
+            return
+        # A subscriber only ever sits in rooms of one precision (or the
+        # world room), so it receives each delta at most once
+        delta = incident_delta(op, incident)
+        for room in rooms_for_point(float(lat), float(lng)):
+            self.socketio.emit("incident_delta", delta, to=room)
+
+    def publish_batch(self, incidents, op="add"):
+        with stage("emit"):
+            self._publish_batch(incidents, op)
+
+    def _publish_batch(self, incidents, op):
+        # One event per room instead of one per incident (bulk ingest)
+        deltas = [incident_delta(op, incident) for incident in incidents]
+        if not deltas:
+            return
+        if op == "remove":
+            # Legacy clients prepend "new_incidents"; removals get their own event
+            self.socketio.emit("incidents_removed", {"count": len(deltas), "ids": [d["_id"] for d in deltas]},
+                               to=GLOBAL_ROOM)
+        else:
+            self.socketio.emit("new_incidents", {"op": op, "count": len(deltas), "data": deltas}, to=GLOBAL_ROOM)
+        by_room = {}
+        for incident, delta in zip(incidents, deltas):
+            # From the incident: a "remove" delta carries no position
+            lat, lng = incident.get("latitude"), incident.get("longitude")
+            if lat is None or lng is None:
+                continue
+            for room in rooms_for_point(float(lat), float(lng)):
+                by_room.setdefault(room, []).append(delta)
+        for room, room_deltas in by_room.items():
+            self.socketio.emit("incident_deltas", room_deltas, to=room)
+
+
+# === MODERATION FEED ===
+# Admin dashboards join MODERATION_ROOM and keep their copy of the queue
+# current from "queue_update" events instead of reloading it:
+#   {"op": "add", "data": [incident, ...]}      new pending reports
+#   {"op": "update", "data": [incident, ...]}   changed fields, merged by _id
+#   {"op": "remove", "ids": [id, ...]}          no longer pending
+# One event per write, however many incidents it touched. Incidents must
+# be serialized already. With SOCKETIO_MESSAGE_QUEUE set, admins connected
+# to any worker see the writes of every worker.
+
+MODERATION_ROOM = "moderation"
+
+
+class ModerationFeed:
+    def __init__(self, socketio, namespace="/"):
+        self.socketio = socketio
+        self.namespace = namespace
+
+    def join(self, sid):
+        self.socketio.server.enter_room(sid, MODERATION_ROOM, namespace=self.namespace)
+
+    def leave(self, sid):
+        self.socketio.server.leave_room(sid, MODERATION_ROOM, namespace=self.namespace)
+
+    def _emit(self, payload):
+        with stage("emit"):
+            self.socketio.emit("queue_update", payload, to=MODERATION_ROOM)
+
+    def added(self, incidents):
+        if incidents:
+            self._emit({"op": "add", "data": list(incidents)})
+
+    def updated(self, incidents):
+        if incidents:
+            self._emit({"op": "update", "data": list(incidents)})
+
+    def removed(self, incident_ids):
+        ids = [str(i) for i in incident_ids]
+        if ids:
+            self._emit({"op": "remove", "ids": ids})
@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
-from database.mongo import insert_report
+from app import submit_report
+from ingest import validate_report
 
 report_bp = Blueprint("report", __name__)
 
-@report_bp.route("/", methods=["POST"])
+@report_bp.route("", methods=["POST"])
 def report():
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing JSON data"}), 400
-
-    report_id = insert_report(data)
-    return jsonify({"message": "Report submitted", "id": report_id}), 201
\ No newline at end of file
+    try:
+        report = validate_report(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Same classification, dedupe and notifications as app.py's /report
+    incident, _ = submit_report(report)
+    return jsonify({"message": "Report submitted", "id": str(incident["_id"])}), 201
@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from metrics import counter
+from pagination import SORT, build_query, build_projection, parse_page_args
+from streaming import dumps
+
+# Incidents leave the hot collection in three ways:
+#   - spam incidents are deleted SPAM_TTL_DAYS after they were reported,
+#   - rejected reports expire REJECTED_TTL_DAYS after rejection (TTL index),
+#   - everything else older than ARCHIVE_AFTER_DAYS is moved, in batches,
+#     to an archive: a second collection, or Parquet files under
+#     ARCHIVE_DIR (ARCHIVE_BACKEND=parquet, needs pyarrow).
+# Spam goes through the Archiver rather than a TTL index: the database
+# would delete it behind the stats counters and the duplicate index.
+# /incidents, /hotspots and the admin listings then only ever see recent
+# history; old incidents stay readable through the archive listing.
+
+SPAM_TTL_DAYS = int(os.environ.get("SPAM_TTL_DAYS", 30))
+REJECTED_TTL_DAYS = int(os.environ.get("REJECTED_TTL_DAYS", 365))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 180))
+ARCHIVE_BACKEND = os.environ.get("ARCHIVE_BACKEND", "collection")  # collection | parquet
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive"))
+ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVED = counter("incidents_archived_total", "Incidents moved out of the hot collection", ("backend",))
+PURGED = counter("spam_purged_total", "Spam incidents deleted after SPAM_TTL_DAYS")
+
+
+# === TTL INDEXES ===
+
+def ensure_ttl_index(collection, field, seconds, name, partial=None):
+    options = {"name": name, "expireAfterSeconds": seconds}
+    if partial:
+        options["partialFilterExpression"] = partial
+    try:
+        collection.create_index(field, **options)
+    except OperationFailure as e:
+        if e.code not in (85, 86):  # IndexOptionsConflict / IndexKeySpecsConflict
+            raise
+        # Same index, new expiry: change it in place instead of rebuilding
+        collection.database.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+
+
+def ensure_ttl_indexes(store, rejected_days=REJECTED_TTL_DAYS):
+    ensure_ttl_index(store.rejections, "rejected_at", rejected_days * 86400, "rejected_ttl")
+    # Spam used to expire through this index; the Archiver sweeps it now
+    if "spam_ttl" in store.incidents.index_information():
+        store.incidents.drop_index("spam_ttl")
+
+
+# === ARCHIVES ===
+# Both answer open_page() like pagination.open_page: (iterable of documents
+# newest first, limit), one look-ahead document past the limit, so the
+# archive listing streams through stream_listing() like any other.
+
+class CollectionArchive:
+    backend = "collection"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("timestamp", -1), ("_id", -1)])
+        self.collection.create_index([("type", 1), ("timestamp", -1), ("_id", -1)])
+
+    def write(self, docs):
+        # Re-running a batch after a crash (written, not yet deleted) must
+        # not fail on, or duplicate, the documents already there
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    def open_page(self, args, **limits):
+        page = parse_page_args(args, **limits)
+        filters = {k: args[k] for k in ("type", "severity") if args.get(k)}
+        cursor = self.collection.find(build_query(filters, page), build_projection(page["fields"]))
+        return cursor.sort(SORT).limit(page["limit"] + 1), page["limit"]
+
+
+PARQUET_COLUMNS = {
+    "_id": "string", "type": "string", "location": "string", "severity": "string", "description": "string",
+    "latitude": "float64", "longitude": "float64", "timestamp": "timestamp[us]",
+    "approved": "bool", "flagged": "bool", "spam": "bool", "report_count": "int64",
+}
+
+
+class ParquetArchive:
+    # One zstd-compressed file per archived batch and month, under
+    # month=YYYY-MM/ (hive partitioning). Fields outside PARQUET_COLUMNS
+    # are kept as JSON in an "extra" column. A listing opens the months it
+    # needs one at a time, newest first, and stops once the page is full.
+    backend = "parquet"
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+
+    def ensure_indexes(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def schema(self):
+        import pyarrow as pa
+
+        fields = [pa.field(name, pa.type_for_alias(kind)) for name, kind in PARQUET_COLUMNS.items()]
+        return pa.schema(fields + [pa.field("extra", pa.string())])
+
+    def write(self, docs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        by_month = {}
+        for doc in docs:
+            by_month.setdefault(doc["timestamp"].strftime("%Y-%m"), []).append(doc)
+        schema = self.schema()
+        for month, batch in by_month.items():
+            rows = []
+            for doc in batch:
+                row = {name: doc.get(name) for name in PARQUET_COLUMNS}
+                row["_id"] = str(doc["_id"])
+                extra = {k: v for k, v in doc.items() if k not in PARQUET_COLUMNS}
+                row["extra"] = dumps(extra).decode("utf-8") if extra else None
+                rows.append(row)
+            month_dir = os.path.join(self.root, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            # Named after the first _id: a re-run batch overwrites its file
+            path = os.path.join(month_dir, f"part-{batch[0]['_id']}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=schema), path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+
+    def months(self, since=None, until=None):
+        if not os.path.isdir(self.root):
+            return []
+        months = sorted((d[len("month="):] for d in os.listdir(self.root) if d.startswith("month=")), reverse=True)
+        low = since.strftime("%Y-%m") if since else None
+        high = until.strftime("%Y-%m") if until else None
+        return [m for m in months if (low is None or m >= low) and (high is None or m <= high)]
+
+    def _read_month(self, month, page, filters):
+        import pyarrow.dataset as ds
+
+        expr = None
+        clauses = [ds.field(k) == v for k, v in filters.items()]
+        if page["since"]:
+            clauses.append(ds.field("timestamp") >= page["since"])
+        if page["until"]:
+            clauses.append(ds.field("timestamp") < page["until"])
+        if page["after"]:
+            ts, oid = page["after"]
+            clauses.append((ds.field("timestamp") < ts) | ((ds.field("timestamp") == ts) & (ds.field("_id") < str(oid))))
+        for clause in clauses:
+            expr = clause if expr is None else expr & clause
+        dataset = ds.dataset(os.path.join(self.root, f"month={month}"), format="parquet", schema=self.schema())
+        table = dataset.to_table(filter=expr)
+        if not table.num_rows:
+            return []
+        # _id hex strings sort like the ObjectIds they came from
+        return table.sort_by([("timestamp", "descending"), ("_id", "descending")]).to_pylist()
+
+    def _documents(self, page, filters):
+        fields = page["fields"]
+        for month in self.months(page["since"], page["after"][0] if page["after"] else page["until"]):
+            for row in self._read_month(month, page, filters):
+                extra = row.pop("extra")
+                if extra:
+                    row.update(json.loads(extra))
+                row["_id"] = ObjectId(row["_id"])
+                if fields:
+                    row = {k: v for k, v in row.items() if k in fields or k in ("_id", "timestamp")}
+                yield row
+
+    def open_page(self, args, **limits):
+        page = parse_page_args(args, **limits)
+        filters = {k: args[k] for k in ("type", "severity") if args.get(k)}
+        return self._documents(page, filters), page["limit"]
+
+
+def make_archive(store, backend=ARCHIVE_BACKEND, root=ARCHIVE_DIR):
+    if backend == "parquet":
+        return ParquetArchive(root)
+    if backend == "collection":
+        return CollectionArchive(store.archive)
+    raise ValueError(f"Unknown archive backend: {backend}")
+
+
+# === ARCHIVER ===
+
+class Archiver:
+    # Moves incidents older than `after_days` to the archive, oldest first,
+    # `batch_size` at a time: write the batch, then delete it from the hot
+    # collection. Spam older than `spam_days` is deleted the same way, without
+    # the archive. on_archived(docs) gets every batch of either (in-memory
+    # engines, map clients). Several workers may run it; a batch is idempotent.
+    def __init__(self, collection, archive, after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE,
+                 on_archived=None, spam_days=SPAM_TTL_DAYS):
+        self.collection = collection
+        self.archive = archive
+        self.after_days = after_days
+        self.spam_days = spam_days
+        self.batch_size = batch_size
+        self.on_archived = on_archived
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_run = None
+
+    def _batches(self, query):
+        while True:
+            docs = list(self.collection.find(query).sort([("timestamp", 1), ("_id", 1)]).limit(self.batch_size))
+            if not docs:
+                return
+            yield docs
+            if len(docs) < self.batch_size:
+                return
+
+    def _delete(self, docs):
+        self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        if self.on_archived:
+            self.on_archived(docs)
+
+    def run_once(self, now=None):
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.after_days)
+        spam_cutoff = now - timedelta(days=self.spam_days)
+        archived = purged = 0
+        with self.lock:
+            for docs in self._batches({"spam": True, "timestamp": {"$lt": spam_cutoff}}):
+                self._delete(docs)
+                purged += len(docs)
+                PURGED.inc(amount=len(docs))
+            for docs in self._batches({"timestamp": {"$lt": cutoff}}):
+                self.archive.write(docs)
+                self._delete(docs)
+                archived += len(docs)
+                ARCHIVED.inc(self.archive.backend, amount=len(docs))
+            self.last_run = {"time": datetime.utcnow(), "cutoff": cutoff, "archived": archived, "spam_purged": purged}
+        if purged:
+            print(f"Deleted {purged} spam incidents older than {spam_cutoff:%Y-%m-%d}.")
+        if archived:
+            print(f"Archived {archived} incidents older than {cutoff:%Y-%m-%d}.")
+        return archived
+
+    def start(self, interval=3600.0):
+        def run():
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Archiving failed: {e}")
+                time.sleep(interval)
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=run, name="archiver", daemon=True)
+            self.thread.start()
+
+    def info(self):
+        return {
+            "backend": self.archive.backend,
+            "after_days": self.after_days,
+            "spam_days": self.spam_days,
+            "running": self.thread is not None,
+            "last_run": self.last_run,
+        }
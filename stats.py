@@ -0,0 +1,341 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+
+from geo import KM_PER_DEGREE
+
+HOUR = 3600
+STATUSES = ("pending", "approved", "flagged", "spam")
+DIMENSIONS = ("type", "severity", "cell")
+GROUPS = DIMENSIONS + ("status", "hour", "day")
+
+# Fields a stats update needs from an incident document
+STATS_PROJECTION = {"type": 1, "severity": 1, "approved": 1, "flagged": 1, "spam": 1,
+                    "latitude": 1, "longitude": 1, "timestamp": 1}
+
+
+def incident_status(doc):
+    # Same precedence as the listings: spam and flagged hide an approval
+    if doc.get("spam"):
+        return "spam"
+    if doc.get("flagged"):
+        return "flagged"
+    if doc.get("approved"):
+        return "approved"
+    return "pending"
+
+
+def incident_oid(doc):
+    value = doc.get("_id")
+    return ObjectId(value) if ObjectId.is_valid(value) else None
+
+
+def to_hour(ts):
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)  # stored as naive UTC
+        ts = ts.timestamp()
+    return int((ts or time.time()) // HOUR)
+
+
+def hour_iso(hour):
+    return datetime.fromtimestamp(hour * HOUR, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+# === STATS ENGINE ===
+# Incident counts kept per status x type x severity x geo-cell x hour.
+# Routes apply each state change as a +1/-1 on the old and new keys, and
+# every dimension also keeps a rollup (value -> hourly series plus an
+# all-time total), so dashboard queries read a handful of counters instead
+# of the collection. A periodic $group aggregation rebuilds the counters
+# from the database to correct any drift (crashes between write and
+# update, writes from other processes). The aggregation only counts
+# incidents older than a snapshot _id taken when it starts; changes to
+# newer incidents are journaled and replayed on top, changes to older ones
+# are already in its result.
+
+class StatsEngine:
+    def __init__(self, collection, cell_km=10.0):
+        self.collection = collection
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cube = {}      # (status, type, severity, cell) -> {hour: count}
+        self.series = {}    # (status, dimension, value) -> {hour: count}; dimension "all" for totals
+        self.totals = {}    # (status, dimension, value) -> count
+        self.cache = {}
+        self.version = 0
+        self.loaded = False
+        self.reconciled_at = None
+        self.lock = threading.RLock()
+        self.reconciler = None
+        self.journals = []  # one per running reconcile(): (incident_id, key, hour, n) made during it
+
+    def _cell(self, doc):
+        lat, lng = doc.get("latitude"), doc.get("longitude")
+        if lat is None or lng is None:
+            return None
+        return (math.floor(float(lat) / self.cell_deg), math.floor(float(lng) / self.cell_deg))
+
+    def key(self, doc):
+        return (incident_status(doc), doc.get("type", "unknown"), doc.get("severity"), self._cell(doc))
+
+    # --- counters ---
+
+    def _apply(self, key, hour, n):
+        status, type_, severity, cell = key
+        hours = self.cube.setdefault(key, {})
+        hours[hour] = hours.get(hour, 0) + n
+        if hours[hour] <= 0:
+            del hours[hour]
+            if not hours:
+                del self.cube[key]
+        for dim, value in (("all", None), ("type", type_), ("severity", severity), ("cell", cell)):
+            rollup = (status, dim, value)
+            series = self.series.setdefault(rollup, {})
+            series[hour] = series.get(hour, 0) + n
+            if series[hour] <= 0:
+                del series[hour]
+                if not series:
+                    del self.series[rollup]
+            total = self.totals.get(rollup, 0) + n
+            if total > 0:
+                self.totals[rollup] = total
+            else:
+                self.totals.pop(rollup, None)
+
+    def _changed(self):
+        self.version += 1
+        self.cache.clear()
+
+    def _record(self, doc, key, hour, n):
+        # Under the lock; reconcile() replays what it did not see
+        if self.journals:
+            incident_id = incident_oid(doc)
+            for journal in self.journals:
+                journal.append((incident_id, key, hour, n))
+        if self.loaded:
+            self._apply(key, hour, n)
+
+    def add(self, doc):
+        with self.lock:
+            self._record(doc, self.key(doc), to_hour(doc.get("timestamp")), 1)
+            self._changed()
+
+    def add_many(self, docs):
+        with self.lock:
+            for doc in docs:
+                self._record(doc, self.key(doc), to_hour(doc.get("timestamp")), 1)
+            self._changed()
+
+    def remove(self, doc):
+        with self.lock:
+            self._record(doc, self.key(doc), to_hour(doc.get("timestamp")), -1)
+            self._changed()
+
+    def update(self, before, after):
+        # before/after of one write; a no-op when the key did not change
+        old, new = self.key(before), self.key(after)
+        if old == new:
+            return
+        hour = to_hour(before.get("timestamp"))
+        with self.lock:
+            self._record(before, old, hour, -1)
+            self._record(before, new, hour, 1)
+            self._changed()
+
+    # --- reconciliation ---
+
+    def pipeline(self, snapshot=None):
+        # Same keys as key()/to_hour(), computed server-side
+        match = [{"$match": {"_id": {"$lt": snapshot}}}] if snapshot is not None else []
+        status = {"$cond": ["$spam", "spam", {"$cond": ["$flagged", "flagged",
+                  {"$cond": ["$approved", "approved", "pending"]}]}]}
+        return match + [
+            {"$group": {
+                "_id": {
+                    "status": status,
+                    "type": {"$ifNull": ["$type", "unknown"]},
+                    "severity": "$severity",
+                    "lat": {"$floor": {"$divide": ["$latitude", self.cell_deg]}},
+                    "lng": {"$floor": {"$divide": ["$longitude", self.cell_deg]}},
+                    "hour": {"$floor": {"$divide": [{"$toLong": "$timestamp"}, HOUR * 1000]}},
+                },
+                "count": {"$sum": 1},
+            }},
+        ]
+
+    def reconcile(self):
+        # Rebuilds every counter from the database; returns how many
+        # incidents the in-memory counters were off by. Ids are generated
+        # client-side and increase, so an incident inserted after the
+        # snapshot is outside the aggregation: its journaled changes are
+        # replayed onto the new counters. Changes to older incidents are in
+        # the aggregation already and are not counted twice.
+        journal = []
+        with self.lock:
+            snapshot = ObjectId()
+            self.journals.append(journal)
+        try:
+            rows = list(self.collection.aggregate(self.pipeline(snapshot), allowDiskUse=True))
+        except Exception:
+            with self.lock:
+                self.journals.remove(journal)
+            raise
+        fresh = StatsEngine(None)
+        fresh.cell_deg = self.cell_deg
+        for row in rows:
+            key = row["_id"]
+            cell = None
+            if key.get("lat") is not None and key.get("lng") is not None:
+                cell = (int(key["lat"]), int(key["lng"]))
+            hour = int(key["hour"]) if key.get("hour") is not None else to_hour(None)
+            fresh._apply((key["status"], key["type"], key.get("severity"), cell), hour, row["count"])
+        with self.lock:
+            self.journals.remove(journal)
+            for incident_id, key, hour, n in journal:
+                if incident_id is None or incident_id >= snapshot:
+                    fresh._apply(key, hour, n)
+            drift = 0
+            for k in (set(self.cube) | set(fresh.cube)) if self.loaded else ():
+                old, new = self.cube.get(k, {}), fresh.cube.get(k, {})
+                drift += sum(abs(old.get(h, 0) - new.get(h, 0)) for h in set(old) | set(new))
+            self.cube, self.series, self.totals = fresh.cube, fresh.series, fresh.totals
+            self.loaded = True
+            self.reconciled_at = datetime.utcnow()
+            self._changed()
+        if drift:
+            print(f"Stats reconciled: corrected {drift} counts.")
+        return drift
+
+    def load(self):
+        self.reconcile()
+        print(f"Stats engine loaded: {sum(self.totals.get((s, 'all', None), 0) for s in STATUSES)} incidents.")
+
+    def watch(self, interval=600.0):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    print(f"Stats reconcile failed: {e}")
+
+        if self.reconciler is None:
+            self.reconciler = threading.Thread(target=run, name="stats-reconciler", daemon=True)
+            self.reconciler.start()
+
+    # --- queries ---
+
+    def _cell_info(self, cell):
+        if cell is None:
+            return {"cell": None}
+        i, j = cell
+        return {
+            "cell": f"{i}:{j}",
+            "lat": (i + 0.5) * self.cell_deg,
+            "lng": (j + 0.5) * self.cell_deg,
+        }
+
+    @staticmethod
+    def _window_sum(hours, since, until):
+        if since is None and until is None:
+            return sum(hours.values())
+        return sum(n for h, n in hours.items()
+                   if (since is None or h >= since) and (until is None or h < until))
+
+    def _rollup_counts(self, statuses, dim, value, group, since, until):
+        # Answer from the per-dimension rollups (at most one filter)
+        counts = {}
+        if group in ("hour", "day"):
+            for status in statuses:
+                for hour, n in self.series.get((status, dim, value), {}).items():
+                    if (since is None or hour >= since) and (until is None or hour < until):
+                        bucket = hour if group == "hour" else hour // 24 * 24
+                        counts[bucket] = counts.get(bucket, 0) + n
+            return counts
+        windowed = since is not None or until is not None
+        if group == "all":
+            for status in statuses:
+                n = self._window_sum(self.series.get((status, dim, value), {}), since, until)
+                if n:
+                    counts[None] = counts.get(None, 0) + n
+            return counts
+        if group == "status":
+            for status in statuses:
+                series = self.series.get((status, dim, value), {})
+                n = self._window_sum(series, since, until)
+                if n:
+                    counts[status] = n
+            return counts
+        for (status, d, v), total in self.totals.items():
+            if d != group or status not in statuses:
+                continue
+            n = self._window_sum(self.series[(status, d, v)], since, until) if windowed else total
+            if n:
+                counts[v] = counts.get(v, 0) + n
+        return counts
+
+    def _cube_counts(self, statuses, filters, group, since, until):
+        # Filter on several dimensions, or filter and group on two: scan the
+        # occupied keys (bounded by types x severities x cells, not incidents)
+        index = {"status": 0, "type": 1, "severity": 2, "cell": 3}
+        counts = {}
+        for key, hours in self.cube.items():
+            if key[0] not in statuses:
+                continue
+            if any(key[index[d]] != v for d, v in filters.items()):
+                continue
+            if group in ("hour", "day"):
+                for hour, n in hours.items():
+                    if (since is None or hour >= since) and (until is None or hour < until):
+                        bucket = hour if group == "hour" else hour // 24 * 24
+                        counts[bucket] = counts.get(bucket, 0) + n
+            else:
+                n = self._window_sum(hours, since, until)
+                if n:
+                    value = key[index[group]] if group else None
+                    counts[value] = counts.get(value, 0) + n
+        return counts
+
+    def query(self, status="approved", group=None, type=None, severity=None, cell=None,
+              since=None, until=None):
+        # since/until are datetimes (naive UTC); counts are by incident creation hour
+        if group is not None and group not in GROUPS:
+            raise ValueError(f"Invalid group: {group}")
+        statuses = STATUSES if status == "all" else (status,)
+        if any(s not in STATUSES for s in statuses):
+            raise ValueError(f"Invalid status: {status}")
+        since_h = to_hour(since) if since else None
+        until_h = to_hour(until) if until else None
+        filters = {d: v for d, v in (("type", type), ("severity", severity), ("cell", cell)) if v is not None}
+        key = (status, group, tuple(sorted(filters.items())), since_h, until_h)
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            if len(filters) <= 1 and not (filters and group in DIMENSIONS):
+                (dim, value), = filters.items() if filters else (("all", None),)
+                counts = self._rollup_counts(statuses, dim, value, group or "all", since_h, until_h)
+            else:
+                counts = self._cube_counts(statuses, filters, group, since_h, until_h)
+            result = self._format(counts, group)
+            self.cache[key] = result
+            return result
+
+    def _format(self, counts, group):
+        if group is None or group == "all":
+            return {"total": sum(counts.values())}
+        if group in ("hour", "day"):
+            data = [{"t": hour_iso(h), "count": n} for h, n in sorted(counts.items())]
+        elif group == "cell":
+            data = [{**self._cell_info(c), "count": n}
+                    for c, n in sorted(counts.items(), key=lambda item: -item[1])]
+        else:
+            data = [{group: v, "count": n} for v, n in sorted(counts.items(), key=lambda item: -item[1])]
+        return {"total": sum(counts.values()), "group": group, "data": data}
@@ -0,0 +1,171 @@
+import json
+import zlib
+from datetime import date, datetime
+
+from bson.objectid import ObjectId
+from flask import Response, request, stream_with_context
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from pagination import encode_cursor
+
+try:
+    import orjson
+except ImportError:  # optional: plain json is slower but produces the same output
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonlines")
+
+
+# === ENCODING ===
+# Documents go straight from the cursor to bytes: ObjectId as its hex
+# string, datetimes as ISO 8601, like JSONProvider and serialize().
+
+def _default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(value):
+        return orjson.dumps(value, default=_default)
+else:
+    def dumps(value):
+        return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def chunked(parts, size=CHUNK_SIZE):
+    # Joins small writes so the server sends ~64 kB chunks, not one per document
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield b"".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def json_page(cursor, limit, transform=None, encode=encode_cursor):
+    # {"status": "success", "data": [...], "next": cursor} written while the
+    # cursor is read; "next" comes last because it is only known at the end
+    yield b'{"status":"success","data":['
+    next_cursor = None
+    last = None
+    for n, doc in enumerate(cursor):
+        if n == limit:
+            next_cursor = encode(last)
+            break
+        yield (b"," if n else b"") + dumps(transform(doc) if transform else doc)
+        last = doc
+    yield b'],"next":' + dumps(next_cursor) + b"}"
+
+
+def ndjson(cursor, limit, transform=None):
+    # One document per line; the look-ahead document is not sent
+    for n, doc in enumerate(cursor):
+        if n == limit:
+            break
+        yield dumps(transform(doc) if transform else doc) + b"\n"
+
+
+# === COMPRESSION ===
+# Negotiated from Accept-Encoding. Each chunk is flushed, so the client can
+# decode rows as they arrive instead of waiting for the end of the stream.
+
+class GzipEncoder:
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=4)
+
+    def compress(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+
+
+def compressed(chunks, encoding):
+    encoder = ENCODERS[encoding]()
+    for chunk in chunks:
+        yield encoder.compress(chunk)
+    yield encoder.finish()
+
+
+def negotiate_encoding(header=None):
+    # From the current Flask request, or an Accept-Encoding value (asgi.py)
+    accepted = request.accept_encodings if header is None else parse_accept_header(header, Accept)
+    best = accepted.best_match(list(ENCODERS))
+    return best if best and accepted[best] > 0 else None
+
+
+def wants_ndjson(args=None, accept=None):
+    # From the current Flask request, or query args and an Accept value (asgi.py)
+    if args is None:
+        args, mimetypes = request.args, request.accept_mimetypes
+    else:
+        mimetypes = parse_accept_header(accept, MIMEAccept)
+    fmt = args.get("format")
+    if fmt:
+        if fmt not in ("json", "ndjson"):
+            raise ValueError("format must be json or ndjson")
+        return fmt == "ndjson"
+    return mimetypes.best_match(("application/json",) + NDJSON_TYPES) in NDJSON_TYPES
+
+
+def encode_body(parts, encoding=None):
+    # Whole body at once, for responses that are not streamed
+    return b"".join(compressed(parts, encoding) if encoding else parts)
+
+
+def stream_response(parts, mimetype):
+    encoding = negotiate_encoding()
+    chunks = chunked(parts)
+    if encoding:
+        chunks = (c for c in compressed(chunks, encoding) if c)
+    response = Response(stream_with_context(_guard(chunks)), mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _guard(chunks):
+    # Headers are gone once streaming starts: a failure can only cut the
+    # body short, which leaves the client with an unparseable document
+    try:
+        yield from chunks
+    except Exception as e:
+        print("Streaming error:", e)
+
+
+def stream_listing(cursor, limit, as_ndjson=False, transform=None, encode=encode_cursor):
+    # A listing route's response: the paged JSON envelope, or NDJSON
+    if as_ndjson:
+        return stream_response(ndjson(cursor, limit, transform), "application/x-ndjson")
+    return stream_response(json_page(cursor, limit, transform, encode), "application/json")
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from pymongo import ReturnDocument
+
+from database import object_id
+from geo import GridIndex, to_point
+
+# Counter document bumped on every subscribe/unsubscribe
+VERSION_ID = "subscribers"
+
+
+# === SUBSCRIBER INDEX ===
+# MongoDB (2dsphere) is the source of truth; the in-memory grid answers
+# radius lookups on the approval path without touching the database.
+# Each worker process has its own grid, so writes bump a shared counter and
+# every process checks it at most once per check_interval. A process that
+# finds its grid stale answers from $geoNear while the grid is rebuilt.
+
+class SubscriberIndex:
+    def __init__(self, collection, counters=None, cell_km=10, check_interval=2.0):
+        self.collection = collection
+        self.counters = counters
+        self.cell_km = cell_km
+        self.check_interval = check_interval
+        self.grid = GridIndex(cell_km)
+        self.loaded = False
+        self.version = None
+        self.checked_at = 0.0
+        self.reloader = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+        self.reload()
+
+    def reload(self):
+        # Read the version first: a write during the scan forces another reload
+        version = self.shared_version()
+        grid = GridIndex(self.cell_km)
+        for doc in self.collection.find({"location": {"$exists": True}}, {"email": 1, "phone": 1, "location": 1}):
+            self._index(grid, doc)
+        with self.lock:
+            self.grid = grid
+            self.version = version
+            self.checked_at = time.monotonic()
+            self.loaded = True
+        print(f"Subscriber index loaded: {len(grid)} users.")
+
+    def _index(self, grid, doc):
+        lng, lat = doc["location"]["coordinates"]
+        user = {"email": doc.get("email"), "phone": doc.get("phone"), "lat": lat, "lng": lng}
+        grid.add(str(doc["_id"]), lat, lng, user)
+
+    def shared_version(self):
+        if self.counters is None:
+            return None
+        doc = self.counters.find_one({"_id": VERSION_ID}, {"version": 1})
+        return doc["version"] if doc else 0
+
+    def _bump(self):
+        if self.counters is None:
+            return
+        doc = self.counters.find_one_and_update(
+            {"_id": VERSION_ID}, {"$inc": {"version": 1}}, {"version": 1},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        with self.lock:
+            # Our own write is already in the grid; anyone else's means a reload
+            if self.version is not None and doc["version"] == self.version + 1:
+                self.version = doc["version"]
+
+    def add(self, email, phone, lat, lng):
+        doc = {"email": email, "phone": phone, "location": to_point(lat, lng)}
+        if email:
+            result = self.collection.update_one({"email": email}, {"$set": doc}, upsert=True)
+            if result.upserted_id is not None:
+                doc["_id"] = result.upserted_id
+            else:
+                doc["_id"] = self.collection.find_one({"email": email}, {"_id": 1})["_id"]
+        else:
+            doc["_id"] = self.collection.insert_one(doc).inserted_id
+        if self.loaded:
+            self._index(self.grid, doc)
+        self._bump()
+        return str(doc["_id"])
+
+    def remove(self, subscriber_id):
+        # False for an unknown or malformed id, so the route answers 404
+        oid = object_id(subscriber_id)
+        if oid is None:
+            return False
+        result = self.collection.delete_one({"_id": oid})
+        self.grid.remove(subscriber_id)
+        if result.deleted_count:
+            self._bump()
+        return result.deleted_count == 1
+
+    def stale(self):
+        # True when another process changed the subscribers since our load
+        if self.counters is None:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            if now - self.checked_at < self.check_interval:
+                return False
+            self.checked_at = now
+            version = self.version
+        return self.shared_version() != version
+
+    def _reload_in_background(self):
+        with self.lock:
+            if self.reloader is not None and self.reloader.is_alive():
+                return
+            self.reloader = threading.Thread(target=self._reload_quietly, name="subscriber-reload", daemon=True)
+            self.reloader.start()
+
+    def _reload_quietly(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Subscriber index reload failed: {e}")
+
+    def reloading(self):
+        reloader = self.reloader
+        return reloader is not None and reloader.is_alive()
+
+    def nearby(self, lat, lng, radius_km):
+        # Returns [(user, distance_km)] nearest first
+        if not self.loaded:
+            self.load()
+        elif self.reloading() or self.stale():
+            self._reload_in_background()
+            return self.nearby_from_db(lat, lng, radius_km)
+        return [(user, dist) for _, user, dist in self.grid.query_radius(lat, lng, radius_km)]
+
+    def nearby_from_db(self, lat, lng, radius_km):
+        pipeline = [
+            {"$geoNear": {
+                "near": to_point(lat, lng),
+                "distanceField": "distance",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+            }},
+            {"$project": {"email": 1, "phone": 1, "location": 1, "distance": 1}},
+        ]
+        results = []
+        for doc in self.collection.aggregate(pipeline):
+            lng_, lat_ = doc["location"]["coordinates"]
+            user = {"email": doc.get("email"), "phone": doc.get("phone"), "lat": lat_, "lng": lng_}
+            results.append((user, doc["distance"] / 1000))
+        return results
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ.setdefault("STORE_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as server  # noqa: E402
+from database import MemoryStore  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not isinstance(server.store, MemoryStore), reason="needs STORE_BACKEND=memory")
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def client():
+    server.store.incidents.drop()
+    server.store.ensure_indexes()
+    # An old document without the moderation flags, and a moderated one
+    server.store.incidents.insert_many([
+        {"type": "fire", "description": "old", "timestamp": NOW - timedelta(hours=1)},
+        {"type": "theft", "description": "new", "timestamp": NOW, "approved": True, "flagged": False},
+    ])
+    return server.app.test_client()
+
+
+def test_missing_flags_default_to_false(client):
+    data = client.get("/admin/incidents").get_json()["data"]
+    assert [(d["approved"], d["flagged"]) for d in data] == [(True, False), (False, False)]
+
+
+def test_projected_out_flags_are_not_added(client):
+    data = client.get("/admin/incidents?fields=type").get_json()["data"]
+    assert [set(d) for d in data] == [{"_id", "type", "timestamp"}] * 2
+    data = client.get("/admin/incidents?fields=type,approved").get_json()["data"]
+    assert [d["approved"] for d in data] == [True, False] and all("flagged" not in d for d in data)
+
+
+def test_ndjson_export_applies_the_same_defaults(client):
+    response = client.get("/admin/incidents?fields=flagged", headers={"Accept": "application/x-ndjson"})
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["flagged"] for row in rows] == [False, False]
+    assert all("approved" not in row for row in rows)
@@ -0,0 +1,82 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classify_cache import CachedClassifier, SqliteStore, normalize  # noqa: E402
+
+
+class FakeRegistry:
+    # `version` is what the serving process believes; `worker_version` is
+    # what actually classifies, like a pool worker that has not reloaded yet
+    def __init__(self, version="v1"):
+        self.version = version
+        self.worker_version = version
+        self.calls = 0
+
+    def classify_versioned(self, texts):
+        self.calls += 1
+        return self.worker_version, [{"is_spam": False, "spam_score": 0.1, "predicted_type": self.worker_version}
+                                     for _ in texts]
+
+
+def test_normalize_ignores_case_punctuation_and_short_tokens():
+    assert normalize("Fire!!  in a  BUILDING") == normalize("fire in building")
+
+
+def test_repeat_texts_hit_the_cache():
+    registry = FakeRegistry()
+    cache = CachedClassifier(registry)
+    cache.classify(["Fire in building", "Car stolen"])
+    cache.classify(["fire in building!", "CAR STOLEN"])
+    cache.classify_one("Fire in building")
+    assert registry.calls == 1
+    assert cache.info()["hits"] == 3
+
+
+def test_results_are_keyed_on_the_version_that_computed_them():
+    registry = FakeRegistry("v1")
+    cache = CachedClassifier(registry)
+    registry.version = "v2"  # published; the worker still serves v1
+    assert cache.classify(["Fire in building"])[0]["predicted_type"] == "v1"
+    assert cache.classify_one("Car stolen")["predicted_type"] == "v1"
+
+    registry.worker_version = "v2"
+    assert cache.classify(["Fire in building"])[0]["predicted_type"] == "v2"
+    assert cache.classify_one("Car stolen")["predicted_type"] == "v2"
+    assert registry.calls == 4
+
+
+def test_shared_store_is_keyed_on_the_lexicon_version(tmp_path):
+    registry = FakeRegistry()
+    path = str(tmp_path / "cache.sqlite3")
+    CachedClassifier(registry, lexicon_version=1, shared_path=path).classify(["Fire in building"])
+    CachedClassifier(registry, lexicon_version=2, shared_path=path).classify(["Fire in building"])
+    assert registry.calls == 2
+    other_worker = CachedClassifier(registry, lexicon_version=1, shared_path=path)
+    other_worker.classify(["Fire in building"])
+    assert registry.calls == 2
+    assert other_worker.info()["shared_hits"] == 1
+
+
+def test_callers_cannot_mutate_cached_results():
+    registry = FakeRegistry()
+    cache = CachedClassifier(registry, keyword_fn=lambda text: {"suspicious": True, "score": 1,
+                                                                "terms": [{"term": "gun"}]})
+    cache.classify_one("Man with a gun")["suspicious_terms"].append("knife")
+    cache.classify(["Man with a gun"])[0]["suspicious_terms"].clear()
+    assert cache.classify_one("Man with a gun")["suspicious_terms"] == ["gun"]
+
+
+def test_shared_store_purges_expired_rows_and_caps_its_size(tmp_path):
+    store = SqliteStore(str(tmp_path / "cache.sqlite3"), ttl=-1, max_rows=3, purge_interval=3600)
+    store.set_many([(f"old{i}", {"i": i}) for i in range(5)])
+    assert store.get("old0") is None and len(store) == 5
+    assert store.purge() == 5 and len(store) == 0
+
+    store.ttl = 3600
+    store.set_many([(f"key{i}", {"i": i}) for i in range(5)])
+    store.purge_interval = 0
+    store.set("key5", {"i": 5})  # writes purge once the interval has passed
+    assert len(store) == 3
+    assert store.get("key5") == {"i": 5}
@@ -0,0 +1,74 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedupe import DuplicateIndex, similarity, text_fingerprint, text_fingerprints  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0)
+LAT, LNG = 33.6844, 73.0479
+METRE = 1 / 111_320  # degrees of latitude
+
+
+def index_with(text, lat=LAT, lng=LNG):
+    index = DuplicateIndex(window_minutes=30, radius_km=1.0)
+    index.add("canonical", text_fingerprint(text), lat, lng, NOW)
+    return index
+
+
+@pytest.mark.parametrize("original, variant", [
+    ("Fire broke out in apartment building", "Fire broke out in the apartment building"),
+    ("Fire broke out in apartment building", "Fire broke out in apartment building near market"),
+    ("Shooting at the main market, two people injured", "Shooting at main market, two people injured"),
+    ("Car stolen from parking lot", "Car stolen from the parking lot of the mall"),
+    ("Masjid ke bahar jhagda hua", "masjid ke bahar jhagda"),
+    ("Robbery at shop 1 on street 7", "Robbery at shop 1 on street 7!!"),
+])
+def test_paraphrases_nearby_are_merged(original, variant):
+    index = index_with(original)
+    found = index.find(text_fingerprint(variant), LAT + 11 * METRE, LNG, NOW + timedelta(minutes=5))
+    assert found == "canonical"
+
+
+@pytest.mark.parametrize("original, other", [
+    ("Robbery at shop 0 on street 0", "Robbery at shop 1 on street 7"),
+    ("House 12 burglary", "House 13 burglary"),
+    ("Traffic accident involving three vehicles", "Traffic accident involving two vehicles"),
+])
+def test_different_numbers_are_not_merged(original, other):
+    index = index_with(original)
+    assert index.find(text_fingerprint(other), LAT + 157 * METRE, LNG, NOW) is None
+
+
+def test_different_incidents_are_not_merged():
+    index = index_with("Fire broke out in apartment building")
+    assert index.find(text_fingerprint("Fire broke out in warehouse"), LAT, LNG, NOW) is None
+    assert index.find(text_fingerprint("Car accident on highway"), LAT, LNG, NOW) is None
+
+
+def test_same_text_outside_radius_or_window_is_not_merged():
+    text = "Fire broke out in apartment building"
+    index = index_with(text)
+    assert index.find(text_fingerprint(text), LAT + 0.05, LNG, NOW) is None
+    assert index.find(text_fingerprint(text), LAT, LNG, NOW + timedelta(minutes=31)) is None
+
+
+def test_most_similar_entry_wins():
+    index = index_with("Fire broke out in apartment building near market")
+    index.add("exact", text_fingerprint("Fire broke out in apartment building"), LAT, LNG, NOW)
+    assert index.find(text_fingerprint("fire broke out in the apartment building"), LAT, LNG, NOW) == "exact"
+
+
+def test_empty_descriptions_never_match():
+    index = index_with("!!!")
+    assert index.find(text_fingerprint("..."), LAT, LNG, NOW) is None
+
+
+def test_batch_fingerprints_match_single():
+    texts = ["Fire broke out in apartment building", "", "Robbery at shop 1 on street 7"]
+    assert text_fingerprints(texts) == [text_fingerprint(t) for t in texts]
+    a, b = text_fingerprints(["Fire in the building", "fire in building"])
+    assert similarity(a, b) == 1.0
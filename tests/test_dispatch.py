@@ -0,0 +1,73 @@
+import os
+import smtplib
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatch  # noqa: E402
+from dispatch import AlertDispatcher, FakeTransport, SMTPTransport  # noqa: E402
+
+
+class RecordingSMTP:
+    # Stands in for smtplib.SMTP_SSL: one instance per connection
+    connections = []
+
+    def __init__(self, host, port):
+        self.messages = []
+        self.refuse = set()
+        RecordingSMTP.connections.append(self)
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, sender, recipients, message):
+        refused = {r: (550, b"no such user") for r in recipients if r in self.refuse}
+        if len(refused) == len(recipients):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        self.messages.append(list(recipients))
+        return refused
+
+    def quit(self):
+        pass
+
+
+def job(to, body="Fire reported nearby", subject="Alert", channel="email"):
+    return {"channel": channel, "to": to, "subject": subject, "body": body, "attempt": 0}
+
+
+def test_smtp_sends_one_message_per_body_over_one_connection(monkeypatch):
+    monkeypatch.setattr(dispatch.smtplib, "SMTP_SSL", RecordingSMTP)
+    RecordingSMTP.connections = []
+    transport = SMTPTransport("alerts@example.com", "secret", max_recipients=2)
+    jobs = [job("a@x.com"), job("b@x.com"), job("c@x.com"), job("d@x.com", body="Theft reported nearby")]
+    assert transport.send_many(jobs) == [None] * 4
+    (server,) = RecordingSMTP.connections
+    assert server.messages == [["a@x.com", "b@x.com"], ["c@x.com"], ["d@x.com"]]
+
+    server.refuse = {"b@x.com"}
+    errors = transport.send_many([job("a@x.com"), job("b@x.com")])
+    assert errors[0] is None and isinstance(errors[1], smtplib.SMTPRecipientsRefused)
+
+
+def test_dispatcher_groups_each_batch_by_channel():
+    # While the first send is in flight the rest of the jobs queue up
+    email, sms = FakeTransport(latency=0.05), FakeTransport(latency=0.05)
+    dispatcher = AlertDispatcher({"email": email, "sms": sms}, workers=1, batch_size=50)
+    for i in range(20):
+        dispatcher.enqueue("email", f"user{i}@example.com", "Fire", subject="Alert")
+        dispatcher.enqueue("sms", f"+1{i:010d}", "Fire")
+    dispatcher.stop(timeout=5)
+    assert len(email.sent) == len(sms.sent) == 20
+    assert email.calls <= 3 and sms.calls <= 3
+    assert dispatcher.stats["sent"] == 40
+
+
+def test_failed_jobs_are_retried_then_dead_lettered():
+    transport = FakeTransport(failure_rate=1.0)
+    dispatcher = AlertDispatcher({"sms": transport}, workers=2, max_retries=2, backoff=0.001)
+    dispatcher.enqueue("sms", "+10000000000", "Fire")
+    dispatcher.enqueue("sms", "+10000000001", "Fire")
+    dispatcher.stop(timeout=5)
+    assert dispatcher.stats["retried"] == 4
+    assert dispatcher.stats["dead"] == 2
+    assert {item["attempt"] for item in dispatcher.dead_letters.items} == {2}
@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryStore  # noqa: E402
+from hotspots import HotspotEngine  # noqa: E402
+
+
+def incident(lat, lng):
+    return {"latitude": lat, "longitude": lng, "timestamp": datetime.utcnow(),
+            "approved": True, "flagged": False, "spam": False}
+
+
+def make_engine(docs=(), **kwargs):
+    store = MemoryStore("test_hotspots")
+    if docs:
+        store.incidents.insert_many([dict(doc) for doc in docs])
+    engine = HotspotEngine(store.incidents, **kwargs)
+    engine.load()
+    return engine
+
+
+def test_bbox_crossing_the_antimeridian():
+    engine = make_engine([incident(-17.0, 179.5), incident(-17.0, -179.5), incident(-17.0, 170.0)])
+    hotspots = engine.hotspots(k=5, bbox=(-18, 179, -16, -179))
+    assert sorted(round(h["lng"], 1) for h in hotspots) == [-179.5, 179.5]
+    assert len(engine.hotspots(k=5, bbox=(-18, 169, -16, 171))) == 1
+
+
+@pytest.mark.parametrize("kwargs", [{"half_life_hours": 0}, {"half_life_hours": -1}, {"window_hours": 0}])
+def test_rejects_non_positive_durations(kwargs):
+    with pytest.raises(ValueError):
+        make_engine().hotspots(**kwargs)
+
+
+def test_cache_is_quantized_and_bounded():
+    engine = make_engine([incident(33.68, 73.04)], cache_size=4)
+    engine.hotspots(window_hours=2.2, half_life_hours=1.01)
+    engine.hotspots(window_hours=2.9, half_life_hours=0.99)
+    assert len(engine.cache) == 1
+    for i in range(10):
+        engine.hotspots(bbox=(30, 70, 35 + i, 75))
+    assert len(engine.cache) == 4
+
+
+def test_writes_publish_once_per_delay():
+    engine = make_engine(publish_delay=0.05)
+    published = threading.Event()
+    calls = []
+
+    def on_change(hotspots):
+        calls.append(hotspots)
+        published.set()
+
+    engine.on_change = on_change
+    for i in range(20):
+        engine.add(f"id{i}", incident(33.68, 73.04))
+    assert calls == []  # nothing reclustered on the write path
+    assert published.wait(2)
+    assert len(calls) == 1 and calls[0][0]["count"] == 20
@@ -0,0 +1,96 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryStore  # noqa: E402
+from dedupe import DuplicateIndex  # noqa: E402
+from ingest import (MAX_DUPLICATE_REPORTS, IngestPipeline, escalation, merge_update, read_csv,  # noqa: E402
+                    read_ndjson, validate_report)
+
+NOW = datetime(2024, 1, 1, 12, 0)
+LAT, LNG = 33.6844, 73.0479
+
+
+class FakeClassifier:
+    def classify(self, texts):
+        return [{"is_spam": False, "spam_score": 0.0, "predicted_type": "fire", "suspicious": False,
+                 "suspicion_score": 0, "suspicious_terms": []} for _ in texts]
+
+
+def report(severity="low", description="Fire broke out in apartment building", **extra):
+    return {"location": "Block 1", "severity": severity, "description": description,
+            "latitude": LAT, "longitude": LNG, **extra}
+
+
+def pipeline(store, **kwargs):
+    return IngestPipeline(store.incidents, FakeClassifier(), duplicate_index=DuplicateIndex(), **kwargs)
+
+
+def test_validate_report():
+    assert validate_report(report())["latitude"] == LAT
+    with pytest.raises(ValueError):
+        validate_report({"location": "x", "severity": "low"})
+    with pytest.raises(ValueError):
+        validate_report(report(latitude=91))
+    with pytest.raises(ValueError):
+        validate_report({**report(), "longitude": ""})
+    ts = validate_report(report(timestamp="2024-01-01T12:00:00Z"), allow_timestamp=True)["timestamp"]
+    assert ts == NOW
+
+
+def test_readers_report_bad_lines():
+    rows = list(read_ndjson([b'{"a": 1}', b"", b"{not json"]))
+    assert rows[0] == (1, {"a": 1})
+    assert rows[1][0] == 3 and isinstance(rows[1][1], ValueError)
+    assert list(read_csv(["location,severity", "x,low"])) == [(2, {"location": "x", "severity": "low"})]
+
+
+def test_duplicate_reports_are_capped_but_counted():
+    store = MemoryStore("test_ingest")
+    incident_id = store.incidents.insert_one({"report_count": 1, "severity": "low"}).inserted_id
+    for i in range(MAX_DUPLICATE_REPORTS + 10):
+        store.incidents.update_one({"_id": incident_id}, merge_update(report(), NOW + timedelta(seconds=i)))
+    doc = store.incidents.find_one({"_id": incident_id})
+    assert doc["report_count"] == MAX_DUPLICATE_REPORTS + 11
+    assert len(doc["duplicate_reports"]) == MAX_DUPLICATE_REPORTS
+    assert doc["duplicate_reports"][-1]["timestamp"] == NOW + timedelta(seconds=MAX_DUPLICATE_REPORTS + 9)
+    assert doc["last_reported"] == NOW + timedelta(seconds=MAX_DUPLICATE_REPORTS + 9)
+
+
+@pytest.mark.parametrize("current, incoming, expected", [
+    ("low", "high", "high"),
+    ("high", "low", "high"),
+    ("moderate", "critical", "critical"),
+    ("critical", "high", "critical"),
+    ("high", "unknown", "high"),
+])
+def test_escalation_only_raises(current, incoming, expected):
+    store = MemoryStore("test_ingest")
+    incident_id = store.incidents.insert_one({"severity": current}).inserted_id
+    before = store.escalate_incident(incident_id, incoming)
+    assert store.incidents.find_one({"_id": incident_id})["severity"] == expected
+    assert (before is not None) == (expected != current)
+    assert escalation("low") is None
+
+
+def test_pipeline_folds_duplicates_and_keeps_the_highest_severity():
+    store = MemoryStore("test_ingest")
+    escalated = []
+    ingest = pipeline(store, escalated=lambda before, severity: escalated.append((before["severity"], severity)))
+    records = [(1, report("low")), (2, report("high", "Fire broke out in the apartment building")),
+               (3, report("low", "Car stolen from parking lot", latitude=LAT + 1))]
+    summary = ingest.run(records)
+    assert (summary["inserted"], summary["merged"]) == (2, 1)
+    fire = store.incidents.find_one({"type": "fire", "location": "Block 1", "latitude": LAT})
+    assert fire["severity"] == "high" and fire["report_count"] == 2
+
+    # A later batch merges into the stored incident and raises it further
+    summary = ingest.run([(1, report("critical", "Fire broke out in apartment building!"))])
+    assert (summary["inserted"], summary["merged"]) == (0, 1)
+    fire = store.incidents.find_one({"_id": fire["_id"]})
+    assert fire["severity"] == "critical" and fire["report_count"] == 3
+    assert escalated == [("high", "critical")]
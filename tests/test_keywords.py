@@ -0,0 +1,59 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keywords import AhoCorasick, KeywordMatcher  # noqa: E402
+
+
+def test_automaton_finds_every_overlapping_occurrence():
+    rng = random.Random(7)
+    patterns = ["a", "ab", "bab", "bc", "bca", "c", "caa", "abcab"]
+    automaton = AhoCorasick(patterns)
+    for _ in range(200):
+        text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 30)))
+        brute = sorted((i, i + len(p), k) for k, p in enumerate(patterns)
+                       for i in range(len(text) - len(p) + 1) if text.startswith(p, i))
+        assert sorted(automaton.iter(text)) == brute
+
+
+def matcher(**kwargs):
+    lexicons = {
+        "en": {"kill": 1.0, "terror*": 1.0, "gun": {"weight": 0.6, "variants": ["pistol"]}},
+        "roman_urdu": {"qatl": 1.0, "maaro": 0.5},
+    }
+    return KeywordMatcher(lexicons, threshold=1.0, substitutions={"q": "k", "v": "w"}, **kwargs)
+
+
+def terms(result):
+    return sorted(h["term"] for h in result["terms"])
+
+
+def test_terms_sit_on_word_boundaries_unless_prefixed():
+    m = matcher()
+    assert terms(m.match("He has the skill to kill")) == ["kill"]
+    assert terms(m.match("skilled killers")) == []
+    assert terms(m.match("Terrorists and TERROR")) == ["terror"]
+    assert terms(m.match("counterterrorism")) == []
+
+
+def test_folding_meets_transliteration_variants():
+    m = matcher()
+    assert terms(m.match("Katl hua, maaaaro usay!")) == ["maaro", "qatl"]
+    assert m.match("a PISTOL was shown")["terms"][0] == {"term": "gun", "lexicon": "en", "weight": 0.6, "count": 1}
+
+
+def test_each_term_scores_once():
+    m = matcher()
+    result = m.match("gun gun gun pistol")
+    assert result["score"] == 0.6 and not result["suspicious"]
+    assert result["terms"][0]["count"] == 4
+    assert m.is_suspicious("gun and kill")
+
+
+def test_shipped_lexicons_load():
+    m = KeywordMatcher.from_file()
+    assert m.version is not None
+    assert m.is_suspicious("bomb")
+    assert not m.is_suspicious("My cat is lost near the park")
@@ -0,0 +1,268 @@
+import copy
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo import DeleteMany, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.memory import MemoryDatabase  # noqa: E402
+from geo import haversine  # noqa: E402
+
+# The memory backend against mongomock: every query, update and pipeline
+# the app sends runs on both and must give the same documents.
+mongomock = pytest.importorskip("mongomock")
+
+T0 = datetime(2024, 1, 1, 12, 0)
+DOCS = [
+    {"_id": ObjectId(), "a": 1, "name": "Fire", "tags": ["x", "y"], "nested": {"x": 1}, "ts": T0, "ok": True},
+    {"_id": ObjectId(), "a": 2.5, "name": "fight", "tags": ["y"], "nested": {"x": 2}, "ts": datetime(2024, 1, 2)},
+    {"_id": ObjectId(), "a": 3, "name": "Theft", "tags": [], "b": None, "ok": False},
+    {"_id": ObjectId(), "a": "3", "name": "flood", "tags": ["x", "z"], "b": 4},
+    {"_id": ObjectId(), "name": "fire", "b": 1, "ts": datetime(2023, 12, 31)},
+    {"_id": ObjectId(), "a": None, "name": "Robbery", "tags": ["z"], "nested": {"x": 1, "y": [1, 2]}},
+    {"_id": ObjectId(), "a": 2, "name": "Assault", "ok": True, "ts": T0},
+]
+
+
+@pytest.fixture
+def both():
+    memory = MemoryDatabase()["things"]
+    mock = mongomock.MongoClient().db["things"]
+    for collection in (memory, mock):
+        collection.insert_many(copy.deepcopy(DOCS))
+    return memory, mock
+
+
+def ids(docs):
+    return sorted(str(doc["_id"]) for doc in docs)
+
+
+def canonical(docs):
+    # Order-insensitive, and key order inside documents does not matter
+    return sorted(json.dumps(doc, sort_keys=True, default=str) for doc in docs)
+
+
+@pytest.mark.parametrize("query", [
+    {},
+    {"a": 1},
+    {"a": {"$gt": 1}},
+    {"a": {"$gte": 2, "$lt": 3}},
+    {"a": {"$lte": "3"}},
+    {"a": {"$ne": 2}},
+    {"a": {"$in": [1, "3", None]}},
+    {"a": {"$nin": [1, 2]}},
+    {"a": None},
+    {"a": {"$exists": False}},
+    {"b": {"$exists": True}},
+    {"b": None},
+    {"tags": "x"},
+    {"tags": {"$in": ["z"]}},
+    {"tags": {"$size": 2}},
+    {"nested.x": 1},
+    {"nested.y": 2},
+    {"name": {"$regex": "^fi", "$options": "i"}},
+    {"name": {"$regex": "^fi"}},
+    {"a": {"$type": "number"}},
+    {"a": {"$type": "string"}},
+    {"ts": {"$gte": T0}},
+    {"ok": True},
+    {"ok": {"$ne": True}},
+    {"$or": [{"a": 1}, {"b": 1}]},
+    {"$and": [{"a": {"$gt": 1}}, {"ok": True}]},
+    {"$nor": [{"a": 1}, {"tags": "z"}]},
+    {"_id": DOCS[2]["_id"]},
+    {"_id": {"$in": [DOCS[0]["_id"], DOCS[3]["_id"]]}},
+])
+def test_find_matches_the_same_documents(both, query):
+    memory, mock = both
+    assert ids(memory.find(query)) == ids(mock.find(query))
+    assert memory.count_documents(query) == mock.count_documents(query)
+
+
+@pytest.mark.parametrize("sort", [
+    [("a", 1)],
+    [("a", -1)],
+    [("ts", -1), ("_id", -1)],
+    [("ok", 1), ("name", 1)],
+])
+def test_sort_skip_limit(both, sort):
+    memory, mock = both
+    for skip, limit in ((0, 0), (1, 3), (5, 10)):
+        got = [d["_id"] for d in memory.find({}).sort(sort).skip(skip).limit(limit)]
+        want = [d["_id"] for d in mock.find({}).sort(sort).skip(skip).limit(limit)]
+        assert got == want
+
+
+@pytest.mark.parametrize("projection", [
+    {"name": 1},
+    {"name": 1, "_id": 0},
+    {"tags": 0, "nested": 0},
+    ["a", "ts"],
+])
+def test_projection(both, projection):
+    memory, mock = both
+    query = {"a": {"$exists": True}}
+    assert list(memory.find(query, projection).sort("_id", 1)) == list(mock.find(query, projection).sort("_id", 1))
+
+
+@pytest.mark.parametrize("update", [
+    {"$set": {"name": "changed", "nested.z": 3}},
+    {"$inc": {"a": 2, "count": 1}},
+    {"$max": {"a": 2, "ts": T0}},
+    {"$min": {"a": 2}},
+    {"$push": {"tags": "new"}},
+    {"$push": {"tags": {"$each": ["p", "q"]}}},
+    {"$push": {"tags": {"$each": ["p", "q"], "$slice": -2}}},
+    {"$push": {"tags": {"$each": ["p"], "$slice": 2}}},
+    {"$addToSet": {"tags": "x"}},
+    {"$pull": {"tags": "y"}},
+    {"$unset": {"nested": ""}},
+    {"$set": {"name": "both"}, "$inc": {"count": 2}},
+])
+def test_update_many(both, update):
+    memory, mock = both
+    query = {"a": {"$type": "number"}}
+    assert memory.update_many(query, update).matched_count == mock.update_many(query, update).matched_count
+    assert list(memory.find().sort("_id", 1)) == list(mock.find().sort("_id", 1))
+
+
+def test_upsert_with_set_on_insert(both):
+    memory, mock = both
+    update = {"$set": {"b": 9}, "$setOnInsert": {"created": T0}, "$inc": {"n": 1}}
+    for collection in (memory, mock):
+        collection.update_one({"name": "new"}, update, upsert=True)
+        collection.update_one({"name": "new"}, update, upsert=True)
+    strip = {"_id": 0}
+    assert memory.find_one({"name": "new"}, strip) == mock.find_one({"name": "new"}, strip)
+
+
+@pytest.mark.parametrize("return_document", [ReturnDocument.BEFORE, ReturnDocument.AFTER])
+def test_find_one_and_update(both, return_document):
+    memory, mock = both
+    args = ({"ok": True}, {"$set": {"ok": False}, "$inc": {"a": 1}})
+    kwargs = {"sort": [("ts", -1), ("_id", 1)], "return_document": return_document}
+    assert memory.find_one_and_update(*args, **kwargs) == mock.find_one_and_update(*args, **kwargs)
+    assert memory.find_one_and_update({"name": "missing"}, {"$set": {"a": 1}}) is None
+
+
+def test_find_one_and_delete_and_delete_many(both):
+    memory, mock = both
+    assert memory.find_one_and_delete({"a": {"$gt": 1}}, sort=[("a", -1)]) == \
+        mock.find_one_and_delete({"a": {"$gt": 1}}, sort=[("a", -1)])
+    assert memory.delete_many({"tags": "x"}).deleted_count == mock.delete_many({"tags": "x"}).deleted_count
+    assert ids(memory.find()) == ids(mock.find())
+
+
+def test_bulk_write(both):
+    # mongomock cannot take this pymongo's request objects: same writes one by one
+    memory, mock = both
+    new_id = ObjectId()
+    result = memory.bulk_write([
+        InsertOne({"_id": new_id, "a": 7}),
+        UpdateOne({"a": 7}, {"$set": {"name": "seven"}}),
+        UpdateMany({"ok": True}, {"$inc": {"a": 10}}),
+        UpdateOne({"name": "absent"}, {"$set": {"a": 0}}, upsert=True),
+        DeleteMany({"b": 1}),
+    ])
+    mock.insert_one({"_id": new_id, "a": 7})
+    mock.update_one({"a": 7}, {"$set": {"name": "seven"}})
+    mock.update_many({"ok": True}, {"$inc": {"a": 10}})
+    mock.update_one({"name": "absent"}, {"$set": {"a": 0}}, upsert=True)
+    mock.delete_many({"b": 1})
+    assert (result.inserted_count, result.matched_count, result.upserted_count, result.deleted_count) == (1, 3, 1, 1)
+    strip = {"_id": 0}
+    assert canonical(memory.find({}, strip)) == canonical(mock.find({}, strip))
+
+
+def test_unique_index(both):
+    memory, mock = both
+    for collection in (memory, mock):
+        collection.create_index("name", unique=True, sparse=True)
+        with pytest.raises(DuplicateKeyError):
+            collection.insert_one({"name": "Fire"})
+        collection.insert_one({"other": 1})
+        collection.insert_one({"other": 2})  # sparse: missing names do not collide
+        with pytest.raises(BulkWriteError):
+            collection.insert_many([{"name": "unique"}, {"name": "Theft"}])
+        assert collection.count_documents({"name": "unique"}) == 1
+
+
+@pytest.mark.parametrize("pipeline", [
+    [{"$match": {"a": {"$type": "number"}}}, {"$sort": {"a": -1}}, {"$limit": 2}],
+    [{"$match": {"tags": "x"}}, {"$project": {"name": 1}}],
+    [{"$sort": {"name": 1}}, {"$skip": 2}, {"$count": "n"}],
+    [{"$match": {"a": {"$type": "number"}}},
+     {"$group": {"_id": "$ok", "n": {"$sum": 1}, "top": {"$max": "$a"}, "low": {"$min": "$a"}, "first": {"$first": "$name"}}}],
+    [{"$group": {"_id": {"$ifNull": ["$b", "none"]}, "n": {"$sum": 1}}}],
+    [{"$group": {"_id": {"ok": {"$cond": ["$ok", "yes", "no"]}, "x": "$nested.x"}, "n": {"$sum": 1}}}],
+    [{"$match": {"a": {"$type": "number"}}},
+     {"$group": {"_id": {"$floor": {"$divide": [{"$add": ["$a", 1]}, 2]}}, "n": {"$sum": 1}}}],
+])
+def test_aggregate(both, pipeline):
+    memory, mock = both
+    assert canonical(memory.aggregate(copy.deepcopy(pipeline))) == canonical(mock.aggregate(copy.deepcopy(pipeline)))
+
+
+# Below, what mongomock does not implement (or gets wrong) is checked
+# against the documented MongoDB results instead
+
+def test_group_by_hour_of_a_date():
+    # The bucket StatsEngine.pipeline() computes; mongomock lacks $toLong on dates
+    memory = MemoryDatabase()["things"]
+    memory.insert_many(copy.deepcopy(DOCS))
+    pipeline = [{"$match": {"ts": {"$exists": True}}},
+                {"$group": {"_id": {"$floor": {"$divide": [{"$toLong": "$ts"}, 3600 * 1000]}}, "n": {"$sum": 1}}}]
+    hour = int(T0.replace(tzinfo=timezone.utc).timestamp()) // 3600
+    assert canonical(memory.aggregate(pipeline)) == canonical([{"_id": hour, "n": 2}, {"_id": hour + 12, "n": 1},
+                                                               {"_id": hour - 36, "n": 1}])
+
+
+def test_pipeline_update_evaluates_expressions_in_arrays():
+    # The form backfill_location_points uses; mongomock stores the
+    # expressions inside the array as literals
+    memory = MemoryDatabase()["things"]
+    memory.insert_many(copy.deepcopy(DOCS))
+    query = {"a": {"$type": "number"}}
+    memory.update_many(query, [{"$set": {"point": {"type": "Point", "coordinates": [{"$toDouble": "$a"}, 1.0]}}}])
+    assert sorted(tuple(d["point"]["coordinates"]) for d in memory.find(query)) == \
+        [(1.0, 1.0), (2.0, 1.0), (2.5, 1.0), (3.0, 1.0)]
+
+
+# $geoNear has no mongomock counterpart: checked against haversine
+
+def test_geo_near_is_nearest_first_within_max_distance():
+    collection = MemoryDatabase()["incidents"]
+    collection.create_index([("location_point", "2dsphere")])
+    points = [(33.6 + i * 0.01, 73.0 + (i % 5) * 0.02) for i in range(60)]
+    collection.insert_many([{"n": i, "public": i % 3 != 0, "location_point": {"type": "Point", "coordinates": [lng, lat]}}
+                            for i, (lat, lng) in enumerate(points)])
+    stage = {"near": {"type": "Point", "coordinates": [73.05, 33.8]}, "key": "location_point",
+             "distanceField": "km", "distanceMultiplier": 0.001, "spherical": True,
+             "maxDistance": 15_000, "query": {"public": True}}
+    got = list(collection.aggregate([{"$geoNear": stage}, {"$limit": 10}]))
+
+    expected = sorted((haversine(33.8, 73.05, lat, lng), i) for i, (lat, lng) in enumerate(points)
+                      if i % 3 != 0 and haversine(33.8, 73.05, lat, lng) <= 15)
+    assert [d["n"] for d in got] == [i for _, i in expected[:10]]
+    assert [round(d["km"], 6) for d in got] == [round(km, 6) for km, _ in expected[:10]]
+
+
+@pytest.mark.parametrize("call", [
+    lambda c: list(c.find({"tags": {"$elemMatch": {"$eq": "x"}}})),
+    lambda c: list(c.find({"$where": "true"})),
+    lambda c: c.update_one({}, {"$rename": {"a": "b"}}),
+    lambda c: list(c.aggregate([{"$unwind": "$tags"}])),
+    lambda c: list(c.aggregate([{"$group": {"_id": None, "all": {"$push": "$a"}}}])),
+])
+def test_unsupported_operators_fail_loudly(call):
+    # Never a silently different answer from the one mongod would give
+    collection = MemoryDatabase()["things"]
+    collection.insert_many(copy.deepcopy(DOCS))
+    with pytest.raises(NotImplementedError):
+        call(collection)
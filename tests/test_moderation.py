@@ -0,0 +1,95 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ.setdefault("STORE_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as server  # noqa: E402
+from database import MemoryStore  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not isinstance(server.store, MemoryStore), reason="needs STORE_BACKEND=memory")
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data=None, to=None, **kwargs):
+        self.emitted.append((event, data, to))
+
+    def events(self, name):
+        return [data for event, data, _ in self.emitted if event == name]
+
+
+def pending(i, **extra):
+    return {"type": "fire", "severity": "low", "description": f"Fire number {i}", "location": "Block 1",
+            "latitude": 33.68 + i * 0.01, "longitude": 73.04, "timestamp": NOW - timedelta(minutes=i),
+            "approved": False, "flagged": False, "spam": False, **extra}
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    store = server.store
+    for collection in (store.incidents, store.rejections):
+        collection.drop()
+    store.ensure_indexes()
+    ids = [str(store.incidents.insert_one(pending(i)).inserted_id) for i in range(4)]
+    socket = RecordingSocketIO()
+    monkeypatch.setattr(server.broadcaster, "socketio", socket)
+    monkeypatch.setattr(server.moderation_feed, "socketio", socket)
+    for engine in (server.stats_engine, server.tile_index):
+        engine.load()
+    return server.app.test_client(), ids, socket
+
+
+def bulk(client, action, ids):
+    return client.post("/admin/incidents/bulk", json={"action": action, "ids": ids})
+
+
+def test_bulk_approve_skips_unknown_and_unchanged_ids(setup):
+    client, ids, socket = setup
+    body = bulk(client, "approve", ids[:3] + ["not-an-id", "64b000000000000000000000"]).get_json()
+    assert (body["requested"], body["modified"]) == (5, 3)
+    assert bulk(client, "approve", ids[:2]).get_json()["modified"] == 0
+
+    assert server.stats_engine.query()["total"] == 3
+    assert sum(c["count"] for c in server.tile_index.tile(0, 0, 0)) == 3
+    # One map batch and one queue event for the whole call
+    assert [batch["count"] for batch in socket.events("new_incidents")] == [3]
+    assert [sorted(e["ids"]) for e in socket.events("queue_update")] == [sorted(ids[:3])]
+
+
+def test_bulk_flag_hides_and_unflag_restores(setup):
+    client, ids, socket = setup
+    bulk(client, "approve", ids)
+    assert bulk(client, "flag", ids[:2]).get_json()["modified"] == 2
+    assert server.stats_engine.query()["total"] == 2
+    assert socket.events("incidents_removed")[-1] == {"count": 2, "ids": ids[:2]}
+    assert socket.events("queue_update")[-1] == {"op": "update",
+                                                 "data": [{"_id": i, "flagged": True} for i in ids[:2]]}
+    assert bulk(client, "unflag", ids[:2]).get_json()["modified"] == 2
+    assert server.stats_engine.query()["total"] == 4
+
+
+def test_bulk_reject_deletes_and_records_the_spam_label(setup):
+    client, ids, socket = setup
+    assert bulk(client, "reject", ids[:2]).get_json()["modified"] == 2
+    assert server.store.incidents.count_documents({}) == 2
+    assert sorted(d["description"] for d in server.store.rejections.find()) == ["Fire number 0", "Fire number 1"]
+    assert server.stats_engine.query(status="pending")["total"] == 2
+    assert socket.events("queue_update")[-1] == {"op": "remove", "ids": ids[:2]}
+
+
+@pytest.mark.parametrize("payload", [{"action": "approve", "ids": []}, {"action": "approve", "ids": "x"},
+                                     {"action": "publish", "ids": ["x"]},
+                                     {"action": "approve", "ids": ["x"] * (server.MAX_BULK_MODERATION + 1)}])
+def test_bad_requests_are_rejected(setup, payload):
+    client, _, _ = setup
+    response = client.post("/admin/incidents/bulk", json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
@@ -0,0 +1,87 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.memory import MemoryDatabase  # noqa: E402
+from pagination import (QUEUE_SORT, decode_cursor, encode_cursor, encode_queue_cursor, fetch_page,  # noqa: E402
+                        open_queue, parse_page_args)
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+def backends():
+    yield "memory", lambda: MemoryDatabase()["incidents"]
+    try:
+        import mongomock
+    except ImportError:
+        return
+    yield "mongomock", lambda: mongomock.MongoClient().db["incidents"]
+
+
+BACKENDS = dict(backends())
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def collection(request):
+    collection = BACKENDS[request.param]()
+    # Colliding timestamps, so the _id tie-break matters
+    collection.insert_many([{"_id": ObjectId(), "n": i, "timestamp": T0 - timedelta(minutes=i // 3),
+                             "approved": False, "spam": i % 4 == 0,
+                             "spam_score": None if i % 5 == 0 else (i % 7) / 7,
+                             "suspicion_score": i % 2} for i in range(23)])
+    return collection
+
+
+def expected(collection, sort):
+    docs = list(collection.find())
+    for field, direction in reversed(sort):
+        # None below every value, as in Mongo
+        docs.sort(key=lambda d: (d.get(field) is not None, d.get(field) or 0), reverse=direction < 0)
+    return [d["n"] for d in docs]
+
+
+def test_cursor_walk_returns_every_document_once_newest_first(collection):
+    seen, after = [], None
+    while True:
+        args = {"limit": "5", **({"after": after} if after else {})}
+        docs, after = fetch_page(collection, {}, args)
+        seen += [d["n"] for d in docs]
+        if after is None:
+            break
+    assert seen == expected(collection, [("timestamp", -1), ("_id", -1)])
+
+
+def test_queue_cursor_walk_follows_queue_order(collection):
+    seen, after = [], None
+    while True:
+        cursor, limit = open_queue(collection, {"limit": "4", **({"after": after} if after else {})})
+        docs = list(cursor)
+        seen += [d["n"] for d in docs[:limit]]
+        if len(docs) <= limit:
+            break
+        after = encode_queue_cursor(docs[limit - 1])
+    assert seen == expected(collection, QUEUE_SORT)
+
+
+def test_fields_project_but_keep_the_cursor_keys(collection):
+    docs, after = fetch_page(collection, {}, {"limit": "2", "fields": "n"})
+    assert [set(d) for d in docs] == [{"_id", "n", "timestamp"}] * 2
+    assert decode_cursor(after) == (docs[-1]["timestamp"], docs[-1]["_id"])
+    assert encode_cursor(docs[-1]) == after
+
+
+@pytest.mark.parametrize("args", [{"limit": "x"}, {"after": "not-a-cursor"}, {"fields": "a,$where"},
+                                  {"since": "yesterday"}])
+def test_bad_arguments_raise_value_error(args):
+    with pytest.raises(ValueError):
+        parse_page_args(args)
+
+
+def test_limit_is_clamped():
+    assert parse_page_args({"limit": "0"})["limit"] == 1
+    assert parse_page_args({"limit": "100000"}, max_limit=500)["limit"] == 500
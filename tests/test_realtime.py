@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import queue
+import sys
+
+import pytest
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime import GLOBAL_ROOM, GeoBroadcaster, rooms_for_point  # noqa: E402
+
+INCIDENT = {"_id": "64b000000000000000000001", "type": "fire", "severity": "high",
+            "latitude": 33.6844, "longitude": 73.0479, "description": "Fire"}
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data=None, to=None, **kwargs):
+        self.emitted.append((event, data, to))
+
+
+def test_single_and_batch_removals_reach_legacy_clients():
+    socket = RecordingSocketIO()
+    broadcaster = GeoBroadcaster(socket)
+    broadcaster.publish(INCIDENT, op="remove")
+    broadcaster.publish_batch([INCIDENT], op="remove")
+    legacy = [(event, data) for event, data, to in socket.emitted if to == GLOBAL_ROOM]
+    assert legacy == [("incidents_removed", {"count": 1, "ids": [INCIDENT["_id"]]})] * 2
+    rooms = {to for event, data, to in socket.emitted if event == "incident_delta"}
+    assert rooms == set(rooms_for_point(INCIDENT["latitude"], INCIDENT["longitude"]))
+
+
+# === FAN-OUT ACROSS PROCESSES ===
+# Stands in for the redis manager (SOCKETIO_MESSAGE_QUEUE): the same
+# PubSubManager, with one multiprocessing queue per server process.
+
+class QueueManager(socketio.PubSubManager):
+    name = "queue"
+
+    def __init__(self, inbox, peers, **kwargs):
+        super().__init__(**kwargs)
+        self.inbox = inbox
+        self.peers = peers
+
+    def _publish(self, data):
+        for peer in self.peers:
+            peer.put(data)
+
+    def _listen(self):
+        while True:
+            yield self.inbox.get()
+
+
+def publish_from_worker(inbox, peers):
+    server = socketio.Server(async_mode="threading", client_manager=QueueManager(inbox, peers, write_only=True))
+    broadcaster = GeoBroadcaster(server)
+    broadcaster.publish(INCIDENT)
+    broadcaster.publish(INCIDENT, op="remove")
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_events_published_by_one_worker_reach_clients_of_another():
+    context = multiprocessing.get_context("fork")
+    inbox_a, inbox_b = context.Queue(), context.Queue()
+    received = queue.Queue()
+
+    server = socketio.Server(async_mode="threading", client_manager=QueueManager(inbox_b, [inbox_a]))
+    server._send_eio_packet = lambda eio_sid, pkt: received.put(json.loads(pkt.data[1:]))
+    server.manager.initialize()
+    sid = server.manager.connect("eio-1", "/")
+    server.manager.enter_room(sid, "/", GLOBAL_ROOM)
+
+    worker = context.Process(target=publish_from_worker, args=(inbox_a, [inbox_b]))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    events = [received.get(timeout=5) for _ in range(2)]
+    assert events == [["new_incident", INCIDENT],
+                      ["incidents_removed", {"count": 1, "ids": [INCIDENT["_id"]]}]]
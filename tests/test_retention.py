@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryStore  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+from retention import Archiver, CollectionArchive, ParquetArchive, ensure_ttl_index, ensure_ttl_indexes  # noqa: E402
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def seed(store, days_ago, **extra):
+    doc = {"type": "fire", "severity": "low", "description": "Fire", "latitude": 33.68, "longitude": 73.04,
+           "approved": True, "flagged": False, "spam": False, "report_count": 1,
+           "timestamp": NOW - timedelta(days=days_ago), **extra}
+    doc["_id"] = store.incidents.insert_one(doc).inserted_id
+    return doc
+
+
+def make_archiver(store, archive=None, **kwargs):
+    removed = []
+    archiver = Archiver(store.incidents, archive or CollectionArchive(store.archive), after_days=180,
+                        spam_days=30, batch_size=2, on_archived=removed.extend, **kwargs)
+    return archiver, removed
+
+
+def test_old_incidents_move_to_the_archive_in_batches():
+    store = MemoryStore("test_retention")
+    old = [seed(store, 200 + i) for i in range(5)]
+    recent = seed(store, 10)
+    archiver, removed = make_archiver(store)
+    assert archiver.run_once(NOW) == 5
+    assert [doc["_id"] for doc in store.incidents.find()] == [recent["_id"]]
+    assert sorted(doc["_id"] for doc in store.archive.find()) == sorted(doc["_id"] for doc in old)
+    assert len(removed) == 5
+    assert archiver.run_once(NOW) == 0
+
+
+def test_old_spam_is_deleted_through_the_callback():
+    store = MemoryStore("test_retention")
+    spam = seed(store, 40, spam=True, approved=False)
+    fresh_spam = seed(store, 5, spam=True, approved=False)
+    archiver, removed = make_archiver(store)
+    assert archiver.run_once(NOW) == 0
+    assert [doc["_id"] for doc in removed] == [spam["_id"]]
+    assert store.archive.count_documents({}) == 0
+    assert store.incidents.count_documents({}) == 1 and store.incidents.find_one()["_id"] == fresh_spam["_id"]
+    assert archiver.info()["last_run"]["spam_purged"] == 1
+
+
+def test_spam_ttl_index_is_dropped():
+    store = MemoryStore("test_retention")
+    ensure_ttl_index(store.incidents, "timestamp", 86400, "spam_ttl", {"spam": True})
+    ensure_ttl_indexes(store)
+    assert "spam_ttl" not in store.incidents.index_information()
+    assert "rejected_ttl" in store.rejections.index_information()
+
+
+def test_parquet_archive_pages_newest_first(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = MemoryStore("test_retention")
+    docs = [seed(store, 200 + i * 20, extra_field=i) for i in range(4)]
+    archive = ParquetArchive(str(tmp_path))
+    archiver, _ = make_archiver(store, archive)
+    assert archiver.run_once(NOW) == 4
+
+    rows, limit = archive.open_page({"limit": "3"})
+    rows = list(rows)[:limit]
+    assert [row["_id"] for row in rows] == [doc["_id"] for doc in docs[:3]]
+    assert rows[0]["extra_field"] == 0
+    rows, limit = archive.open_page({"limit": "3", "after": encode_cursor(rows[-1])})
+    assert [row["_id"] for row in rows] == [docs[3]["_id"]]
@@ -0,0 +1,99 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryStore  # noqa: E402
+from stats import StatsEngine  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 30)
+
+
+def incident(**extra):
+    return {"type": "fire", "severity": "low", "approved": False, "flagged": False, "spam": False,
+            "latitude": 33.68, "longitude": 73.04, "timestamp": NOW, **extra}
+
+
+class WritesDuringAggregate:
+    # Runs `writes` while the reconcile aggregation is in flight, before or
+    # after the database has been read
+    def __init__(self, collection, writes, after_read=False):
+        self.collection = collection
+        self.writes = writes
+        self.after_read = after_read
+
+    def aggregate(self, pipeline, **kwargs):
+        if not self.after_read:
+            self.writes()
+        rows = list(self.collection.aggregate(pipeline, **kwargs))
+        if self.after_read:
+            self.writes()
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def approve(store, engine, incident_id):
+    before = store.incidents.find_one({"_id": incident_id})
+    store.incidents.update_one({"_id": incident_id}, {"$set": {"approved": True}})
+    engine.update(before, {**before, "approved": True})
+
+
+def insert(store, engine, **extra):
+    doc = incident(**extra)
+    doc["_id"] = store.incidents.insert_one(doc).inserted_id
+    engine.add(doc)
+    return doc["_id"]
+
+
+def test_counts_by_group_and_filter():
+    store = MemoryStore("test_stats")
+    store.incidents.insert_many([incident(approved=True), incident(approved=True, severity="high"),
+                                 incident(type="theft"), incident(spam=True)])
+    engine = StatsEngine(store.incidents)
+    engine.load()
+    assert engine.query()["total"] == 2
+    assert engine.query(status="all", group="status")["data"] == [
+        {"status": "approved", "count": 2}, {"status": "pending", "count": 1}, {"status": "spam", "count": 1}]
+    assert engine.query(severity="high")["total"] == 1
+    assert engine.query(status="all", type="fire", group="severity")["total"] == 3
+    with pytest.raises(ValueError):
+        engine.query(group="nope")
+
+
+@pytest.mark.parametrize("after_read", [False, True])
+def test_writes_during_reconcile_are_counted_once(after_read):
+    store = MemoryStore("test_stats")
+    old_id = store.incidents.insert_one(incident()).inserted_id
+    engine = StatsEngine(store.incidents)
+    engine.load()
+    new_ids = []
+
+    def writes():
+        new_ids.append(insert(store, engine))
+        approve(store, engine, new_ids[0])
+        if not after_read:
+            # Changes to older incidents are only safe to check once the
+            # aggregation has read them
+            approve(store, engine, old_id)
+
+    engine.collection = WritesDuringAggregate(store.incidents, writes, after_read)
+    assert engine.reconcile() == 0
+    engine.collection = store.incidents
+    counts = engine.query(status="all", group="status")
+    assert counts["total"] == 2
+    assert engine.reconcile() == 0
+
+
+def test_reconcile_reports_real_drift():
+    store = MemoryStore("test_stats")
+    engine = StatsEngine(store.incidents)
+    engine.load()
+    store.incidents.insert_one(incident(approved=True))  # written by another process
+    assert engine.query()["total"] == 0
+    assert engine.reconcile() == 1
+    assert engine.query()["total"] == 1
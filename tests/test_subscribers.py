@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MemoryStore  # noqa: E402
+from subscribers import SubscriberIndex  # noqa: E402
+
+LAT, LNG = 33.6844, 73.0479
+
+
+def make_store():
+    store = MemoryStore("test_subscribers")
+    store.ensure_indexes()
+    return store
+
+
+def emails(results):
+    return [user["email"] for user, _ in results]
+
+
+def test_grid_and_db_lookups_agree():
+    store = make_store()
+    index = SubscriberIndex(store.subscribers, store.counters)
+    index.add("near@example.com", None, LAT + 0.01, LNG)
+    index.add("far@example.com", None, LAT + 1, LNG)
+    index.add(None, "+10000000000", LAT, LNG + 0.02)
+    index.load()
+    grid = index.nearby(LAT, LNG, 5)
+    db = index.nearby_from_db(LAT, LNG, 5)
+    assert emails(grid) == emails(db) == ["near@example.com", None]
+    for (_, a), (_, b) in zip(grid, db):
+        assert abs(a - b) < 0.01
+
+
+def test_resubscribe_moves_and_unsubscribe_removes():
+    store = make_store()
+    index = SubscriberIndex(store.subscribers, store.counters)
+    index.load()
+    first = index.add("a@example.com", None, LAT, LNG)
+    assert index.add("a@example.com", None, LAT + 1, LNG) == first
+    assert index.nearby(LAT, LNG, 5) == []
+    assert index.remove(first)
+    assert not index.remove(first)
+    assert not index.remove("not-an-id")
+    assert index.nearby(LAT + 1, LNG, 5) == []
+
+
+def test_other_processes_see_new_subscribers():
+    store = make_store()
+    worker_a = SubscriberIndex(store.subscribers, store.counters, check_interval=0)
+    worker_b = SubscriberIndex(store.subscribers, store.counters, check_interval=0)
+    worker_a.load()
+    worker_b.load()
+
+    worker_a.add("a@example.com", None, LAT, LNG)
+    # Our own write is applied in place and does not force a reload
+    assert not worker_a.stale()
+    # The other worker answers from the database while its grid reloads
+    assert emails(worker_b.nearby(LAT, LNG, 5)) == ["a@example.com"]
+    worker_b.reloader.join()
+    assert not worker_b.stale()
+    assert emails(worker_b.nearby(LAT, LNG, 5)) == ["a@example.com"]
+
+    subscriber_id = worker_b.add("b@example.com", None, LAT, LNG + 0.01)
+    worker_b.remove(subscriber_id)
+    assert worker_a.stale()
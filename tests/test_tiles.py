@@ -0,0 +1,107 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiles  # noqa: E402
+from database import MemoryStore  # noqa: E402
+from tiles import CELL_BITS, TileIndex, mercator  # noqa: E402
+
+
+def incident(lat, lng, severity="low", **extra):
+    return {"latitude": lat, "longitude": lng, "type": "fire", "severity": severity,
+            "approved": True, "flagged": False, "spam": False, **extra}
+
+
+def random_docs(n, seed=3):
+    rng = random.Random(seed)
+    severities = ("low", "moderate", "high", "critical")
+    # Mostly around one city, a few anywhere
+    return [incident(33.6 + rng.random() * 0.2, 73.0 + rng.random() * 0.2, rng.choice(severities))
+            if i % 10 else incident(rng.uniform(-80, 80), rng.uniform(-180, 180), rng.choice(severities))
+            for i in range(n)]
+
+
+def make_index(docs):
+    store = MemoryStore("test_tiles")
+    store.incidents.insert_many([dict(doc) for doc in docs])
+    index = TileIndex(store.incidents)
+    index.load()
+    return store, index
+
+
+def brute_cells(docs, z, x, y):
+    # Cell (within tile z/x/y) -> count, straight from the projection
+    side = 1 << CELL_BITS
+    counts = {}
+    for doc in docs:
+        px, py = mercator([doc["latitude"]], [doc["longitude"]])
+        gx, gy = int(px[0] * (1 << z) * side), int(py[0] * (1 << z) * side)
+        if gx // side == x and gy // side == y:
+            counts[(gx, gy)] = counts.get((gx, gy), 0) + 1
+    return counts
+
+
+def tile_of(lat, lng, z):
+    px, py = mercator([lat], [lng])
+    return int(px[0] * (1 << z)), int(py[0] * (1 << z))
+
+
+@pytest.mark.parametrize("z", [0, 3, 9, 14])
+def test_clusters_match_a_brute_force_count(z):
+    docs = random_docs(400)
+    _, index = make_index(docs)
+    x, y = tile_of(33.7, 73.1, z)
+    clusters = index.tile(z, x, y)
+    assert sorted(c["count"] for c in clusters) == sorted(brute_cells(docs, z, x, y).values())
+    for c in clusters:
+        if c["count"] == 1:
+            assert set(c) >= {"_id", "type", "severity"}
+        else:
+            assert sum(c["severity"].values()) == c["count"]
+
+
+def test_changes_match_a_fresh_load():
+    docs = random_docs(200)
+    store, index = make_index(docs)
+    z = 10
+    x, y = tile_of(33.7, 73.1, z)
+    before = index.tile(z, x, y)  # cached, must be evicted by the changes
+    for doc in list(store.incidents.find())[:30]:
+        index.remove(str(doc["_id"]))
+        store.incidents.delete_one({"_id": doc["_id"]})
+    for i in range(20):
+        doc = incident(33.65 + i * 0.001, 73.05, "critical")
+        doc["_id"] = store.incidents.insert_one(doc).inserted_id
+        index.add(doc["_id"], doc)
+    assert index.tile(z, x, y) != before
+    fresh = TileIndex(store.incidents)
+    fresh.load()
+
+    def normalized(clusters):
+        return sorted((c["count"], round(c["lat"], 9), round(c["lng"], 9)) for c in clusters)
+
+    assert normalized(index.tile(z, x, y)) == normalized(fresh.tile(z, x, y))
+    # Folding the deltas into the sorted arrays changes nothing either
+    index._compact()
+    index.cache.clear()
+    assert normalized(index.tile(z, x, y)) == normalized(fresh.tile(z, x, y))
+    assert len(index) == len(fresh) == 190
+
+
+def test_moderate_severity_is_counted():
+    _, index = make_index([incident(10.0, 10.0, "moderate"), incident(10.0, 10.0, "moderate")])
+    (cluster,) = index.tile(0, 0, 0)
+    assert cluster["severity"] == {"moderate": 2}
+
+
+def test_out_of_range_tiles_raise_value_error():
+    _, index = make_index([])
+    with pytest.raises(ValueError):
+        index.tile(1, 2, 0)
+    with pytest.raises(ValueError):
+        index.tile(tiles.MAX_ZOOM + 1, 0, 0)
+    assert index.tile(0, 0, 0) == []
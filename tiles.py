@@ -0,0 +1,273 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Slippy-map tiles (z/x/y, Web Mercator) of clustered public incidents.
+MAX_ZOOM = 20
+CELL_BITS = 3                # 8 x 8 cluster cells per tile (32 px at 256 px tiles)
+LEVEL = MAX_ZOOM + CELL_BITS  # bits per axis of the finest grid
+MAX_LAT = 85.0511287798
+# The report form says "moderate", older clients and imports "medium"
+SEVERITIES = ("low", "moderate", "medium", "high", "critical")
+
+
+def mercator(lats, lngs):
+    # Fractions of the world in [0, 1): x grows east, y grows south
+    lats = np.clip(np.asarray(lats, dtype=np.float64), -MAX_LAT, MAX_LAT)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    x = (lngs + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lats) / 2)) / (2 * np.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+def _spread(v):
+    # Interleave zeros between the low 32 bits of v
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(cx, cy):
+    return _spread(np.asarray(cx)) | (_spread(np.asarray(cy)) << np.uint64(1))
+
+
+def quadkeys(lats, lngs):
+    # Morton code of each point on the finest grid: every tile, and every
+    # cell inside a tile, is then one contiguous range of the sorted codes
+    x, y = mercator(lats, lngs)
+    scale = float(1 << LEVEL)
+    return morton((x * scale).astype(np.uint64), (y * scale).astype(np.uint64))
+
+
+class Points:
+    # Immutable set of points sorted by quadkey, with prefix sums
+    def __init__(self, ids, types, sev, lats, lngs, codes=None):
+        codes = quadkeys(lats, lngs) if codes is None else np.asarray(codes, dtype=np.uint64)
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.ids = np.asarray(ids, dtype=object)[order]
+        self.types = np.asarray(types, dtype=object)[order]
+        self.sev = np.asarray(sev, dtype=np.int8)[order]
+        self.lats = np.asarray(lats, dtype=np.float64)[order]
+        self.lngs = np.asarray(lngs, dtype=np.float64)[order]
+        zero = np.zeros(1)
+        self.cum_lat = np.concatenate([zero, np.cumsum(self.lats)])
+        self.cum_lng = np.concatenate([zero, np.cumsum(self.lngs)])
+        self.cum_sev = np.stack([np.concatenate([zero, np.cumsum(self.sev == k)]) for k in range(len(SEVERITIES))])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def sums(self, starts, ends):
+        # Per [start, end) quadkey range: (lo, hi, sum_lat, sum_lng, severity counts)
+        lo = np.searchsorted(self.codes, starts, side="left")
+        hi = np.searchsorted(self.codes, ends, side="left")
+        return (lo, hi, self.cum_lat[hi] - self.cum_lat[lo], self.cum_lng[hi] - self.cum_lng[lo],
+                self.cum_sev[:, hi] - self.cum_sev[:, lo])
+
+
+# === TILE INDEX ===
+# Public incidents sorted by quadkey, with prefix sums of position and
+# severity. Any cell at any zoom is a contiguous slice of the sorted
+# array, so its cluster (count, centroid, severities) comes from two
+# binary searches: a tile costs 64 cells x log N at every zoom, whatever
+# the number of incidents. Approvals and removals go to small added /
+# removed sets that are folded into the sorted arrays every DELTA_MAX
+# changes. Rendered tiles are cached; a change evicts only the tiles that
+# contain the incident, one per zoom level.
+
+DELTA_MAX = 4096
+
+
+class TileIndex:
+    def __init__(self, collection, cache_size=4096):
+        self.collection = collection
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.main = Points([], [], [], [], [])
+        self.main_codes = {}  # incident_id -> quadkey, for ids in self.main
+        self.added = {}       # incident_id -> (code, type, severity, lat, lng)
+        self.removed = {}     # incident_id -> same, for ids in self.main
+        self.delta = None     # (added, removed) as Points, rebuilt lazily
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.main) + len(self.added) - len(self.removed)
+
+    @staticmethod
+    def _severity(value):
+        return SEVERITIES.index(value) if value in SEVERITIES else -1
+
+    def load(self):
+        query = {
+            "latitude": {"$exists": True},
+            "longitude": {"$exists": True},
+            "approved": True,
+            "flagged": False,
+            "spam": False,
+        }
+        ids, types, sev, lats, lngs = [], [], [], [], []
+        for doc in self.collection.find(query, {"latitude": 1, "longitude": 1, "type": 1, "severity": 1}):
+            ids.append(str(doc["_id"]))
+            types.append(doc.get("type"))
+            sev.append(self._severity(doc.get("severity")))
+            lats.append(float(doc["latitude"]))
+            lngs.append(float(doc["longitude"]))
+        main = Points(ids, types, sev, lats, lngs)
+        with self.lock:
+            self.main = main
+            self.main_codes = dict(zip(main.ids.tolist(), main.codes.tolist()))
+            self.added.clear()
+            self.removed.clear()
+            self.delta = None
+            self.cache.clear()
+            self.loaded = True
+            print(f"Tile index loaded: {len(main)} incidents.")
+
+    # --- changes ---
+
+    def _evict(self, code):
+        # The tile holding `code` at every zoom
+        for z in range(MAX_ZOOM + 1):
+            self.cache.pop((z, int(np.uint64(code) >> np.uint64(2 * (LEVEL - z)))), None)
+
+    def _main_point(self, incident_id, code):
+        m = self.main
+        lo = int(np.searchsorted(m.codes, np.uint64(code), side="left"))
+        hi = int(np.searchsorted(m.codes, np.uint64(code), side="right"))
+        for i in range(lo, hi):
+            if m.ids[i] == incident_id:
+                return (code, m.types[i], int(m.sev[i]), float(m.lats[i]), float(m.lngs[i]))
+        return None
+
+    def _remove(self, incident_id):
+        point = self.added.pop(incident_id, None)
+        if point is None and incident_id in self.main_codes and incident_id not in self.removed:
+            point = self._main_point(incident_id, self.main_codes[incident_id])
+            self.removed[incident_id] = point
+        if point is None:
+            return False
+        self._evict(point[0])
+        self.delta = None
+        return True
+
+    def _compact(self):
+        m = self.main
+        keep = ~np.isin(m.ids, list(self.removed)) if self.removed else np.ones(len(m), dtype=bool)
+        added = list(self.added.items())
+        self.main = Points(
+            np.concatenate([m.ids[keep], np.asarray([i for i, _ in added], dtype=object)]),
+            np.concatenate([m.types[keep], np.asarray([p[1] for _, p in added], dtype=object)]),
+            np.concatenate([m.sev[keep], np.asarray([p[2] for _, p in added], dtype=np.int8)]),
+            np.concatenate([m.lats[keep], [p[3] for _, p in added]]),
+            np.concatenate([m.lngs[keep], [p[4] for _, p in added]]),
+            codes=np.concatenate([m.codes[keep], np.asarray([p[0] for _, p in added], dtype=np.uint64)]),
+        )
+        self.main_codes = dict(zip(self.main.ids.tolist(), self.main.codes.tolist()))
+        self.added.clear()
+        self.removed.clear()
+        self.delta = None
+
+    def add(self, incident_id, doc):
+        if doc.get("latitude") is None or doc.get("longitude") is None:
+            return
+        incident_id = str(incident_id)
+        lat, lng = float(doc["latitude"]), float(doc["longitude"])
+        code = int(quadkeys([lat], [lng])[0])
+        with self.lock:
+            if not self.loaded:
+                return  # picked up from the database on first load
+            self._remove(incident_id)
+            self.added[incident_id] = (code, doc.get("type"), self._severity(doc.get("severity")), lat, lng)
+            self._evict(code)
+            self.delta = None
+            if len(self.added) + len(self.removed) > DELTA_MAX:
+                self._compact()
+
+    def remove(self, incident_id):
+        with self.lock:
+            if self.loaded:
+                self._remove(str(incident_id))
+                if len(self.added) + len(self.removed) > DELTA_MAX:
+                    self._compact()
+
+    # --- queries ---
+
+    def _delta(self):
+        if self.delta is None:
+            self.delta = tuple(
+                Points(list(points), [p[1] for p in points.values()], [p[2] for p in points.values()],
+                       [p[3] for p in points.values()], [p[4] for p in points.values()],
+                       codes=np.asarray([p[0] for p in points.values()], dtype=np.uint64))
+                for points in (self.added, self.removed)
+            )
+        return self.delta
+
+    def tile(self, z, x, y):
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+            raise ValueError("Tile out of range")
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            key = (z, int(morton(x, y)))
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached
+            result = self._render(z, x, y)
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return result
+
+    def _single(self, main_lo, main_hi, added, add_lo, add_hi):
+        # The one live incident of a cell: a fresh addition, or the main
+        # entry that has not been removed
+        for points, lo, hi in ((added, add_lo, add_hi), (self.main, main_lo, main_hi)):
+            for i in range(lo, hi):
+                incident_id = points.ids[i]
+                if points is added or incident_id not in self.removed:
+                    sev = int(points.sev[i])
+                    return {
+                        "lat": float(points.lats[i]),
+                        "lng": float(points.lngs[i]),
+                        "count": 1,
+                        "_id": incident_id,
+                        "type": points.types[i],
+                        "severity": SEVERITIES[sev] if sev >= 0 else None,
+                    }
+        return None
+
+    def _render(self, z, x, y):
+        side = 1 << CELL_BITS
+        cx, cy = np.meshgrid(np.arange(side) + x * side, np.arange(side) + y * side)
+        shift = np.uint64(2 * (LEVEL - z - CELL_BITS))
+        starts = morton(cx.ravel(), cy.ravel()) << shift
+        ends = starts + (np.uint64(1) << shift)
+        lo, hi, lat, lng, sev = self.main.sums(starts, ends)
+        counts = hi - lo
+        added, removed = self._delta()
+        if len(added) or len(removed):
+            a_lo, a_hi, a_lat, a_lng, a_sev = added.sums(starts, ends)
+            _, _, r_lat, r_lng, r_sev = r = removed.sums(starts, ends)
+            counts = counts + (a_hi - a_lo) - (r[1] - r[0])
+            lat, lng, sev = lat + a_lat - r_lat, lng + a_lng - r_lng, sev + a_sev - r_sev
+        else:
+            a_lo = a_hi = np.zeros(len(starts), dtype=np.int64)
+        clusters = []
+        for j in np.nonzero(counts > 0)[0]:
+            n = int(counts[j])
+            if n == 1:
+                clusters.append(self._single(lo[j], hi[j], added, a_lo[j], a_hi[j]))
+                continue
+            clusters.append({
+                "lat": float(lat[j] / n),
+                "lng": float(lng[j] / n),
+                "count": n,
+                "severity": {s: int(k) for s, k in zip(SEVERITIES, sev[:, j]) if k},
+            })
+        return clusters
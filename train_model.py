@@ -1,132 +1,316 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-import joblib
-import os
-
-# Make sure 'models' directory exists
-os.makedirs("models", exist_ok=True)
-
-# ========= SPAM DETECTOR TRAINING ==========
-
-normal_descriptions = [
-    "Robbery reported at local bank",
-    "Fire broke out in apartment building",
-    "Suspicious person loitering outside the school",
-    "Armed individual seen near shopping mall",
-    "Attempted car theft in parking lot",
-    "Multiple gunshots heard in downtown area",
-    "Street fight between two individuals",
-    "Explosion heard near railway station",
-    "Gas leak detected in the neighborhood",
-    "House burglary while owners were away",
-    "Missing child reported in city park",
-    "Stabbing incident near metro station",
-    "Loud noise reported near industrial zone",
-    "Motorcycle crash on highway",
-    "Traffic accident involving three vehicles",
-    "Break-in reported at electronics store",
-    "Armed robbery at gas station",
-    "Man found unconscious on sidewalk",
-    "Woman attacked while jogging",
-    "Hit and run reported near school",
-    "Nadi ke qareeb lash mili",
-    "Masjid ke bahar jhagda hua",
-    "Park mein ajnabi shakhs bachon se baat kar raha tha",
-    "Bridge ke neeche fire brigade bulayi gayi",
-    "Police ne ek chori shuda gaari baramad ki",
-    "Hospital ke samne danga hua",
-    "Cycle chori hone ki report file hui",
-    "Public transport mein musafir ka mobile chori hua",
-    "Ghar mein dakhil hone ki koshish hui",
-    "Jamaat ke doran fire alarm chala",
-    "Train station ke qareeb ajnabi bag mila",
-    "Bus stand par afraad ka jhagda hua",
-    "ATM par shakhs ne forcefully paise nikalwaye",
-    "Warehouse mein aag lag gayi",
-    "School ke andar security breach hua",
-    "Road par andheray mein shakhs mashkook laga",
-    "Car accident ke baad fire lagi",
-    "Mobile snatching ki koshish hui",
-    "Motorbike par do afraad ne wallet cheena",
-    "Market mein chor pakra gaya",
-    "Gas cylinder phat gaya",
-    "Chhat se kisi ne pathar phenka",
-    "Lift mein shakhs ne aurat ko tang kiya",
-    "Hospital mein patient ka saman chori hua",
-    "Bakra mandi se janwar chori hua",
-    "Highway par truck ka accident hua",
-    "Hostel ke andar chori ki report",
-    "Building mein elevator mein phans gaye log",
-    "Garage mein daka pada",
-    "Train mein musafir se saman cheena gaya",
-    "Thana mein FIR darj karwayi gayi"
-] * 4  # Replicate to increase volume (~200)
-
-spam_descriptions = [
-    "Congratulations! You have won a brand new car!",
-    "Urgent: Verify your identity to avoid suspension",
-    "Claim your free hotel stay now!",
-    "Limited time offer! Act fast to win rewards",
-    "Click this link for a secret cash bonus",
-    "You have unclaimed crypto in your wallet",
-    "Your number is selected for lucky draw",
-    "Free recharge jeetne ka moka chhodiye mat",
-    "Tumhara gift tayar hai, abhi claim karo",
-    "Aaj ka lucky winner aap ho",
-    "Apna CNIC bhejo aur 20 hazar lo",
-    "Earn via scratch card spins daily",
-    "Amazon reward claim karne ka last chance",
-    "Join our telegram and get $10 free",
-    "Tumhara Gmail password expire hone wala hai",
-    "Tumhara mobile hack hone wala hai",
-    "Get 5 lakh rupees by filling this form",
-    "Download this app and earn every hour",
-    "Click kro aur free game credits lo",
-    "Your OTP is 456723 — don’t share it"
-] * 10  # Replicate to increase volume (~200)
-
-all_descriptions = normal_descriptions + spam_descriptions
-labels = ["real"] * len(normal_descriptions) + ["spam"] * len(spam_descriptions)
-
-df_spam = pd.DataFrame({
-    "description": all_descriptions,
-    "label": labels
-})
-
-# Train vectorizer and model
-spam_vectorizer = TfidfVectorizer()
-X_spam = spam_vectorizer.fit_transform(df_spam["description"])
-y_spam = df_spam["label"]
-
-spam_model = MultinomialNB()
-spam_model.fit(X_spam, y_spam)
-
-# ✅ Save
-joblib.dump(spam_model, "models/spam_detector_model.pkl")
-joblib.dump(spam_vectorizer, "models/spam_vectorizer.pkl")
-
-print("✅ Spam detector trained and saved.")
-
-
-# ========= INCIDENT TYPE CLASSIFIER ==========
-
-incident_data = {
-    "description": [...],  # ← keep your descriptions here (already correct)
-    "type": [...]          # ← keep your types here (already correct)
-}
-
-df_type = pd.DataFrame(incident_data)
-
-incident_vectorizer = TfidfVectorizer()
-X_type = incident_vectorizer.fit_transform(df_type["description"])
-y_type = df_type["type"]
-
-incident_model = MultinomialNB()
-incident_model.fit(X_type, y_type)
-
-# ✅ Save
-joblib.dump(incident_model, "models/incident_classifier.pkl")
-joblib.dump(incident_vectorizer, "models/vectorizer.pkl")
-
-print("✅ Incident classifier trained and saved.")
+import argparse
+import time
+import zlib
+from itertools import chain, islice
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from model_registry import publish
+
+# Training pipeline: labelled reports are streamed (seed examples below +
+# moderator decisions from MongoDB), hashed with HashingVectorizer and fed
+# to MultinomialNB.partial_fit batch by batch, so memory does not grow with
+# the data. Each grid point is fitted in its own joblib worker; the best on
+# the validation split is scored on the test split, timed, and published
+# as a new model version with that report in its manifest.
+#   python train_model.py [--mongo-uri URI] [--db NAME] [--seed-only] [--jobs N] [--dry-run]
+#
+# Labels: approved incidents are "real" and carry their type; rejected
+# reports (kept in rejected_reports when an admin rejects one) are "spam".
+
+BATCH_SIZE = 5000
+N_FEATURES = (2 ** 16, 2 ** 18)
+NGRAM_RANGES = ((1, 1), (1, 2))
+ALPHAS = (0.01, 0.1, 0.5, 1.0)
+LATENCY_SAMPLES = 500
+SPAM_CLASSES = ["real", "spam"]
+
+# ========= SEED EXAMPLES ==========
+# Enough to train something on an empty database; real decisions outweigh
+# them as soon as moderators have worked through a few hundred reports.
+
+SEED_TYPES = [
+    ("Robbery reported at local bank", "theft"),
+    ("Fire broke out in apartment building", "fire"),
+    ("Suspicious person loitering outside the school", "suspicious"),
+    ("Armed individual seen near shopping mall", "suspicious"),
+    ("Attempted car theft in parking lot", "theft"),
+    ("Multiple gunshots heard in downtown area", "violence"),
+    ("Street fight between two individuals", "violence"),
+    ("Explosion heard near railway station", "fire"),
+    ("Gas leak detected in the neighborhood", "fire"),
+    ("House burglary while owners were away", "theft"),
+    ("Missing child reported in city park", "missing"),
+    ("Stabbing incident near metro station", "violence"),
+    ("Loud noise reported near industrial zone", "suspicious"),
+    ("Motorcycle crash on highway", "accident"),
+    ("Traffic accident involving three vehicles", "accident"),
+    ("Break-in reported at electronics store", "theft"),
+    ("Armed robbery at gas station", "theft"),
+    ("Man found unconscious on sidewalk", "medical"),
+    ("Woman attacked while jogging", "violence"),
+    ("Hit and run reported near school", "accident"),
+    ("Nadi ke qareeb lash mili", "violence"),
+    ("Masjid ke bahar jhagda hua", "violence"),
+    ("Park mein ajnabi shakhs bachon se baat kar raha tha", "suspicious"),
+    ("Bridge ke neeche fire brigade bulayi gayi", "fire"),
+    ("Police ne ek chori shuda gaari baramad ki", "theft"),
+    ("Hospital ke samne danga hua", "violence"),
+    ("Cycle chori hone ki report file hui", "theft"),
+    ("Public transport mein musafir ka mobile chori hua", "theft"),
+    ("Ghar mein dakhil hone ki koshish hui", "theft"),
+    ("Jamaat ke doran fire alarm chala", "fire"),
+    ("Train station ke qareeb ajnabi bag mila", "suspicious"),
+    ("Bus stand par afraad ka jhagda hua", "violence"),
+    ("ATM par shakhs ne forcefully paise nikalwaye", "theft"),
+    ("Warehouse mein aag lag gayi", "fire"),
+    ("School ke andar security breach hua", "suspicious"),
+    ("Road par andheray mein shakhs mashkook laga", "suspicious"),
+    ("Car accident ke baad fire lagi", "accident"),
+    ("Mobile snatching ki koshish hui", "theft"),
+    ("Motorbike par do afraad ne wallet cheena", "theft"),
+    ("Market mein chor pakra gaya", "theft"),
+    ("Gas cylinder phat gaya", "fire"),
+    ("Chhat se kisi ne pathar phenka", "violence"),
+    ("Lift mein shakhs ne aurat ko tang kiya", "harassment"),
+    ("Hospital mein patient ka saman chori hua", "theft"),
+    ("Bakra mandi se janwar chori hua", "theft"),
+    ("Highway par truck ka accident hua", "accident"),
+    ("Hostel ke andar chori ki report", "theft"),
+    ("Building mein elevator mein phans gaye log", "accident"),
+    ("Garage mein daka pada", "theft"),
+    ("Train mein musafir se saman cheena gaya", "theft"),
+    ("Thana mein FIR darj karwayi gayi", "theft"),
+]
+
+SEED_SPAM = [
+    "Congratulations! You have won a brand new car!",
+    "Urgent: Verify your identity to avoid suspension",
+    "Claim your free hotel stay now!",
+    "Limited time offer! Act fast to win rewards",
+    "Click this link for a secret cash bonus",
+    "You have unclaimed crypto in your wallet",
+    "Your number is selected for lucky draw",
+    "Free recharge jeetne ka moka chhodiye mat",
+    "Tumhara gift tayar hai, abhi claim karo",
+    "Aaj ka lucky winner aap ho",
+    "Apna CNIC bhejo aur 20 hazar lo",
+    "Earn via scratch card spins daily",
+    "Amazon reward claim karne ka last chance",
+    "Join our telegram and get $10 free",
+    "Tumhara Gmail password expire hone wala hai",
+    "Tumhara mobile hack hone wala hai",
+    "Get 5 lakh rupees by filling this form",
+    "Download this app and earn every hour",
+    "Click kro aur free game credits lo",
+    "Your OTP is 456723 — don’t share it",
+]
+
+
+# ========= DATA ==========
+
+def split_of(text):
+    # Stable by content: a description (and its duplicates) always lands
+    # in the same split, whichever run or worker reads it
+    bucket = zlib.crc32(text.encode("utf-8")) % 10
+    return "test" if bucket == 0 else "validation" if bucket == 1 else "train"
+
+
+def seed_examples(task):
+    if task == "spam":
+        return chain(((text, "real") for text, _ in SEED_TYPES), ((text, "spam") for text in SEED_SPAM))
+    return iter(SEED_TYPES)
+
+
+def mongo_examples(task, source):
+    from database import MongoStore
+
+    store = MongoStore(source["mongo_uri"], source["db"])
+    approved = {"approved": True, "description": {"$type": "string"}}
+    if task == "spam":
+        for doc in store.incidents.find(approved, {"description": 1}, batch_size=BATCH_SIZE):
+            yield doc["description"], "real"
+        for doc in store.rejections.find({"description": {"$type": "string"}}, {"description": 1}, batch_size=BATCH_SIZE):
+            yield doc["description"], "spam"
+    else:
+        query = {**approved, "type": {"$type": "string", "$ne": "unknown"}}
+        for doc in store.incidents.find(query, {"description": 1, "type": 1}, batch_size=BATCH_SIZE):
+            yield doc["description"], doc["type"]
+
+
+def examples(task, source, split):
+    # source is a plain dict so it pickles into joblib workers, each of
+    # which opens its own database connection
+    stream = seed_examples(task)
+    if not source.get("seed_only"):
+        stream = chain(stream, mongo_examples(task, source))
+    return ((text, label) for text, label in stream if split_of(text) in split)
+
+
+def batches(pairs, size=BATCH_SIZE):
+    pairs = iter(pairs)
+    while True:
+        batch = list(islice(pairs, size))
+        if not batch:
+            return
+        yield [text for text, _ in batch], [label for _, label in batch]
+
+
+def type_classes(source):
+    classes = {label for _, label in SEED_TYPES}
+    if not source.get("seed_only"):
+        from database import MongoStore
+
+        store = MongoStore(source["mongo_uri"], source["db"])
+        classes.update(t for t in store.incidents.distinct("type", {"approved": True}) if isinstance(t, str))
+        classes.discard("unknown")
+    return sorted(classes)
+
+
+# ========= TRAINING ==========
+
+def make_vectorizer(n_features, ngram_range):
+    # Non-negative counts for MultinomialNB; stateless, so nothing to fit
+    return HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm="l2")
+
+
+def fit_candidate(task, classes, n_features, ngram_range, source):
+    # One pass fits every alpha on the same hashed batches, a second pass
+    # scores them on the validation split; the best one is returned
+    vectorizer = make_vectorizer(n_features, ngram_range)
+    models = {alpha: MultinomialNB(alpha=alpha) for alpha in ALPHAS}
+    start = time.perf_counter()
+    trained = 0
+    for texts, labels in batches(examples(task, source, ("train",))):
+        X = vectorizer.transform(texts)
+        for model in models.values():
+            model.partial_fit(X, labels, classes=classes)
+        trained += len(texts)
+    fit_s = time.perf_counter() - start
+    if not trained:
+        return None
+    correct = dict.fromkeys(ALPHAS, 0)
+    seen = 0
+    for texts, labels in batches(examples(task, source, ("validation",))):
+        X = vectorizer.transform(texts)
+        labels = np.asarray(labels)
+        for alpha, model in models.items():
+            correct[alpha] += int((model.predict(X) == labels).sum())
+        seen += len(texts)
+    scores = {alpha: correct[alpha] / seen if seen else 0.0 for alpha in ALPHAS}
+    alpha = max(ALPHAS, key=lambda a: (scores[a], -a))
+    return {
+        "params": {"n_features": n_features, "ngram_range": list(ngram_range), "alpha": alpha},
+        "validation_accuracy": round(scores[alpha], 4),
+        "validation_size": seen,
+        "train_size": trained,
+        "fit_s": round(fit_s, 3),
+        "model": models[alpha],
+        "vectorizer": vectorizer,
+    }
+
+
+def evaluate(task, model, vectorizer, source):
+    # Test-split accuracy and per-class precision/recall from a confusion
+    # count, so the test set is never held in memory
+    confusion = {}
+    for texts, labels in batches(examples(task, source, ("test",))):
+        for truth, predicted in zip(labels, model.predict(vectorizer.transform(texts))):
+            key = (truth, str(predicted))
+            confusion[key] = confusion.get(key, 0) + 1
+    total = sum(confusion.values())
+    correct = sum(n for (truth, predicted), n in confusion.items() if truth == predicted)
+    per_class = {}
+    for label in model.classes_:
+        label = str(label)
+        tp = confusion.get((label, label), 0)
+        predicted = sum(n for (_, p), n in confusion.items() if p == label)
+        actual = sum(n for (t, _), n in confusion.items() if t == label)
+        per_class[label] = {
+            "precision": round(tp / predicted, 4) if predicted else None,
+            "recall": round(tp / actual, 4) if actual else None,
+            "support": actual,
+        }
+    return {"test_accuracy": round(correct / total, 4) if total else None, "test_size": total, "per_class": per_class}
+
+
+def latency(model, vectorizer, texts):
+    # Single-description predict latency and batched throughput
+    texts = (texts * (LATENCY_SAMPLES // max(1, len(texts)) + 1))[:LATENCY_SAMPLES]
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        model.predict(vectorizer.transform([text]))
+        samples.append(time.perf_counter() - start)
+    ms = np.array(samples) * 1000
+    start = time.perf_counter()
+    model.predict(vectorizer.transform(texts))
+    batch_s = time.perf_counter() - start
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "batch_items_per_s": round(len(texts) / batch_s),
+    }
+
+
+def train(task, classes, source, jobs):
+    grid = [(n, ngram) for n in N_FEATURES for ngram in NGRAM_RANGES]
+    results = Parallel(n_jobs=jobs)(
+        delayed(fit_candidate)(task, classes, n, ngram, source) for n, ngram in grid
+    )
+    results = [r for r in results if r is not None]
+    if not results:
+        raise ValueError(f"No training data for {task}")
+    # Ties go to the smaller model
+    best = max(results, key=lambda r: (r["validation_accuracy"], -r["params"]["n_features"]))
+    sample = [text for text, _ in islice(examples(task, source, ("test", "validation")), LATENCY_SAMPLES)]
+    report = {
+        "params": best["params"],
+        "validation_accuracy": best["validation_accuracy"],
+        "train_size": best["train_size"],
+        "fit_s": best["fit_s"],
+        **evaluate(task, best["model"], best["vectorizer"], source),
+        "latency": latency(best["model"], best["vectorizer"], sample or [text for text, _ in SEED_TYPES]),
+        "grid": [{"params": r["params"], "validation_accuracy": r["validation_accuracy"], "fit_s": r["fit_s"]}
+                 for r in results],
+    }
+    return best["model"], best["vectorizer"], report
+
+
+def print_report(task, report):
+    print(f"✅ {task}: {report['params']} | train {report['train_size']} in {report['fit_s']}s"
+          f" | validation {report['validation_accuracy']} | test {report['test_accuracy']} (n={report['test_size']})"
+          f" | p50 {report['latency']['p50_ms']} ms | {report['latency']['batch_items_per_s']} items/s batched")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish the spam and incident type models")
+    parser.add_argument("--mongo-uri", default=None, help="defaults to MONGO_URI")
+    parser.add_argument("--db", default=None, help="defaults to MONGO_DB")
+    parser.add_argument("--seed-only", action="store_true", help="train on the built-in examples only")
+    parser.add_argument("--jobs", type=int, default=-1, help="joblib workers (-1 = all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="report without publishing")
+    args = parser.parse_args()
+
+    from database import MONGO_DB, MONGO_URI
+
+    source = {"mongo_uri": args.mongo_uri or MONGO_URI, "db": args.db or MONGO_DB, "seed_only": args.seed_only}
+    started = time.perf_counter()
+    spam_model, spam_vectorizer, spam_report = train("spam", SPAM_CLASSES, source, args.jobs)
+    print_report("Spam detector", spam_report)
+    incident_model, incident_vectorizer, type_report = train("type", type_classes(source), source, args.jobs)
+    print_report("Incident classifier", type_report)
+
+    metrics = {"spam": spam_report, "type": type_report, "total_s": round(time.perf_counter() - started, 3)}
+    if args.dry_run:
+        return
+    # ✅ Save as a new model version; running servers hot-swap to it
+    version = publish(spam_model, spam_vectorizer, incident_model, incident_vectorizer, metrics=metrics)
+    print(f"✅ Models published as {version}.")
+
+
+if __name__ == "__main__":
+    main()